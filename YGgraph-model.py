@@ -1,24 +1,300 @@
 import tkinter as tk
-from tkinter import messagebox, simpledialog, Toplevel, Label, Button
+from tkinter import messagebox, simpledialog, filedialog, Toplevel, Label, Button
 import networkx as nx
 import matplotlib.pyplot as plt
+from matplotlib.artist import Artist
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.transforms import IdentityTransform
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import random
+import numpy as np
 import math
-import copy
+
+from yggraph_moteur import DispositionEnArrierePlan, ModeleGraphe
+
+
+# Arêtes d'un même style (droites, courbes ±rad, boucles) dessinées en une seule
+# LineCollection. La géométrie est calculée en coordonnées écran au moment du
+# dessin, de façon vectorisée, pour raccourcir les arêtes au bord des sommets.
+class AretesGroupees(Artist):
+    POINTS_COURBE = 12
+
+    def __init__(self, coords, src, dst, rad, boucle, rayon_noeud, fleches, taille_fleche=20):
+        super().__init__()
+        self.coords = coords
+        self.src = src
+        self.dst = dst
+        self.rad = rad
+        self.boucle = boucle
+        self.rayon_noeud = rayon_noeud
+        self.fleches = fleches
+        self.taille_fleche = taille_fleche
+        self.selection = None
+        self.traits = LineCollection([], colors='k', linewidths=1, transform=IdentityTransform())
+        self.pointes = PolyCollection([], facecolors='k', edgecolors='k', transform=IdentityTransform())
+        self.set_zorder(1)
+
+    def sous_ensemble(self, masque):
+        return AretesGroupees(self.coords, self.src[masque], self.dst[masque], self.rad, self.boucle,
+                              self.rayon_noeud, self.fleches, self.taille_fleche)
+
+    def draw(self, renderer):
+        if not self.get_visible():
+            return
+        src, dst = self.src, self.dst
+        if self.selection is not None:
+            src, dst = src[self.selection], dst[self.selection]
+        if len(src) == 0:
+            return
+        transformation = self.axes.transData
+        p1 = transformation.transform(self.coords[src])
+        p2 = transformation.transform(self.coords[dst])
+        r = renderer.points_to_pixels(self.rayon_noeud)
+        longueur_pointe = renderer.points_to_pixels(0.4 * self.taille_fleche) if self.fleches else 0.0
+        largeur_pointe = renderer.points_to_pixels(0.2 * self.taille_fleche)
+        if self.boucle:
+            traits, pointe, direction = self._boucles(p1, r, longueur_pointe)
+        else:
+            traits, pointe, direction = self._arcs(p1, p2, r, longueur_pointe)
+        self.traits.set_segments(traits)
+        self.traits.set_figure(self.figure)
+        self.traits.draw(renderer)
+        if self.fleches:
+            normale = np.stack([-direction[:, 1], direction[:, 0]], axis=1)
+            base = pointe - direction * longueur_pointe
+            triangles = np.stack([pointe, base + normale * largeur_pointe, base - normale * largeur_pointe], axis=1)
+            self.pointes.set_verts(triangles)
+            self.pointes.set_figure(self.figure)
+            self.pointes.draw(renderer)
+
+    def _arcs(self, p1, p2, r, longueur_pointe):
+        delta = p2 - p1
+        milieu = (p1 + p2) / 2
+        controle = milieu + self.rad * np.stack([delta[:, 1], -delta[:, 0]], axis=1)
+        d1 = _unitaires(controle - p1)
+        d2 = _unitaires(controle - p2)
+        longueur = np.hypot(delta[:, 0], delta[:, 1])[:, None]
+        retrait = np.minimum(r, longueur / 2)
+        debut = p1 + d1 * retrait
+        pointe = p2 + d2 * retrait
+        fin = pointe + d2 * np.minimum(longueur_pointe, longueur / 4)
+        if self.rad == 0:
+            return np.stack([debut, fin], axis=1), pointe, -d2
+        t = np.linspace(0, 1, self.POINTS_COURBE)[None, :, None]
+        traits = ((1 - t) ** 2) * debut[:, None] + 2 * (1 - t) * t * controle[:, None] + (t ** 2) * fin[:, None]
+        return traits, pointe, -d2
+
+    def _boucles(self, p, r, longueur_pointe):
+        debut = p + r * np.array([math.cos(math.radians(120)), math.sin(math.radians(120))])
+        pointe = p + r * np.array([math.cos(math.radians(60)), math.sin(math.radians(60))])
+        c1 = p + r * np.array([-1.5, 3.0])
+        c2 = p + r * np.array([1.5, 3.0])
+        direction = _unitaires(pointe - c2)
+        fin = pointe - direction * longueur_pointe
+        t = np.linspace(0, 1, self.POINTS_COURBE)[None, :, None]
+        traits = (((1 - t) ** 3) * debut[:, None] + 3 * ((1 - t) ** 2) * t * c1[:, None]
+                  + 3 * (1 - t) * (t ** 2) * c2[:, None] + (t ** 3) * fin[:, None])
+        return traits, pointe, direction
+
+
+def _unitaires(v):
+    norme = np.hypot(v[:, 0], v[:, 1])[:, None]
+    return v / np.where(norme == 0, 1, norme)
+
+
+# Rendu en mode retenu : les artistes matplotlib sont conservés entre deux images.
+# Pendant un glisser, seuls le sommet déplacé et ses arêtes incidentes sont animés
+# et redessinés par blitting au-dessus d'un fond mis en cache.
+class RenduGraphe:
+    TAILLE_NOEUD = 800
+    POSITION_POIDS = 0.7
+    # Au-delà de ce nombre d'arêtes, ni pointes de flèches ni poids (niveau de détail réduit).
+    SEUIL_DETAIL = 2000
+    # Au-delà de ce nombre de sommets, les noms des sommets ne sont plus affichés.
+    SEUIL_ETIQUETTES = 500
+
+    def __init__(self, ax, canvas):
+        self.ax = ax
+        self.canvas = canvas
+        self.noeuds = None
+        self.etiquettes = {}
+        self.groupes = []
+        self.poids = {}
+        self._ordre = []
+        self._indices = {}
+        self._coords = np.zeros((0, 2))
+        self._fond = None
+        self._glisse = None
+        self._animes = []
+
+    def reconstruire(self, G, pos):
+        self._glisse = None
+        self._animes = []
+        self._fond = None
+        self.ax.clear()
+        self._ordre = list(G.nodes)
+        self._indices = {n: i for i, n in enumerate(self._ordre)}
+        self._coords = np.array([pos[n] for n in self._ordre], dtype=float).reshape(-1, 2)
+        self.noeuds = self.ax.scatter(self._coords[:, 0], self._coords[:, 1],
+                                      s=self.TAILLE_NOEUD, c='lightblue', zorder=2)
+        self.etiquettes = {}
+        if len(self._ordre) <= self.SEUIL_ETIQUETTES:
+            self.etiquettes = {n: self.ax.text(pos[n][0], pos[n][1], str(n), fontsize=12,
+                                               ha='center', va='center', zorder=3)
+                               for n in self._ordre}
+        detail = G.number_of_edges() <= self.SEUIL_DETAIL
+        self.groupes = []
+        for (rad, boucle), (src, dst) in self._grouper_aretes(G).items():
+            groupe = AretesGroupees(self._coords, np.array(src, dtype=np.intp), np.array(dst, dtype=np.intp),
+                                    rad, boucle, math.sqrt(self.TAILLE_NOEUD) / 2, detail)
+            self.ax.add_artist(groupe)
+            self.groupes.append(groupe)
+        self.poids = {}
+        if detail:
+            for u, v, d in G.edges(data=True):
+                if 'weight' in d:
+                    if (u, v) in self.poids:
+                        self.poids[(u, v)].set_text(str(d['weight']))
+                    else:
+                        self.poids[(u, v)] = self.ax.text(0, 0, str(d['weight']), fontsize=10, ha='center',
+                                                          va='center', rotation_mode='anchor', zorder=1,
+                                                          bbox=dict(boxstyle="round", ec=(1, 1, 1), fc=(1, 1, 1)))
+            for (u, v), texte in self.poids.items():
+                self._placer_poids(texte, pos[u], pos[v])
+        self._ajuster_limites(pos)
+        self.ax.set_axis_off()
+        self.canvas.draw()
+
+    def _grouper_aretes(self, G):
+        # La courbure est choisie une seule fois par couple (u, v), pour toutes ses clés.
+        groupes = {}
+        indices = self._indices
+        for u, voisins in G.adj.items():
+            iu = indices[u]
+            for v, cles in voisins.items():
+                if u == v:
+                    style = (0.0, True)
+                elif len(cles) > 1 or u in G.adj[v]:
+                    style = (0.2 if u > v else -0.2, False)
+                else:
+                    style = (0.0, False)
+                src, dst = groupes.setdefault(style, ([], []))
+                iv = indices[v]
+                src.extend([iu] * len(cles))
+                dst.extend([iv] * len(cles))
+        return groupes
+
+    def actualiser_positions(self, pos):
+        for n, i in self._indices.items():
+            self._coords[i] = pos[n]
+        self.noeuds.set_offsets(self._coords)
+        for n, texte in self.etiquettes.items():
+            texte.set_position(pos[n])
+        for (u, v), texte in self.poids.items():
+            self._placer_poids(texte, pos[u], pos[v])
+        self._ajuster_limites(pos)
+        self.canvas.draw_idle()
+
+    def _placer_poids(self, texte, p1, p2):
+        t = self.POSITION_POIDS
+        texte.set_position((p1[0] + t * (p2[0] - p1[0]), p1[1] + t * (p2[1] - p1[1])))
+        angle = math.degrees(math.atan2(p2[1] - p1[1], p2[0] - p1[0]))
+        if angle > 90:
+            angle -= 180
+        elif angle < -90:
+            angle += 180
+        texte.set_rotation(angle)
+
+    def _ajuster_limites(self, pos):
+        if not pos:
+            return
+        xs = [p[0] for p in pos.values()]
+        ys = [p[1] for p in pos.values()]
+        marge_x = max(0.1, 0.1 * (max(xs) - min(xs)))
+        marge_y = max(0.1, 0.1 * (max(ys) - min(ys)))
+        self.ax.set_xlim(min(xs) - marge_x, max(xs) + marge_x)
+        self.ax.set_ylim(min(ys) - marge_y, max(ys) + marge_y)
+
+    def commencer_glisser(self, G, pos, n):
+        if n not in self._indices:
+            return
+        i = self._indices[n]
+        autres = np.ones(len(self._ordre), dtype=bool)
+        autres[i] = False
+        self.noeuds.set_offsets(self._coords[autres] if autres.any() else np.full((1, 2), np.nan))
+        seul = self.ax.scatter([pos[n][0]], [pos[n][1]], s=self.TAILLE_NOEUD, c='lightblue', zorder=2)
+        incidentes = []
+        for groupe in self.groupes:
+            masque = (groupe.src == i) | (groupe.dst == i)
+            if masque.any():
+                groupe.selection = ~masque
+                mobile = groupe.sous_ensemble(masque)
+                self.ax.add_artist(mobile)
+                incidentes.append(mobile)
+        paires = [p for p in self.poids if p[0] == n or p[1] == n]
+        self._glisse = (n, seul, incidentes, paires)
+        self._animes = [seul] + incidentes + [self.poids[p] for p in paires]
+        if n in self.etiquettes:
+            self._animes.append(self.etiquettes[n])
+        for artiste in self._animes:
+            artiste.set_animated(True)
+        self.canvas.draw()
+        self._fond = self.canvas.copy_from_bbox(self.ax.bbox)
+        self._dessiner_animes()
+
+    def glisser(self, pos):
+        if self._glisse is None:
+            return
+        n, seul, incidentes, paires = self._glisse
+        x, y = pos[n]
+        self._coords[self._indices[n]] = (x, y)
+        seul.set_offsets([[x, y]])
+        if n in self.etiquettes:
+            self.etiquettes[n].set_position((x, y))
+        for u, v in paires:
+            self._placer_poids(self.poids[(u, v)], pos[u], pos[v])
+        self._dessiner_animes()
+
+    def _dessiner_animes(self):
+        self.canvas.restore_region(self._fond)
+        for artiste in self._animes:
+            self.ax.draw_artist(artiste)
+        self.canvas.blit(self.ax.bbox)
+
+    def terminer_glisser(self, pos):
+        if self._glisse is None:
+            return
+        n, seul, incidentes, paires = self._glisse
+        for artiste in self._animes:
+            artiste.set_animated(False)
+        seul.remove()
+        for mobile in incidentes:
+            mobile.remove()
+        for groupe in self.groupes:
+            groupe.selection = None
+        self.noeuds.set_offsets(self._coords)
+        self._glisse = None
+        self._animes = []
+        self._fond = None
+        self._ajuster_limites(pos)
+        self.canvas.draw_idle()
+
 
 class GraphApp:
+    INTERVALLE_TRAME = 16
+    INTERVALLE_DISPOSITION = 50
+
     def __init__(self, root):
         self.root = root
         self.root.title("YGgraphe-modele")
         self.root.geometry("900x500")
 
-        self.G = nx.MultiDiGraph()
-        self.pos = {}
+        self.modele = ModeleGraphe()
         self.dragging_node = None
-
-        self.history = []
-        self.future = []
+        self._depart_glisser = None
+        self._position_attente = None
+        self._trame = None
+        self.disposition = DispositionEnArrierePlan()
+        self._positions_avant = None
 
         # Panels
         self.panel1 = tk.Frame(root, width=300, bg='lightgray')
@@ -52,6 +328,7 @@ class GraphApp:
         self.fig, self.ax = plt.subplots(figsize=(6, 5))
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.panel2)
         self.canvas.get_tk_widget().pack(fill='both', expand=True)
+        self.rendu = RenduGraphe(self.ax, self.canvas)
         self.canvas.mpl_connect("button_press_event", self.on_press)
         self.canvas.mpl_connect("motion_notify_event", self.on_motion)
         self.canvas.mpl_connect("button_release_event", self.on_release)
@@ -61,15 +338,29 @@ class GraphApp:
         bouton_frame = tk.Frame(self.panel2)
         bouton_frame.pack(fill='x')
         tk.Button(bouton_frame, text="Enregistrer Graphe", command=self.enregistrer_graphe).pack(side='left', padx=5, pady=5)
+        tk.Button(bouton_frame, text="Ouvrir Graphe", command=self.ouvrir_graphe).pack(side='left', padx=5, pady=5)
         tk.Button(bouton_frame, text="Parcours", command=self.ouvrir_parcours).pack(side='left', padx=5, pady=5)
         tk.Button(bouton_frame, text="Nouveau Graphe", command=self.nouveau_graphe).pack(side='left', padx=5, pady=5)
         tk.Button(bouton_frame, text="Annuler", command=self.undo).pack(side='left', padx=5, pady=5)
         tk.Button(bouton_frame, text="Rétablir", command=self.redo).pack(side='left', padx=5, pady=5)
+        tk.Button(bouton_frame, text="Disposition automatique", command=self.disposition_automatique).pack(side='left', padx=5, pady=5)
+        self.nouveaux_seulement = tk.BooleanVar(value=False)
+        tk.Checkbutton(bouton_frame, text="Nouveaux seulement", variable=self.nouveaux_seulement).pack(side='left', padx=5, pady=5)
         tk.Button(bouton_frame, text="Documentation", command=self.documentation_plateforme).pack(side='left', padx=5, pady=5)
 
+    # La fenêtre n'est qu'une vue : le graphe, l'historique et les analyses vivent
+    # dans le modèle, utilisable aussi sans interface (yggraph_cli.py).
+    @property
+    def G(self):
+        return self.modele.G
+
+    @property
+    def pos(self):
+        return self.modele.pos
+
     def save_state(self):
-        self.history.append((copy.deepcopy(self.G), copy.deepcopy(self.pos)))
-        self.future.clear()
+        self._interrompre_disposition()
+        self.modele.commencer()
 
     def ajouter_sommet(self):
         sommet = self.entry_sommet.get().strip()
@@ -80,8 +371,7 @@ class GraphApp:
             messagebox.showwarning("Attention", "Sommet existe déjà")
             return
         self.save_state()
-        self.G.add_node(sommet)
-        self.pos[sommet] = self._generer_position_unique()
+        self.modele.ajouter_noeud(sommet, self.modele.position_libre())
         self.redessiner()
 
     def ajouter_arete(self):
@@ -94,102 +384,147 @@ class GraphApp:
         if poids:
             try:
                 poids = float(poids)
-                self.G.add_edge(s1, s2, weight=poids)
+                self.modele.ajouter_lien(s1, s2, weight=poids)
             except:
                 messagebox.showerror("Erreur", "Poids doit être un nombre")
         else:
-            self.G.add_edge(s1, s2)
+            self.modele.ajouter_lien(s1, s2)
         self.redessiner()
 
     def undo(self):
-        if not self.history:
-            return
-        self.future.append((copy.deepcopy(self.G), copy.deepcopy(self.pos)))
-        self.G, self.pos = self.history.pop()
-        self.redessiner()
+        self._interrompre_disposition()
+        if self.modele.annuler():
+            self.redessiner()
 
     def redo(self):
-        if not self.future:
-            return
-        self.history.append((copy.deepcopy(self.G), copy.deepcopy(self.pos)))
-        self.G, self.pos = self.future.pop()
-        self.redessiner()
+        self._interrompre_disposition()
+        if self.modele.retablir():
+            self.redessiner()
 
     def nouveau_graphe(self):
         self.save_state()
-        self.G.clear()
-        self.pos.clear()
+        self.modele.vider()
         self.redessiner()
 
-    def _generer_position_unique(self):
-        tries = 0
-        while True:
-            angle = random.uniform(0, 2 * math.pi)
-            radius = random.uniform(0.1, 0.4)
-            x = 0.5 + radius * math.cos(angle)
-            y = 0.5 + radius * math.sin(angle)
-            overlap = False
-            for other in self.pos.values():
-                if (x - other[0]) ** 2 + (y - other[1]) ** 2 < 0.02:
-                    overlap = True
-                    break
-            if not overlap:
-                return [x, y]
-            tries += 1
-            if tries > 100:
-                return [0.5, 0.5]
+    def disposition_automatique(self):
+        self._interrompre_disposition()
+        preparation = self.modele.preparer_disposition(self.nouveaux_seulement.get())
+        if preparation is None:
+            return
+        noeuds, P, src, dst, mobiles = preparation
+        self._positions_avant = {n: tuple(self.pos[n]) for n in noeuds}
+        self.disposition.demarrer(noeuds, P, src, dst, mobiles)
+        self.root.after(self.INTERVALLE_DISPOSITION, self._suivre_disposition)
+
+    def _suivre_disposition(self):
+        if self._positions_avant is None:
+            return
+        resultat = self.disposition.dernier_resultat()
+        if resultat is not None:
+            self._appliquer_disposition(resultat)
+            if resultat[2]:
+                self._conclure_disposition()
+                return
+        self.root.after(self.INTERVALLE_DISPOSITION, self._suivre_disposition)
+
+    def _appliquer_disposition(self, resultat):
+        noeuds, P, fini = resultat
+        for n, p in zip(noeuds, P.tolist()):
+            self.modele.placer(n, p)
+        self.rendu.actualiser_positions(self.pos)
+
+    def _interrompre_disposition(self):
+        if self._positions_avant is None:
+            return
+        self.disposition.arreter()
+        resultat = self.disposition.dernier_resultat()
+        if resultat is not None:
+            self._appliquer_disposition(resultat)
+        self._conclure_disposition()
+
+    def _conclure_disposition(self):
+        # Toute la disposition forme une seule commande annulable.
+        avant, self._positions_avant = self._positions_avant, None
+        self.modele.commencer()
+        self.modele.noter_deplacements(avant)
+        self.modele.disposes = set(self.G.nodes)
+        self.redessiner()
 
     def redessiner(self):
-        self.ax.clear()
-        nx.draw_networkx_nodes(self.G, pos=self.pos, ax=self.ax, node_size=800, node_color='lightblue')
-        nx.draw_networkx_labels(self.G, pos=self.pos, ax=self.ax, font_size=12)
-        for u, v, key in self.G.edges(keys=True):
-            if u == v:
-                nx.draw_networkx_edges(self.G, pos=self.pos, edgelist=[(u, v)], ax=self.ax,
-                                       connectionstyle="arc3,rad=0.3", arrowstyle='-|>', arrowsize=20)
-            elif self.G.number_of_edges(u, v) > 1 or self.G.number_of_edges(v, u) > 0:
-                rad = 0.2 if (u, v) > (v, u) else -0.2
-                nx.draw_networkx_edges(self.G, pos=self.pos, edgelist=[(u, v)], ax=self.ax,
-                                       connectionstyle=f"arc3,rad={rad}", arrowstyle='-|>', arrowsize=20)
-            else:
-                nx.draw_networkx_edges(self.G, pos=self.pos, edgelist=[(u, v)], ax=self.ax,
-                                       arrowstyle='-|>', arrowsize=20)
-        labels = {(u, v): d['weight'] for u, v, d in self.G.edges(data=True) if 'weight' in d}
-        nx.draw_networkx_edge_labels(self.G, pos=self.pos, edge_labels=labels, ax=self.ax, label_pos=0.7)
-        self.ax.set_axis_off()
-        self.canvas.draw()
+        self.rendu.reconstruire(self.G, self.pos)
 
     def on_press(self, event):
-        if event.xdata and event.ydata:
-            for node, (x, y) in self.pos.items():
-                if (x - event.xdata) ** 2 + (y - event.ydata) ** 2 < 0.02:
-                    self.dragging_node = node
-                    break
+        if event.button == 1 and event.xdata and event.ydata:
+            self._interrompre_disposition()
+            node = self.modele.index.plus_proche(event.xdata, event.ydata)
+            if node is not None:
+                self.dragging_node = node
+                self._depart_glisser = tuple(self.pos[node])
+                self.rendu.commencer_glisser(self.G, self.pos, node)
 
     def on_motion(self, event):
         if self.dragging_node and event.xdata and event.ydata:
-            self.pos[self.dragging_node] = [event.xdata, event.ydata]
-            self.redessiner()
+            # Les événements sont regroupés : seule la dernière position est
+            # appliquée à chaque rafraîchissement.
+            self._position_attente = (event.xdata, event.ydata)
+            if self._trame is None:
+                self._trame = self.root.after(self.INTERVALLE_TRAME, self._appliquer_glisser)
+
+    def _appliquer_glisser(self):
+        self._trame = None
+        if self.dragging_node is None or self._position_attente is None:
+            return
+        self.modele.placer(self.dragging_node, self._position_attente)
+        self._position_attente = None
+        self.rendu.glisser(self.pos)
 
     def on_release(self, event):
+        if self._trame is not None:
+            self.root.after_cancel(self._trame)
+            self._appliquer_glisser()
+        node = self.dragging_node
+        if node is not None and node in self.pos:
+            arrivee = tuple(self.pos[node])
+            if arrivee != self._depart_glisser:
+                self.save_state()
+                self.modele.noter_deplacements({node: self._depart_glisser})
         self.dragging_node = None
+        self._depart_glisser = None
+        self.rendu.terminer_glisser(self.pos)
 
     def on_right_click(self, event):
         if event.button == 3 and event.xdata and event.ydata:
-            for node, (x, y) in self.pos.items():
-                if (x - event.xdata) ** 2 + (y - event.ydata) ** 2 < 0.02:
-                    self.save_state()
-                    self.G.remove_node(node)
-                    self.pos.pop(node)
-                    self.redessiner()
-                    return
+            node = self.modele.index.plus_proche(event.xdata, event.ydata)
+            if node is not None:
+                self.save_state()
+                self.modele.retirer_noeud(node)
+                self.redessiner()
 
     def enregistrer_graphe(self):
-        nx.write_gml(self.G, "graphe_enregistre.gml")
-        messagebox.showinfo("Info", "Graphe enregistré dans graphe_enregistre.gml")
+        chemin = filedialog.asksaveasfilename(defaultextension=".gml", initialfile="graphe_enregistre.gml",
+                                              filetypes=[("GML", "*.gml"), ("Binaire YGgraph", "*.ygb")])
+        if not chemin:
+            return
+        self.modele.enregistrer(chemin)
+        messagebox.showinfo("Info", f"Graphe enregistré dans {chemin}")
+
+    def ouvrir_graphe(self):
+        chemin = filedialog.askopenfilename(filetypes=[
+            ("Graphes", "*.gml *.ygb *.csv *.tsv *.txt *.edges *.edgelist"),
+            ("GML", "*.gml"), ("Binaire YGgraph", "*.ygb"),
+            ("Liste d'arêtes", "*.csv *.tsv *.txt *.edges *.edgelist")])
+        if not chemin:
+            return
+        self._interrompre_disposition()
+        try:
+            self.modele.charger(chemin)
+        except (OSError, ValueError, nx.NetworkXError) as e:
+            messagebox.showerror("Erreur", f"Lecture impossible : {e}")
+            return
+        self.redessiner()
 
     def ouvrir_parcours(self):
-        ParcoursWindow(self.root, self.G, self.pos)
+        ParcoursWindow(self.root, self.modele)
 
     def documentation_plateforme(self):
         doc = Toplevel(self.root)
@@ -210,9 +545,8 @@ class GraphApp:
 
 
 class ParcoursWindow:
-    def __init__(self, parent, G, pos):
-        self.G = G
-        self.pos = pos
+    def __init__(self, parent, modele):
+        self.modele = modele
         self.win = tk.Toplevel(parent)
         self.win.title("Parcours et Vérification")
         self.win.geometry("900x500")
@@ -243,67 +577,48 @@ class ParcoursWindow:
         tk.Button(self.frame_chemin, text="Valider", command=self.chemin_dijkstra).pack(pady=5)
 
     def verifier_graphe(self):
-        result = ""
-        if nx.is_eulerian(self.G):
-            result = "Eulérien"
-        elif self._is_hamiltonian():
-            result = "Hamiltonien"
-        elif nx.is_tree(self.G.to_undirected()):
-            result = "Arbre"
-        elif nx.is_multigraph(self.G):
-            result = "Multigraphe"
-        elif self.G.number_of_nodes() == 0:
-            result = "Graphe Nul"
-        else:
-            result = "Aucun"
+        result = self.modele.classer()
         messagebox.showinfo("Vérification", f"Type : {result}")
         self._affiche_doc("Documentation Vérification", self._get_doc(result))
 
-    def _is_hamiltonian(self):
-        n = len(self.G.nodes)
-        for node in self.G.nodes:
-            if self.G.degree(node) < n / 2:
-                return False
-        return True
-
     def parcours_dfs(self):
         start = simpledialog.askstring("DFS", "Sommet de départ :")
-        if start not in self.G.nodes:
+        if start not in self.modele.G.nodes:
             messagebox.showerror("Erreur", "Sommet inexistant")
             return
-        path = list(nx.dfs_edges(self.G, source=start))
+        path = self.modele.parcours_dfs(start)
         self._afficher_parcours(path, "DFS", "red")
 
     def parcours_bfs(self):
         start = simpledialog.askstring("BFS", "Sommet de départ :")
-        if start not in self.G.nodes:
+        if start not in self.modele.G.nodes:
             messagebox.showerror("Erreur", "Sommet inexistant")
             return
-        path = list(nx.bfs_edges(self.G, source=start))
+        path = self.modele.parcours_bfs(start)
         self._afficher_parcours(path, "BFS", "blue")
 
     def chemin_dijkstra(self):
         s1 = self.entry_c1.get().strip()
         s2 = self.entry_c2.get().strip()
-        if s1 not in self.G.nodes or s2 not in self.G.nodes:
+        if s1 not in self.modele.G.nodes or s2 not in self.modele.G.nodes:
             messagebox.showerror("Erreur", "Sommet inexistant")
             return
-        if not nx.is_weighted(self.G):
+        if not self.modele.est_pondere():
             messagebox.showerror("Erreur", "Graphe non pondéré")
             return
-        shortest = nx.dijkstra_path(self.G, s1, s2)
+        shortest = self.modele.plus_court_chemin(s1, s2)
         edges = list(zip(shortest, shortest[1:]))
         fig, ax = plt.subplots()
-        nx.draw_networkx(self.G, pos=self.pos, ax=ax, with_labels=True, node_color='lightblue')
-        nx.draw_networkx_edges(self.G, pos=self.pos, ax=ax, edgelist=edges, edge_color='green', width=2)
+        nx.draw_networkx(self.modele.G, pos=self.modele.pos, ax=ax, with_labels=True, node_color='lightblue')
+        nx.draw_networkx_edges(self.modele.G, pos=self.modele.pos, ax=ax, edgelist=edges, edge_color='green', width=2)
         ax.set_title("Chemin Dijkstra")
         plt.show()
         self._affiche_doc("Documentation Dijkstra", self._get_doc("Dijkstra"))
 
     def _afficher_parcours(self, path, algo, color):
         fig, ax = plt.subplots()
-        nx.draw_networkx(self.G, pos=self.pos, ax=ax, with_labels=True, node_color='lightblue')
-        nx.draw_networkx_edges(self.G, pos=self.pos, ax=ax, edgelist=path, edge_color=color, width=2)
+        nx.draw_networkx(self.modele.G, pos=self.modele.pos, ax=ax, with_labels=True, node_color='lightblue')
+        nx.draw_networkx_edges(self.modele.G, pos=self.modele.pos, ax=ax, edgelist=path, edge_color=color, width=2)
         ax.set_title(f"{algo} Parcours")
         plt.show()
         self._affiche_doc(f"Documentation {algo}", self._get_doc(algo))
@@ -0,0 +1,286 @@
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import networkx as nx
+import numpy as np
+
+import yggraph_moteur
+
+CHEMIN_MODELE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "YGgraph-model.py")
+
+
+def charger_vue():
+    # Le module de l'éditeur porte un tiret : il est chargé par son chemin et
+    # enregistré dans sys.modules pour que ses classes restent sérialisables.
+    spec = importlib.util.spec_from_file_location("yggraph_model", CHEMIN_MODELE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["yggraph_model"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def graphe_aleatoire(n, m, graine=0):
+    rng = random.Random(graine)
+    G = nx.MultiDiGraph()
+    G.add_nodes_from(str(i) for i in range(n))
+    for _ in range(m):
+        G.add_edge(str(rng.randrange(n)), str(rng.randrange(n)), weight=rng.randint(1, 20))
+    return G
+
+
+def graphe_sans_echelle(n, m, graine=0):
+    # Attachement préférentiel : chaque extrémité est tirée parmi les extrémités
+    # déjà placées, donc en proportion du degré ; les n sommets sont introduits au
+    # fil des m arêtes, ce qui donne quelques pivots de très fort degré.
+    rng = random.Random(graine)
+    G = nx.MultiDiGraph()
+    G.add_nodes_from(str(i) for i in range(n))
+    extremites = [0]
+    suivant = 1
+    for j in range(m):
+        if suivant < n and rng.random() < (n - suivant) / (m - j):
+            u = suivant
+            suivant += 1
+        else:
+            u = rng.choice(extremites)
+        v = rng.choice(extremites)
+        if rng.random() < 0.5:
+            u, v = v, u
+        G.add_edge(str(u), str(v), weight=rng.randint(1, 20))
+        extremites += (u, v)
+    return G
+
+
+GENERATEURS = {"aleatoire": graphe_aleatoire, "sans_echelle": graphe_sans_echelle}
+
+
+def chronometrer(fonction, repetitions=3, preparer=None):
+    # Meilleur temps sur les répétitions ; « preparer » fournit, hors chrono, un
+    # argument neuf à chaque répétition.
+    meilleur = float("inf")
+    resultat = None
+    for _ in range(repetitions):
+        argument = preparer() if preparer else None
+        debut = time.perf_counter()
+        resultat = fonction(argument) if preparer else fonction()
+        meilleur = min(meilleur, time.perf_counter() - debut)
+    return meilleur, resultat
+
+
+def comparer_csr(n, m, sources=5, graine=0):
+    G = graphe_aleatoire(n, m, graine)
+    rng = random.Random(graine)
+    paires = [(str(rng.randrange(n)), str(rng.randrange(n))) for _ in range(sources)]
+    construction, _ = chronometrer(lambda: yggraph_moteur.GrapheCSR(G), 1)
+    lignes = [("construction CSR", None, construction)]
+
+    def dijkstra_nx():
+        chemins = []
+        for s, t in paires:
+            try:
+                chemins.append(nx.dijkstra_path(G, s, t))
+            except nx.NetworkXNoPath:
+                chemins.append(None)
+        return chemins
+
+    def dijkstra_csr(csr):
+        chemins = []
+        for s, t in paires:
+            try:
+                chemins.append(csr.dijkstra_chemin(s, t))
+            except nx.NetworkXNoPath:
+                chemins.append(None)
+        return chemins
+
+    cas = [
+        ("BFS", lambda: [list(nx.bfs_edges(G, s)) for s, _ in paires],
+         lambda csr: [csr.bfs_aretes(s) for s, _ in paires]),
+        ("DFS", lambda: [list(nx.dfs_edges(G, s)) for s, _ in paires],
+         lambda csr: [csr.dfs_aretes(s) for s, _ in paires]),
+        ("Dijkstra", dijkstra_nx, dijkstra_csr),
+    ]
+    for nom, reference, rapide in cas:
+        # L'égalité des résultats est vérifiée par tests/test_moteur.py. Un CSR
+        # neuf à chaque répétition : sinon on ne mesure que le cache des arbres
+        # de plus courts chemins.
+        t_nx, _ = chronometrer(reference)
+        t_csr, _ = chronometrer(rapide, preparer=lambda: yggraph_moteur.GrapheCSR(G))
+        lignes.append((nom, t_nx, t_csr))
+    return lignes
+
+
+def mesurer(vue, nom_graphe, m, densite, graine=0, requetes=1000, repetitions=3):
+    # Temps en secondes ; les mesures « par_... » sont des moyennes sur un lot.
+    n = max(2, int(m / densite))
+    G = GENERATEURS[nom_graphe](n, m, graine)
+    rng = random.Random(graine)
+    pos = {x: [rng.random(), rng.random()] for x in G.nodes}
+    noeuds = list(G.nodes)
+    sources = [rng.choice(noeuds) for _ in range(5)]
+    paires = [(rng.choice(noeuds), rng.choice(noeuds)) for _ in range(20)]
+    points = [(rng.random(), rng.random()) for _ in range(requetes)]
+    mesures = {}
+
+    mesures["chargement"], modele = chronometrer(lambda: yggraph_moteur.ModeleGraphe(G.copy(), pos), 1)
+
+    # save_state puis une modification, et son annulation, comme dans GraphApp.
+    def commandes_unitaires():
+        for i in range(requetes):
+            modele.commencer()
+            modele.ajouter_lien(noeuds[i % n], noeuds[(i * 7) % n], weight=1)
+        for _ in range(requetes):
+            modele.annuler()
+    mesures["save_state_annuler_par_commande"] = chronometrer(commandes_unitaires, repetitions)[0] / requetes
+
+    def nouveau_puis_annuler():
+        modele.commencer()
+        modele.vider()
+        modele.annuler()
+    mesures["nouveau_graphe_annuler"] = chronometrer(nouveau_puis_annuler, 1)[0]
+
+    fig, ax = plt.subplots(figsize=(6, 5))
+    rendu = vue.RenduGraphe(ax, fig.canvas)
+    mesures["redessiner"] = chronometrer(lambda: rendu.reconstruire(modele.G, modele.pos), repetitions)[0]
+    glisse = noeuds[0]
+    rendu.commencer_glisser(modele.G, modele.pos, glisse)
+
+    def images_glisser():
+        for i in range(20):
+            modele.placer(glisse, (i / 20, i / 20))
+            rendu.glisser(modele.pos)
+    mesures["glisser_par_image"] = chronometrer(images_glisser, repetitions)[0] / 20
+    rendu.terminer_glisser(modele.pos)
+    plt.close(fig)
+
+    def selections():
+        for x, y in points:
+            modele.index.plus_proche(x, y)
+    mesures["selection_par_clic"] = chronometrer(selections, repetitions)[0] / requetes
+
+    # Vérifier utilise les propriétés tenues à jour ; la variante sans cache les
+    # reconstruit d'abord, comme après l'ouverture d'un fichier.
+    mesures["verifier"], type_graphe = chronometrer(modele.classer, repetitions)
+
+    def verifier_sans_cache():
+        modele.proprietes = yggraph_moteur.ProprietesGraphe.depuis(modele.G)
+        return modele.classer()
+    mesures["verifier_sans_cache"] = chronometrer(verifier_sans_cache, repetitions)[0]
+
+    mesures["instantane_csr"] = chronometrer(lambda: yggraph_moteur.GrapheCSR(modele.G), repetitions)[0]
+    csr = modele.instantane_csr()
+    mesures["bfs_par_source"] = chronometrer(
+        lambda: [csr.bfs_aretes(s) for s in sources], repetitions)[0] / len(sources)
+    mesures["dfs_par_source"] = chronometrer(
+        lambda: [csr.dfs_aretes(s) for s in sources], repetitions)[0] / len(sources)
+    # Un instantané neuf à chaque répétition, pour que le cache d'arbres ne serve pas.
+    mesures["dijkstra_par_paire"] = chronometrer(
+        lambda c: c.dijkstra_chemins(paires), repetitions,
+        lambda: yggraph_moteur.GrapheCSR(modele.G))[0] / len(paires)
+
+    return {"graphe": nom_graphe, "sommets": n, "aretes": G.number_of_edges(), "type": type_graphe,
+            "mesures": mesures, "memoire": memoire_crete(vue, G, pos, sources[0])}
+
+
+def memoire_crete(vue, G, pos, source):
+    # Mesurée à part : tracemalloc ralentit trop les allocations pour les chronos.
+    tracemalloc.start()
+    modele = yggraph_moteur.ModeleGraphe(G.copy(), pos)
+    modele_octets = tracemalloc.get_traced_memory()[1]
+    modele.instantane_csr().bfs_aretes(source)
+    csr_octets = tracemalloc.get_traced_memory()[1]
+    fig, ax = plt.subplots(figsize=(6, 5))
+    vue.RenduGraphe(ax, fig.canvas).reconstruire(modele.G, modele.pos)
+    rendu_octets = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    plt.close(fig)
+    return {"modele_octets": modele_octets, "avec_csr_octets": csr_octets, "avec_rendu_octets": rendu_octets}
+
+
+def comparer_reference(resultats, reference, tolerance):
+    # Une mesure régresse si elle dépasse celle de la référence, pour le même
+    # graphe, de plus de « tolerance » (écart relatif).
+    anciens = {(r["graphe"], r["aretes"]): r for r in reference["resultats"]}
+    regressions = []
+    for r in resultats:
+        ancien = anciens.get((r["graphe"], r["aretes"]))
+        if ancien is None:
+            continue
+        valeurs_avant = {**ancien["mesures"], **ancien["memoire"]}
+        for cle, valeur in {**r["mesures"], **r["memoire"]}.items():
+            avant = valeurs_avant.get(cle)
+            if avant and valeur > avant * (1 + tolerance):
+                regressions.append((r["graphe"], r["aretes"], cle, avant, valeur))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesures de l'éditeur YGgraph et de ses algorithmes, sans affichage.")
+    parser.add_argument("--tailles", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="nombres d'arêtes des graphes générés")
+    parser.add_argument("--densite", type=float, default=5.0, help="arêtes par sommet")
+    parser.add_argument("--graphes", nargs="+", choices=sorted(GENERATEURS), default=sorted(GENERATEURS))
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--graine", type=int, default=0)
+    parser.add_argument("--sortie", default="bench_yggraph.json", help="fichier JSON des résultats")
+    parser.add_argument("--reference", help="résultats JSON d'une exécution précédente")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="écart relatif toléré avant régression")
+    parser.add_argument("--networkx", action="store_true",
+                        help="compare aussi les parcours CSR à networkx sur les graphes aléatoires")
+    args = parser.parse_args()
+
+    vue = charger_vue()
+    resultats = []
+    for m in args.tailles:
+        for nom in args.graphes:
+            r = mesurer(vue, nom, m, args.densite, args.graine, repetitions=args.repetitions)
+            resultats.append(r)
+            print(f"\n{nom} : {r['sommets']} sommets, {r['aretes']} arêtes ({r['type']})")
+            for cle, valeur in r["mesures"].items():
+                print(f"  {cle:<34} {valeur * 1000:12.3f} ms")
+            for cle, valeur in r["memoire"].items():
+                print(f"  {cle:<34} {valeur / 2 ** 20:12.1f} Mo")
+        if args.networkx:
+            n = max(2, int(m / args.densite))
+            print(f"\nnetworkx / CSR : {n} sommets, {m} arêtes")
+            for nom, t_nx, t_csr in comparer_csr(n, m):
+                if t_nx is None:
+                    print(f"  {nom:<18} {t_csr * 1000:10.1f} ms")
+                else:
+                    print(f"  {nom:<18} networkx {t_nx * 1000:10.1f} ms   CSR {t_csr * 1000:10.1f} ms"
+                          f"   x{t_nx / t_csr:5.1f}")
+
+    rapport = {
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "plateforme": platform.platform(),
+        "python": platform.python_version(),
+        "versions": {"networkx": nx.__version__, "numpy": np.__version__, "matplotlib": matplotlib.__version__},
+        "parametres": {"densite": args.densite, "graine": args.graine, "repetitions": args.repetitions},
+        "rss_crete_ko": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "resultats": resultats,
+    }
+    with open(args.sortie, "w", encoding="utf-8") as f:
+        json.dump(rapport, f, ensure_ascii=False, indent=2)
+    print(f"\nRésultats écrits dans {args.sortie}")
+
+    if args.reference:
+        with open(args.reference, encoding="utf-8") as f:
+            regressions = comparer_reference(resultats, json.load(f), args.tolerance)
+        for graphe, aretes, cle, avant, apres in regressions:
+            print(f"Régression {graphe}/{aretes} {cle} : {avant:.6g} -> {apres:.6g}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import struct
+import sys
+import tempfile
+import time
+
+import numpy as np
+import scapy
+
+import ypcap
+from ypcap_analyse import EXTENSION_FLUX, analyser
+from ypcap_filtre import Filtre
+from ypcap_lecteur import EXTENSION_INDEX, FichierCapture
+from ypcap_stockage import dissequer, resumer_lignes
+
+# Captures synthétiques : un mélange fixe de protocoles entre HOTES adresses de
+# 10.0.0.0/16, sur CONNEXIONS échanges tirés à l'avance (dans un sens ou dans
+# l'autre), avec des horodatages croissants et des charges prises dans un même
+# bloc aléatoire. Une graine donne toujours le même fichier, octet pour octet.
+HOTES = 2000
+CONNEXIONS = 10000
+MELANGE = (("tcp", 0.55), ("udp", 0.30), ("icmp", 0.10), ("arp", 0.05))
+PORTS_TCP = (80, 443, 22, 8080, 3306)
+PORTS_UDP = (53, 123, 5353, 514)
+# Drapeaux TCP et leur poids : surtout des ACK et des données, quelques
+# ouvertures et fermetures.
+DRAPEAUX_TCP = ((0x10, 50), (0x18, 30), (0x02, 8), (0x12, 6), (0x11, 5), (0x04, 1))
+TAILLES_CHARGE = (0, 0, 64, 128, 256, 512, 1024, 1400, 1400, 1460)
+FILTRES = ("tcp", "udp.port == 53", "icmp or arp", "ip.addr == 10.0.1.0/24 and tcp.flags.syn", "len > 1000")
+
+
+def somme_controle(entete):
+    total = sum(struct.unpack("!10H", entete))
+    total = (total & 0xFFFF) + (total >> 16)
+    total = (total & 0xFFFF) + (total >> 16)
+    return ~total & 0xFFFF
+
+
+def generer_pcap(chemin, taille, graine=0):
+    # Écrit au moins taille octets de trames Ethernet dans un pcap classique et
+    # renvoie le nombre de paquets.
+    rng = random.Random(graine)
+    adresses = [bytes((10, 0, i >> 8, i & 0xFF)) for i in range(1, HOTES + 1)]
+    macs = [b"\x02\x00" + adresse for adresse in adresses]
+    charges = rng.randbytes(65536)
+    protocoles = [nom for nom, _ in MELANGE]
+    poids = [p for _, p in MELANGE]
+    drapeaux = [d for d, _ in DRAPEAUX_TCP]
+    poids_drapeaux = [p for _, p in DRAPEAUX_TCP]
+    # (client, serveur, port client, port serveur) par protocole ; l'ICMP et
+    # l'ARP n'utilisent que les adresses.
+    connexions = {nom: [(rng.randrange(HOTES), rng.randrange(HOTES), rng.randrange(1024, 65536),
+                         rng.choice(PORTS_TCP if nom == "tcp" else PORTS_UDP)) for _ in range(CONNEXIONS)]
+                  for nom in protocoles}
+    temps = 1700000000.0
+    paquets = 0
+    ecrit = 24
+    with open(chemin, "wb") as f:
+        f.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1))
+        lot = []
+        while ecrit < taille:
+            protocole = rng.choices(protocoles, poids)[0]
+            a, b, port_a, port_b = rng.choice(connexions[protocole])
+            if rng.random() < 0.5:
+                a, b, port_a, port_b = b, a, port_b, port_a
+            if protocole == "arp":
+                # Requête ou réponse, complétée à la taille minimale d'Ethernet.
+                operation = rng.choice((1, 2))
+                trame = (macs[b] if operation == 2 else b"\xff" * 6) + macs[a] + b"\x08\x06" + struct.pack(
+                    "!HHBBH6s4s6s4s", 1, 0x0800, 6, 4, operation, macs[a], adresses[a],
+                    macs[b] if operation == 2 else b"\0" * 6, adresses[b])
+                trame += b"\0" * (60 - len(trame))
+            else:
+                if protocole == "tcp":
+                    flags = rng.choices(drapeaux, poids_drapeaux)[0]
+                    n = rng.choice(TAILLES_CHARGE) if flags & 0x08 else 0
+                    couche = struct.pack("!HHIIBBHHH", port_a, port_b, rng.getrandbits(32), rng.getrandbits(32),
+                                         5 << 4, flags, 65535, 0, 0)
+                    numero = 6
+                elif protocole == "udp":
+                    n = rng.randrange(20, 513)
+                    couche = struct.pack("!HHHH", port_a, port_b, 8 + n, 0)
+                    numero = 17
+                else:
+                    n = 56
+                    couche = struct.pack("!BBHHH", rng.choice((8, 0)), 0, 0, rng.getrandbits(16), paquets & 0xFFFF)
+                    numero = 1
+                debut = rng.randrange(65536 - n) if n else 0
+                couche += charges[debut:debut + n]
+                entete = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 20 + len(couche), paquets & 0xFFFF, 0x4000, 64,
+                                     numero, 0, adresses[a], adresses[b])
+                entete = entete[:10] + struct.pack("!H", somme_controle(entete)) + entete[12:]
+                trame = macs[b] + macs[a] + b"\x08\x00" + entete + couche
+            temps += rng.expovariate(10000)
+            secondes = int(temps)
+            lot.append(struct.pack("<IIII", secondes, int((temps - secondes) * 1e6), len(trame), len(trame)))
+            lot.append(trame)
+            ecrit += 16 + len(trame)
+            paquets += 1
+            if len(lot) >= 65536:
+                f.write(b"".join(lot))
+                lot = []
+        f.write(b"".join(lot))
+    return paquets
+
+
+def capture_synthetique(repertoire, taille_mo, graine, regenerer=False):
+    chemin = os.path.join(repertoire, f"bench_ypcap_{taille_mo}mo_{graine}.pcap")
+    if regenerer or not os.path.exists(chemin):
+        debut = time.perf_counter()
+        generer_pcap(chemin, taille_mo * 1024 * 1024, graine)
+        print(f"{chemin} généré en {time.perf_counter() - debut:.1f} s")
+    return chemin
+
+
+def reinitialiser_crete():
+    # Remet à zéro le pic de RSS du processus (Linux) ; sinon, le pic reste
+    # celui de tout le processus depuis son lancement.
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def rss_crete_ko():
+    try:
+        with open("/proc/self/status") as f:
+            for ligne in f:
+                if ligne.startswith("VmHWM:"):
+                    return int(ligne.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def chronometrer(fonction):
+    # Durée et pic de RSS de l'étape, avec son résultat.
+    reinitialiser_crete()
+    debut = time.perf_counter()
+    resultat = fonction()
+    return time.perf_counter() - debut, rss_crete_ko(), resultat
+
+
+def supprimer_index(chemin):
+    for extension in (EXTENSION_INDEX, EXTENSION_FLUX):
+        if os.path.exists(chemin + extension):
+            os.remove(chemin + extension)
+
+
+def charger(chemin, processus):
+    # Comme load_capture : index, en-têtes et flux, en parallèle pour les gros fichiers.
+    fichier = FichierCapture(chemin)
+    flux = analyser(fichier, processus)
+    return fichier, flux
+
+
+def echantillon(n, taille):
+    return np.linspace(0, n - 1, min(n, taille)).astype(np.int64) if n else np.zeros(0, dtype=np.int64)
+
+
+def dissequer_echantillon(fichier, numeros):
+    for i in numeros:
+        dissequer(*fichier.lire(int(i)))
+
+
+def resumer_pages(fichier, pages, nb_lignes):
+    # Le travail des lignes de show_packets sans fenêtre : résumés de pages
+    # réparties sur tout le fichier, par le décodeur rapide (scapy en secours).
+    for debut in echantillon(max(1, len(fichier) - nb_lignes), pages):
+        resumer_lignes(fichier, range(int(debut), min(len(fichier), int(debut) + nb_lignes)))
+
+
+def afficher_pages(fichier, pages):
+    # show_packets dans un Tk caché : renvoie None sans affichage (à lancer
+    # sous xvfb-run sur un serveur).
+    try:
+        root = ypcap.tk.Tk()
+    except ypcap.tk.TclError:
+        return None
+    root.withdraw()
+    try:
+        table = ypcap.TablePaquets(root, fichier, lambda: None, lambda fenetre: None)
+        table.window.withdraw()
+        lignes = 0
+        debut = time.perf_counter()
+        for position in echantillon(max(1, len(fichier) - table.nb_lignes), pages):
+            table.debut = int(position)
+            table.rafraichir()
+            root.update_idletasks()
+            lignes += len(table.table.get_children())
+        return time.perf_counter() - debut, lignes
+    finally:
+        root.destroy()
+
+
+def mesurer(chemin, taille_mo, args):
+    mesures = {}
+    memoire = {}
+    debits = {}
+
+    def etape(nom, fonction, paquets):
+        duree, crete, resultat = chronometrer(fonction)
+        mesures[nom] = duree
+        memoire[nom] = crete
+        debits[nom] = paquets / duree if duree and paquets else None
+        return resultat
+
+    supprimer_index(chemin)
+    fichier, flux = etape("chargement", lambda: charger(chemin, args.processus), 0)
+    n = len(fichier)
+    debits["chargement"] = n / mesures["chargement"]
+    fichier.fermer()
+    # Réouverture avec l'index et les flux en cache, comme un second chargement du même fichier.
+    fichier, flux = etape("chargement_cache", lambda: charger(chemin, args.processus), n)
+
+    numeros = echantillon(n, args.echantillon)
+    etape("dissection", lambda: dissequer_echantillon(fichier, numeros), len(numeros))
+    etape("resumes", lambda: resumer_pages(fichier, args.pages, 30), args.pages * 30)
+    affichage = etape("affichage", lambda: afficher_pages(fichier, args.pages), 0)
+    if affichage is None:
+        del mesures["affichage"], memoire["affichage"], debits["affichage"]
+        print("  affichage ignoré : pas d'affichage pour Tk")
+    else:
+        mesures["affichage"], lignes = affichage
+        debits["affichage"] = lignes / mesures["affichage"]
+
+    sortie = os.path.join(args.repertoire, "bench_ypcap_sortie")
+    try:
+        etape("enregistrement_pcap", lambda: fichier.enregistrer_pcap(sortie + ".pcap"), n)
+        etape("enregistrement_pcapng", lambda: fichier.enregistrer_pcap(sortie + ".pcapng"), n)
+    finally:
+        for extension in (".pcap", ".pcapng"):
+            if os.path.exists(sortie + extension):
+                os.remove(sortie + extension)
+
+    filtres = {}
+    enregistrements = fichier.enregistrements(0, n)
+    for texte in FILTRES:
+        duree, _, indices = chronometrer(lambda: Filtre(texte).indices(enregistrements))
+        filtres[texte] = {"secondes": duree, "paquets_s": n / duree if duree else None,
+                          "correspondances": len(indices)}
+    fichier.fermer()
+    return {"taille_mo": taille_mo, "octets": os.path.getsize(chemin), "paquets": n, "flux": len(flux),
+            "protocoles": {nom: paquets for nom, paquets, _ in flux.top_protocoles(len(MELANGE) + 2)},
+            "mesures": mesures, "debits": debits, "memoire": memoire, "filtres": filtres}
+
+
+def comparer_reference(resultats, reference, tolerance):
+    # Une durée ou un pic de mémoire régresse s'il dépasse celui de la référence,
+    # pour la même capture, de plus de « tolerance » (écart relatif).
+    anciens = {(r["taille_mo"], r["paquets"]): r for r in reference["resultats"]}
+    regressions = []
+    for r in resultats:
+        ancien = anciens.get((r["taille_mo"], r["paquets"]))
+        if ancien is None:
+            continue
+        valeurs_avant = {**ancien["mesures"], **{f"memoire_{k}": v for k, v in ancien["memoire"].items()},
+                         **{f"filtre {k}": v["secondes"] for k, v in ancien["filtres"].items()}}
+        valeurs = {**r["mesures"], **{f"memoire_{k}": v for k, v in r["memoire"].items()},
+                   **{f"filtre {k}": v["secondes"] for k, v in r["filtres"].items()}}
+        for cle, valeur in valeurs.items():
+            avant = valeurs_avant.get(cle)
+            if avant and valeur > avant * (1 + tolerance):
+                regressions.append((r["taille_mo"], cle, avant, valeur))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesures de la chaîne de lecture et d'analyse de YPCAP sur des "
+                                                 "captures synthétiques, sans trafic réel.")
+    parser.add_argument("--tailles", type=int, nargs="+", default=[10, 100],
+                        help="tailles des captures générées, en Mo")
+    parser.add_argument("--graine", type=int, default=0)
+    parser.add_argument("--repertoire", default=tempfile.gettempdir(),
+                        help="répertoire des captures générées (gardées d'une exécution à l'autre)")
+    parser.add_argument("--regenerer", action="store_true", help="régénère les captures même si elles existent")
+    parser.add_argument("--processus", type=int, default=None,
+                        help="processus de l'analyse parallèle (défaut : tous les cœurs)")
+    parser.add_argument("--echantillon", type=int, default=20000, help="paquets disséqués par scapy")
+    parser.add_argument("--pages", type=int, default=200, help="pages de la liste résumées et affichées")
+    parser.add_argument("--sortie", default="bench_ypcap.json", help="fichier JSON des résultats")
+    parser.add_argument("--reference", help="résultats JSON d'une exécution précédente")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="écart relatif toléré avant régression")
+    args = parser.parse_args()
+
+    resultats = []
+    for taille_mo in args.tailles:
+        chemin = capture_synthetique(args.repertoire, taille_mo, args.graine, args.regenerer)
+        r = mesurer(chemin, taille_mo, args)
+        resultats.append(r)
+        print(f"\n{taille_mo} Mo : {r['paquets']} paquets, {r['flux']} flux")
+        for cle, valeur in r["mesures"].items():
+            debit = r["debits"][cle]
+            print(f"  {cle:<24} {valeur * 1000:12.1f} ms  {debit or 0:>14,.0f} /s"
+                  f"  {r['memoire'][cle] / 1024:10.1f} Mo RSS")
+        for texte, filtre in r["filtres"].items():
+            print(f"  filtre {texte!r:<45} {filtre['secondes'] * 1000:10.2f} ms  "
+                  f"{filtre['correspondances']:>10d} paquets")
+
+    rapport = {
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "plateforme": platform.platform(),
+        "python": platform.python_version(),
+        "processeurs": os.cpu_count(),
+        "versions": {"scapy": scapy.VERSION, "numpy": np.__version__},
+        "parametres": {"graine": args.graine, "processus": args.processus, "echantillon": args.echantillon,
+                       "pages": args.pages},
+        # Le pic des processus d'analyse n'entre pas dans celui des étapes.
+        "rss_crete_ko": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "rss_crete_processus_ko": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+        "resultats": resultats,
+    }
+    with open(args.sortie, "w", encoding="utf-8") as f:
+        json.dump(rapport, f, ensure_ascii=False, indent=2)
+    print(f"\nRésultats écrits dans {args.sortie}")
+
+    if args.reference:
+        with open(args.reference, encoding="utf-8") as f:
+            regressions = comparer_reference(resultats, json.load(f), args.tolerance)
+        for taille_mo, cle, avant, apres in regressions:
+            print(f"Régression {taille_mo} Mo {cle} : {avant:.6g} -> {apres:.6g}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
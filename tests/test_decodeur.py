@@ -0,0 +1,36 @@
+import os
+import shutil
+
+import numpy as np
+
+from ypcap_decodeur import LINKTYPE_ETHERNET, comparer_scapy, decoder_lot, trames_exemple
+from ypcap_lecteur import FichierCapture
+
+# Décodage rapide des en-têtes comparé à scapy, champ par champ. La capture est
+# un court échange réel sur la boucle locale : TCP, UDP et ping en IPv4 et en
+# IPv6, chaque trame vue une fois à l'émission et une fois à la réception.
+CAPTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "donnees", "loopback.pcap")
+
+
+def test_trames_exemple():
+    trames = trames_exemple()
+    decodes, ecarts = comparer_scapy(trames, [LINKTYPE_ETHERNET] * len(trames))
+    assert ecarts == []
+    assert (len(trames), decodes) == (17, 13)
+    # Restent à scapy : IP dans GRE, LLDP, une trame coupée dans l'en-tête IP et
+    # un en-tête TCP au-delà des octets lus.
+    assert np.flatnonzero(~decoder_lot(trames)["decode"]).tolist() == [12, 13, 14, 16]
+
+
+def test_capture_boucle_locale(tmp_path):
+    # Copiée pour que les index en cache ne s'écrivent pas dans le dépôt.
+    chemin = shutil.copy(CAPTURE, tmp_path)
+    fichier = FichierCapture(chemin)
+    fichier.indexer()
+    try:
+        trames = [fichier.brut(i) for i in range(len(fichier))]
+        decodes, ecarts = comparer_scapy(trames, fichier.linktypes)
+    finally:
+        fichier.fermer()
+    assert ecarts == []
+    assert (len(trames), decodes) == (56, 56)
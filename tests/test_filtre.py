@@ -0,0 +1,75 @@
+import pytest
+
+from ypcap_decodeur import decoder_lot, trames_exemple
+from ypcap_filtre import ErreurFiltre, Filtre
+
+# Filtres d'affichage évalués sur l'index des trames d'exemple du décodeur :
+#   0 TCP 10.0.0.1 -> 10.0.0.2:80      1, 5 TCP 127.0.0.1 -> :80 (5 en QinQ)
+#   2 UDP 53 -> 5353, 4 UDP DNS en VLAN, 10 UDP DNS, 3 ping, 11 fragment IPv4
+#   6 ARP, 7 TCP IPv6 443 -> 50000, 8 UDP IPv6 après extensions, 9 ping IPv6
+#   12 GRE, 13 LLDP, 14 IP coupée, 15 TCP -> :22, 16 TCP IPv6 hors fenêtre
+# Les trames 12 à 14 et 16 restent à scapy : seuls leurs en-têtes lus sont indexés.
+
+
+@pytest.fixture(scope="module")
+def enregistrements():
+    return decoder_lot(trames_exemple())
+
+
+@pytest.mark.parametrize("texte, attendus", [
+    ("tcp", [0, 1, 5, 7, 15]),
+    ("arp", [6]),
+    ("ipv6", [7, 8, 9, 16]),
+    ("tcp and ip.src == 10.0.0.1", [0]),
+    ("tcp && ipv6", [7]),
+    ("arp or icmp", [3, 6]),
+    ("udp || icmp", [2, 3, 4, 8, 10]),
+    ("not (tcp or udp or ip or ipv6)", [6, 13, 14]),
+    ("!tcp and ipv6", [8, 9, 16]),
+    ("tcp.port == 80 and not ip.src == 10.0.0.1", [1, 5]),
+])
+def test_operateurs_logiques(enregistrements, texte, attendus):
+    assert Filtre(texte).indices(enregistrements).tolist() == attendus
+
+
+@pytest.mark.parametrize("texte, attendus", [
+    ("tcp.port == 80", [0, 1, 5]),
+    ("tcp.dstport > 1024", [7]),
+    ("udp.dstport >= 53 and udp.dstport < 54", [4, 8, 10]),
+    ("frame.len > 100", [16]),
+    ("ip.addr == 10.0.0.0/8", [0]),
+    ("ip.dst == 10.0.0.2", [0]),
+    ("tcp.flags.syn == 1", [0, 5, 7, 15]),
+    ("icmp.type == 8", [3]),
+])
+def test_comparaisons(enregistrements, texte, attendus):
+    assert Filtre(texte).indices(enregistrements).tolist() == attendus
+
+
+def test_champ_absent(enregistrements):
+    # « != » demande le champ : ni l'ARP ni l'IPv6 ne sont retenus, à la
+    # différence de la négation de « == ».
+    assert Filtre("ip.src != 10.0.0.1").indices(enregistrements).tolist() == [1, 2, 3, 4, 5, 10, 11, 12, 15]
+    assert Filtre("not ip.src == 10.0.0.1").indices(enregistrements).tolist() == \
+        [i for i in range(len(enregistrements)) if i != 0]
+    # Un champ composé est différent si aucune de ses composantes n'est égale.
+    assert Filtre("tcp.port != 80").indices(enregistrements).tolist() == [7, 15]
+    assert Filtre("udp.port != 5353").indices(enregistrements).tolist() == [4, 8, 10]
+
+
+@pytest.mark.parametrize("texte, position", [
+    ("", None),
+    ("tcp and", 7),
+    ("(tcp", 4),
+    ("tcp )", 4),
+    ("ip.src = 10.0.0.1", 7),
+    ("tcp or or udp", 7),
+    ("foo.bar == 1", 0),
+    ("ip.src == 10.0.0", 10),
+    ("tcp.port == http", 12),
+    ("ip.addr > 10.0.0.0/8", 10),
+])
+def test_erreurs_de_syntaxe(texte, position):
+    with pytest.raises(ErreurFiltre) as erreur:
+        Filtre(texte)
+    assert erreur.value.position == position
@@ -0,0 +1,156 @@
+import random
+
+import networkx as nx
+import pytest
+
+from yggraph_moteur import GrapheCSR, ModeleGraphe
+
+# Les parcours et plus courts chemins du CSR doivent rendre exactement ce que
+# rend networkx (mêmes arêtes, dans le même ordre, et même chemin entre deux
+# chemins de même poids), sur de petits graphes tirés à graine fixe. Annuler
+# puis rétablir une suite de commandes doit ramener le modèle à chaque état vu.
+
+
+def graphe_aleatoire(n, m, graine, poids_max=20):
+    rng = random.Random(graine)
+    G = nx.MultiDiGraph()
+    G.add_nodes_from(str(i) for i in range(n))
+    for _ in range(m):
+        G.add_edge(str(rng.randrange(n)), str(rng.randrange(n)), weight=rng.randint(1, poids_max))
+    return G
+
+
+def graphe_disjoint():
+    # Deux composantes orientées, des sommets isolés, une boucle et des arêtes
+    # parallèles de poids différents.
+    G = nx.MultiDiGraph()
+    G.add_nodes_from("abcdefghij")
+    G.add_edges_from([("a", "b", {"weight": 4}), ("a", "b", {"weight": 1}), ("b", "c", {"weight": 2}),
+                      ("c", "a", {"weight": 1}), ("a", "d", {"weight": 9}), ("c", "d", {"weight": 3}),
+                      ("d", "d", {"weight": 1}), ("f", "g", {"weight": 1}), ("g", "h", {"weight": 2}),
+                      ("h", "f", {"weight": 5})])
+    return G
+
+
+def graphe_egalites():
+    # Grille orientée de poids égaux : chaque sommet éloigné a de nombreux plus
+    # courts chemins, le choix doit être celui de networkx.
+    G = nx.MultiDiGraph()
+    for i in range(4):
+        for j in range(4):
+            G.add_node((i, j))
+            if i < 3:
+                G.add_edge((i, j), (i + 1, j), weight=1)
+            if j < 3:
+                G.add_edge((i, j), (i, j + 1), weight=1)
+    G.add_edge((3, 3), (0, 0), weight=6)
+    return G
+
+
+def graphe_sans_poids():
+    G = nx.MultiDiGraph(nx.gnm_random_graph(25, 40, seed=3, directed=True))
+    G.add_node("seul")
+    return G
+
+
+GRAPHES = {
+    "aleatoire_creux": lambda: graphe_aleatoire(30, 35, graine=1),
+    "aleatoire_dense": lambda: graphe_aleatoire(20, 120, graine=2),
+    "poids_egaux": lambda: graphe_aleatoire(25, 60, graine=3, poids_max=1),
+    "poids_proches": lambda: graphe_aleatoire(25, 60, graine=4, poids_max=3),
+    "disjoint": graphe_disjoint,
+    "grille": graphe_egalites,
+    "sans_poids": graphe_sans_poids,
+}
+
+
+def chemin_nx(G, s, t):
+    try:
+        return nx.dijkstra_path(G, s, t)
+    except nx.NetworkXNoPath:
+        return None
+
+
+@pytest.fixture(params=sorted(GRAPHES))
+def graphe(request):
+    return GRAPHES[request.param]()
+
+
+# Frontière vectorisée dès le premier niveau ou jamais, pour couvrir les deux
+# branches du BFS sur des graphes de cette taille.
+@pytest.mark.parametrize("frontiere", [1, 10 ** 9])
+def test_parcours(graphe, frontiere, monkeypatch):
+    monkeypatch.setattr(GrapheCSR, "FRONTIERE_VECTORISEE", frontiere)
+    csr = GrapheCSR(graphe)
+    for s in graphe.nodes:
+        assert csr.bfs_aretes(s) == list(nx.bfs_edges(graphe, s))
+        assert csr.dfs_aretes(s) == list(nx.dfs_edges(graphe, s))
+
+
+def test_dijkstra(graphe):
+    csr = GrapheCSR(graphe)
+    paires = [(s, t) for s in graphe.nodes for t in graphe.nodes]
+    attendus = [chemin_nx(graphe, s, t) for s, t in paires]
+    for (s, t), attendu in zip(paires, attendus):
+        if attendu is None:
+            with pytest.raises(nx.NetworkXNoPath):
+                csr.dijkstra_chemin(s, t)
+        else:
+            assert csr.dijkstra_chemin(s, t) == attendu
+    # En un appel, depuis le cache des arbres puis sur un CSR neuf.
+    assert csr.dijkstra_chemins(paires, processus=1) == attendus
+    assert GrapheCSR(graphe).dijkstra_chemins(paires, processus=1) == attendus
+
+
+def etat(modele):
+    # Graphe (clés et attributs des arêtes compris), positions, index spatial et
+    # degrés tenus à jour par le modèle.
+    G = modele.G
+    aretes = sorted((u, v, k, sorted(d.items())) for u, v, k, d in G.edges(keys=True, data=True))
+    proprietes = modele.proprietes
+    return (sorted(G.nodes), aretes, {n: tuple(p) for n, p in modele.pos.items()}, dict(modele.index.positions),
+            dict(proprietes.entrants), dict(proprietes.sortants), proprietes.nb_aretes, proprietes.desequilibres)
+
+
+def test_annuler_retablir():
+    G = graphe_aleatoire(6, 10, graine=5)
+    modele = ModeleGraphe(G, {n: [i / 10, 0.5] for i, n in enumerate(G.nodes)})
+    commandes = [
+        lambda: modele.ajouter_noeud("x", (0.9, 0.9)),
+        lambda: (modele.ajouter_lien("x", "0", weight=3), modele.ajouter_lien("x", "0", weight=5),
+                 modele.ajouter_lien("x", "x", weight=1), modele.ajouter_lien("0", "x")),
+        lambda: modele.ajouter_lien("1", "2", weight=7),
+        lambda: modele.deplacer_noeud("3", (0.2, 0.8)),
+        # Reste l'arête parallèle de clé 1, qui doit la retrouver une fois rétablie.
+        lambda: modele.retirer_lien("x", "0", 0),
+        lambda: modele.retirer_noeud("x"),
+        lambda: modele.retirer_noeud("1"),
+        # Glisser : positions posées sans être notées, puis notées en une fois.
+        lambda: (modele.placer("2", (0.6, 0.1)), modele.placer("4", (0.7, 0.2)),
+                 modele.noter_deplacements({"2": (0.2, 0.5), "4": (0.4, 0.5)})),
+        lambda: modele.ajouter_noeud("1", (0.3, 0.3)),
+        lambda: modele.vider(),
+    ]
+    etats = [etat(modele)]
+    for commande in commandes:
+        modele.commencer()
+        commande()
+        etats.append(etat(modele))
+
+    for attendu in reversed(etats[:-1]):
+        assert modele.annuler()
+        assert etat(modele) == attendu
+    assert not modele.annuler()
+    for attendu in etats[1:]:
+        assert modele.retablir()
+        assert etat(modele) == attendu
+    assert not modele.retablir()
+
+    # Une nouvelle commande après des annulations efface les commandes à rétablir.
+    modele.annuler()
+    modele.annuler()
+    modele.commencer()
+    modele.ajouter_noeud("y", (0.1, 0.1))
+    assert not modele.retablir()
+    assert modele.annuler()
+    assert etat(modele) == etats[-3]
@@ -0,0 +1,79 @@
+import random
+
+from ypcap_decodeur import LINKTYPE_ETHERNET, decoder_lot, trames_exemple
+from ypcap_stockage import StockageCapture
+
+# Tampon circulaire des trames capturées : au-delà de la capacité (en paquets
+# ou en octets), les plus anciennes sont évincées et les numéros absolus
+# continuent depuis le début de la capture (premier = total - len).
+
+
+def trames_aleatoires(n, graine, longueur_max=300):
+    tirage = random.Random(graine)
+    return [bytes(tirage.randrange(256) for _ in range(tirage.randint(1, longueur_max))) for _ in range(n)]
+
+
+def ajouter(stockage, trames, debut=0):
+    # Arguments reconnaissables par numéro : horodatage, longueur d'origine et
+    # interface sont tirés du numéro de la trame.
+    for numero, donnees in enumerate(trames, debut):
+        stockage.ajouter(donnees, 1000.0 + numero / 8, len(donnees) + numero, LINKTYPE_ETHERNET, numero % 3)
+
+
+def verifier(stockage, trames):
+    # Chaque paquet conservé doit rendre la trame de son numéro absolu.
+    for i in range(len(stockage)):
+        numero = stockage.premier + i
+        assert stockage.lire(i) == (trames[numero], 1000.0 + numero / 8, len(trames[numero]) + numero,
+                                    LINKTYPE_ETHERNET)
+        assert stockage.interface(i) == numero % 3
+
+
+def test_capacite_en_paquets():
+    trames = trames_aleatoires(50, graine=1)
+    stockage = StockageCapture(max_paquets=8, max_octets=1 << 20)
+    ajouter(stockage, trames)
+    assert (len(stockage), stockage.total, stockage.premier, stockage.evinces) == (8, 50, 42, 42)
+    verifier(stockage, trames)
+
+
+def test_capacite_en_octets():
+    # Trames de 300 octets dans 1024 : trois tiennent, la quatrième repart au
+    # début du tampon et évince la plus ancienne.
+    trames = [bytes([n]) * 300 for n in range(10)]
+    stockage = StockageCapture(max_paquets=100, max_octets=1024)
+    ajouter(stockage, trames)
+    assert (len(stockage), stockage.premier, stockage.octets_utilises) == (3, 7, 900)
+    verifier(stockage, trames)
+
+    trames = trames_aleatoires(400, graine=2)
+    stockage = StockageCapture(max_paquets=100, max_octets=1024)
+    for numero, donnees in enumerate(trames):
+        ajouter(stockage, [donnees], numero)
+        assert stockage.premier + len(stockage) == numero + 1
+        assert stockage.octets_utilises == sum(len(t) for t in trames[stockage.premier:numero + 1]) <= 1024
+    verifier(stockage, trames)
+
+
+def test_enregistrements_incrementaux():
+    # L'index des en-têtes, complété par morceaux au fil des ajouts et des
+    # évictions, doit rester celui d'un décodage de toutes les trames conservées.
+    trames = trames_exemple() * 3
+    stockage = StockageCapture(max_paquets=10, max_octets=1 << 20)
+
+    def attendus(debut, fin):
+        numeros = range(stockage.premier + debut, stockage.premier + min(fin, len(stockage)))
+        return decoder_lot([trames[n] for n in numeros], [1000.0 + n / 8 for n in numeros],
+                           [len(trames[n]) + n for n in numeros])
+
+    for fin in (6, 15, 16, len(trames)):
+        ajouter(stockage, trames[stockage.total:fin], stockage.total)
+        assert stockage.enregistrements(0, len(stockage)).tobytes() == attendus(0, len(stockage)).tobytes()
+        assert stockage.enregistrements(2, 5).tobytes() == attendus(2, 5).tobytes()
+    verifier(stockage, trames)
+
+    stockage.vider()
+    trames = trames[5:]
+    ajouter(stockage, trames[:4])
+    assert (len(stockage), stockage.premier) == (4, 0)
+    assert stockage.enregistrements(0, 20).tobytes() == attendus(0, 20).tobytes()
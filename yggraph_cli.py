@@ -0,0 +1,77 @@
+import argparse
+import json
+import sys
+
+import networkx as nx
+
+from yggraph_fichiers import lire_aretes
+from yggraph_moteur import ModeleGraphe
+
+
+def parcours(modele, sources, nature):
+    resultats = []
+    for source in sources:
+        if source not in modele.G:
+            resultats.append({"source": source, "erreur": "Sommet inexistant"})
+        elif nature == "bfs":
+            resultats.append({"source": source, "aretes": modele.parcours_bfs(source)})
+        else:
+            resultats.append({"source": source, "aretes": modele.parcours_dfs(source)})
+    return resultats
+
+
+def chemins(modele, paires, processus=None):
+    if not modele.est_pondere():
+        return [{"source": s, "cible": t, "erreur": "Graphe non pondéré"} for s, t in paires]
+    valides = [(s, t) for s, t in paires if s in modele.G and t in modele.G]
+    trouves = dict(zip(valides, modele.plus_courts_chemins(valides, processus)))
+    resultats = []
+    for s, t in paires:
+        if (s, t) in trouves:
+            resultats.append({"source": s, "cible": t, "chemin": trouves[(s, t)]})
+        else:
+            resultats.append({"source": s, "cible": t, "erreur": "Sommet inexistant"})
+    return resultats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Analyse d'un graphe YGgraph sans interface graphique ; le résultat est écrit en JSON.")
+    parser.add_argument("fichier", help="graphe .gml, .ygb ou liste d'arêtes (.csv, .tsv, .txt, .edges)")
+    parser.add_argument("--verifier", action="store_true", help="type du graphe, comme le bouton Vérifier")
+    parser.add_argument("--bfs", metavar="SOMMET", action="append", default=[], help="parcours en largeur")
+    parser.add_argument("--dfs", metavar="SOMMET", action="append", default=[], help="parcours en profondeur")
+    parser.add_argument("--dijkstra", metavar=("SOURCE", "CIBLE"), nargs=2, action="append", default=[],
+                        help="plus court chemin pondéré")
+    parser.add_argument("--chemins", metavar="FICHIER", help="couples source,cible à calculer par lots")
+    parser.add_argument("--processus", type=int, default=None,
+                        help="nombre de processus pour les chemins par lots")
+    parser.add_argument("--indent", type=int, default=None, help="indentation du JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        modele = ModeleGraphe.depuis_fichier(args.fichier)
+        paires = [tuple(p) for p in args.dijkstra]
+        if args.chemins:
+            paires += [(source, cible) for source, cible, _ in lire_aretes(args.chemins)]
+    except (OSError, ValueError, nx.NetworkXError) as e:
+        print(f"Lecture impossible : {e}", file=sys.stderr)
+        return 1
+
+    resultat = {"fichier": args.fichier, "sommets": modele.G.number_of_nodes(),
+                "aretes": modele.G.number_of_edges()}
+    if args.verifier:
+        resultat["type"] = modele.classer()
+    if args.bfs:
+        resultat["bfs"] = parcours(modele, args.bfs, "bfs")
+    if args.dfs:
+        resultat["dfs"] = parcours(modele, args.dfs, "dfs")
+    if paires:
+        resultat["dijkstra"] = chemins(modele, paires, args.processus)
+    json.dump(resultat, sys.stdout, ensure_ascii=False, indent=args.indent)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
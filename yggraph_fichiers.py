@@ -0,0 +1,208 @@
+import csv
+import json
+import os
+import struct
+
+import networkx as nx
+import numpy as np
+
+# Format binaire YGgraph (.ygb) : un en-tête JSON suivi de tableaux NumPy bruts
+# alignés sur 64 octets, lisibles par np.memmap sans analyse du fichier.
+#   noms, noms_decalages  : noms des sommets en UTF-8 concaténés et leurs bornes
+#   pos                   : positions (n, 2)
+#   src, dst, cles        : arêtes (indices de sommets et clés du multigraphe)
+#   poids, a_poids        : poids des arêtes et présence de l'attribut 'weight'
+MAGIQUE = b"YGGRAPHB"
+VERSION_FORMAT = 1
+ALIGNEMENT = 64
+EXTENSIONS_LISTE_ARETES = (".csv", ".tsv", ".txt", ".edges", ".edgelist")
+
+
+def _aligner(decalage):
+    return -(-decalage // ALIGNEMENT) * ALIGNEMENT
+
+
+def enregistrer_binaire(G, pos, chemin):
+    noeuds = list(G.nodes)
+    indices = {n: i for i, n in enumerate(noeuds)}
+    noms = [str(n).encode("utf-8") for n in noeuds]
+    longueurs = np.fromiter((len(nom) for nom in noms), dtype=np.int64, count=len(noms))
+    m = G.number_of_edges()
+    src = np.empty(m, dtype=np.int64)
+    dst = np.empty(m, dtype=np.int64)
+    cles = np.empty(m, dtype=np.int64)
+    poids = np.zeros(m, dtype=np.float64)
+    a_poids = np.zeros(m, dtype=np.bool_)
+    for i, (u, v, k, d) in enumerate(G.edges(keys=True, data=True)):
+        if not isinstance(k, (int, np.integer)):
+            raise ValueError(f"Clé d'arête non entière : {k!r}")
+        src[i], dst[i], cles[i] = indices[u], indices[v], k
+        if 'weight' in d:
+            poids[i] = d['weight']
+            a_poids[i] = True
+    tableaux = {
+        "noms": np.frombuffer(b"".join(noms), dtype=np.uint8),
+        "noms_decalages": np.concatenate(([0], np.cumsum(longueurs))).astype(np.int64),
+        "pos": np.array([pos.get(n, (np.nan, np.nan)) for n in noeuds], dtype=np.float64).reshape(-1, 2),
+        "src": src,
+        "dst": dst,
+        "cles": cles,
+        "poids": poids,
+        "a_poids": a_poids,
+    }
+    description = {}
+    decalage = 0
+    for nom, tableau in tableaux.items():
+        description[nom] = {"dtype": tableau.dtype.str, "forme": list(tableau.shape), "decalage": decalage}
+        decalage = _aligner(decalage + tableau.nbytes)
+    entete = json.dumps({"nb_noeuds": len(noeuds), "nb_aretes": m, "tableaux": description}).encode("utf-8")
+    debut_donnees = _aligner(len(MAGIQUE) + 8 + len(entete))
+    with open(chemin, "wb") as f:
+        f.write(MAGIQUE + struct.pack("<II", VERSION_FORMAT, len(entete)) + entete)
+        for nom, tableau in tableaux.items():
+            f.seek(debut_donnees + description[nom]["decalage"])
+            f.write(np.ascontiguousarray(tableau).tobytes())
+        f.truncate(debut_donnees + decalage)
+
+
+class GrapheBinaire:
+    # Vue en lecture seule d'un fichier .ygb : les tableaux sont projetés en mémoire
+    # et ne sont lus que lorsqu'on y accède.
+    def __init__(self, chemin):
+        with open(chemin, "rb") as f:
+            prefixe = f.read(len(MAGIQUE) + 8)
+            if prefixe[:len(MAGIQUE)] != MAGIQUE:
+                raise ValueError(f"{chemin} n'est pas un graphe binaire YGgraph")
+            version, longueur = struct.unpack("<II", prefixe[len(MAGIQUE):])
+            if version != VERSION_FORMAT:
+                raise ValueError(f"Version de format non prise en charge : {version}")
+            entete = json.loads(f.read(longueur).decode("utf-8"))
+        debut_donnees = _aligner(len(MAGIQUE) + 8 + longueur)
+        self.nb_noeuds = entete["nb_noeuds"]
+        self.nb_aretes = entete["nb_aretes"]
+        for nom, desc in entete["tableaux"].items():
+            forme = tuple(desc["forme"])
+            if 0 in forme:
+                tableau = np.empty(forme, dtype=desc["dtype"])
+            else:
+                tableau = np.memmap(chemin, dtype=desc["dtype"], mode="r", shape=forme,
+                                    offset=debut_donnees + desc["decalage"])
+            setattr(self, nom, tableau)
+
+    def noms_noeuds(self):
+        octets = self.noms.tobytes()
+        bornes = self.noms_decalages.tolist()
+        return [octets[a:b].decode("utf-8") for a, b in zip(bornes, bornes[1:])]
+
+    def positions(self):
+        return {n: [x, y] for n, (x, y) in zip(self.noms_noeuds(), self.pos.tolist()) if x == x and y == y}
+
+    def vers_networkx(self):
+        noms = self.noms_noeuds()
+        G = nx.MultiDiGraph()
+        G.add_nodes_from(noms)
+        G.add_edges_from(
+            (noms[s], noms[d], k, {'weight': w} if a else {})
+            for s, d, k, w, a in zip(self.src.tolist(), self.dst.tolist(), self.cles.tolist(),
+                                     self.poids.tolist(), self.a_poids.tolist()))
+        return G
+
+
+def charger_binaire(chemin):
+    graphe = GrapheBinaire(chemin)
+    return graphe.vers_networkx(), graphe.positions()
+
+
+def enregistrer_gml(G, pos, chemin):
+    H = G.copy()
+    for n, (x, y) in pos.items():
+        H.nodes[n]['x'] = float(x)
+        H.nodes[n]['y'] = float(y)
+    nx.write_gml(H, chemin)
+
+
+def charger_gml(chemin):
+    H = nx.read_gml(chemin)
+    G = nx.MultiDiGraph()
+    pos = {}
+    for n, d in H.nodes(data=True):
+        G.add_node(n)
+        if 'x' in d and 'y' in d:
+            pos[n] = [d['x'], d['y']]
+    if H.is_multigraph():
+        G.add_edges_from((u, v, k, d) for u, v, k, d in H.edges(keys=True, data=True))
+    else:
+        G.add_edges_from(H.edges(data=True))
+    return G, pos
+
+
+def _detecter_separateur(ligne):
+    for separateur in (",", ";", "\t"):
+        if separateur in ligne:
+            return separateur
+    return None
+
+
+def _est_nombre(texte):
+    try:
+        float(texte)
+        return True
+    except ValueError:
+        return False
+
+
+def lire_aretes(chemin):
+    # Lit une liste d'arêtes « source, cible[, poids] » (CSV, TSV ou colonnes
+    # séparées par des espaces) ligne à ligne et rend (source, cible, poids ou
+    # None). Le séparateur est celui de la première ligne utile ; les lignes
+    # vides, les commentaires (# ou %) et une ligne d'en-tête sont sautés.
+    separateur = None
+    premiere = True
+    with open(chemin, newline="", encoding="utf-8") as f:
+        for ligne in f:
+            ligne = ligne.strip()
+            if not ligne or ligne[0] in "#%":
+                continue
+            if premiere:
+                separateur = _detecter_separateur(ligne)
+            champs = next(csv.reader([ligne], delimiter=separateur)) if separateur else ligne.split()
+            champs = [c.strip() for c in champs]
+            if premiere:
+                premiere = False
+                # Une ligne d'en-tête (source,target,weight) est ignorée.
+                if (len(champs) >= 3 and not _est_nombre(champs[2])) \
+                        or [c.lower() for c in champs[:2]] in (["source", "target"], ["source", "cible"]):
+                    continue
+            if len(champs) < 2:
+                raise ValueError(f"Ligne invalide dans {chemin} : {ligne!r}")
+            yield champs[0], champs[1], float(champs[2]) if len(champs) >= 3 and champs[2] else None
+
+
+def importer_liste_aretes(chemin, taille_bloc=100000, G=None):
+    # Import en flux : les arêtes sont ajoutées par blocs, sans jamais garder le
+    # texte du fichier en mémoire.
+    G = nx.MultiDiGraph() if G is None else G
+    bloc = []
+    for source, cible, poids in lire_aretes(chemin):
+        bloc.append((source, cible, {} if poids is None else {'weight': poids}))
+        if len(bloc) >= taille_bloc:
+            G.add_edges_from(bloc)
+            bloc.clear()
+    G.add_edges_from(bloc)
+    return G
+
+
+def enregistrer(G, pos, chemin):
+    if chemin.lower().endswith(".ygb"):
+        enregistrer_binaire(G, pos, chemin)
+    else:
+        enregistrer_gml(G, pos, chemin)
+
+
+def charger(chemin):
+    extension = os.path.splitext(chemin)[1].lower()
+    if extension == ".ygb":
+        return charger_binaire(chemin)
+    if extension in EXTENSIONS_LISTE_ARETES:
+        return importer_liste_aretes(chemin), {}
+    return charger_gml(chemin)
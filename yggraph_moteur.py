@@ -0,0 +1,872 @@
+import heapq
+import itertools
+import math
+import os
+import queue
+import random
+import threading
+import time
+from array import array
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import networkx as nx
+import numpy as np
+
+import yggraph_fichiers
+
+
+# Journal d'opérations inverses pour Annuler/Rétablir : chaque commande est la liste
+# des opérations élémentaires qu'elle a effectuées, donc annuler ou rétablir coûte
+# la taille du changement et non celle du graphe.
+INVERSES = {
+    "ajout_sommet": "retrait_sommet",
+    "retrait_sommet": "ajout_sommet",
+    "ajout_arete": "retrait_arete",
+    "retrait_arete": "ajout_arete",
+}
+
+
+def inverser(op):
+    if op[0] == "deplacement":
+        return ("deplacement", op[1], op[3], op[2])
+    return (INVERSES[op[0]],) + op[1:]
+
+
+class HistoriqueDeltas:
+    def __init__(self, profondeur_max=200, operations_max=500000):
+        self.profondeur_max = profondeur_max
+        self.operations_max = operations_max
+        self.history = deque()
+        self.future = []
+        self.nb_operations = 0
+        self.en_rejeu = False
+        self._courante = None
+
+    def commencer(self):
+        # La commande n'est créée qu'à la première opération : une action annulée
+        # par une erreur de saisie ne laisse pas d'entrée vide dans l'historique.
+        self._courante = None
+
+    def noter(self, op):
+        if self.en_rejeu:
+            return
+        if self._courante is None:
+            self._courante = []
+            self.history.append(self._courante)
+            for commande in self.future:
+                self.nb_operations -= len(commande)
+            self.future.clear()
+        self._courante.append(op)
+        self.nb_operations += 1
+        self._elaguer()
+
+    def _elaguer(self):
+        while len(self.history) > 1 and (len(self.history) > self.profondeur_max
+                                         or self.nb_operations > self.operations_max):
+            self.nb_operations -= len(self.history.popleft())
+
+    def annuler(self):
+        if not self.history:
+            return None
+        commande = self.history.pop()
+        self.future.append(commande)
+        self._courante = None
+        return [inverser(op) for op in reversed(commande)]
+
+    def retablir(self):
+        if not self.future:
+            return None
+        commande = self.future.pop()
+        self.history.append(commande)
+        self._courante = None
+        return list(commande)
+
+    def vider(self):
+        self.history.clear()
+        self.future.clear()
+        self.nb_operations = 0
+        self._courante = None
+
+
+# Index spatial en grille uniforme sur les positions des sommets : une cellule a la
+# taille du rayon de sélection, donc un test ne regarde que les 3x3 cellules voisines.
+class GrilleSpatiale:
+    RAYON = math.sqrt(0.02)
+    ESSAIS_ALEATOIRES = 30
+
+    def __init__(self, rayon=RAYON):
+        self.rayon = rayon
+        self.cellules = {}
+        self.positions = {}
+        self._spirale = None
+
+    def _cellule(self, x, y):
+        return (math.floor(x / self.rayon), math.floor(y / self.rayon))
+
+    def inserer(self, n, p):
+        self.positions[n] = (p[0], p[1])
+        self.cellules.setdefault(self._cellule(p[0], p[1]), set()).add(n)
+
+    def retirer(self, n):
+        x, y = self.positions.pop(n)
+        cellule = self._cellule(x, y)
+        self.cellules[cellule].discard(n)
+        if not self.cellules[cellule]:
+            del self.cellules[cellule]
+        self._spirale = None
+
+    def deplacer(self, n, p):
+        self.retirer(n)
+        self.inserer(n, p)
+
+    def plus_proche(self, x, y, rayon=None):
+        rayon = self.rayon if rayon is None else rayon
+        cx, cy = self._cellule(x, y)
+        portee = math.ceil(rayon / self.rayon)
+        meilleur, meilleure_distance = None, rayon * rayon
+        for i in range(cx - portee, cx + portee + 1):
+            for j in range(cy - portee, cy + portee + 1):
+                for n in self.cellules.get((i, j), ()):
+                    px, py = self.positions[n]
+                    d = (px - x) ** 2 + (py - y) ** 2
+                    if d < meilleure_distance:
+                        meilleur, meilleure_distance = n, d
+        return meilleur
+
+    def est_libre(self, x, y):
+        return self.plus_proche(x, y) is None
+
+    def position_libre(self, centre=(0.5, 0.5)):
+        if self._spirale is None:
+            for _ in range(self.ESSAIS_ALEATOIRES):
+                angle = random.uniform(0, 2 * math.pi)
+                radius = random.uniform(0.1, 0.4)
+                x = centre[0] + radius * math.cos(angle)
+                y = centre[1] + radius * math.sin(angle)
+                if self.est_libre(x, y):
+                    return [x, y]
+            self._spirale = self._parcours_spirale(centre)
+        # Zone encombrée : on parcourt des anneaux de cellules de plus en plus
+        # éloignés du centre. Tant qu'aucun sommet n'est retiré ou déplacé, une
+        # cellule refusée le reste, donc le parcours reprend là où il s'était arrêté.
+        for i, j in self._spirale:
+            if (i, j) in self.cellules:
+                continue
+            x, y = (i + 0.5) * self.rayon, (j + 0.5) * self.rayon
+            if self.est_libre(x, y):
+                return [x, y]
+
+    def _parcours_spirale(self, centre):
+        cx, cy = self._cellule(centre[0], centre[1])
+        yield cx, cy
+        k = 1
+        while True:
+            for i in range(cx - k, cx + k + 1):
+                yield i, cy - k
+                yield i, cy + k
+            for j in range(cy - k + 1, cy + k):
+                yield cx - k, j
+                yield cx + k, j
+            k += 1
+
+
+# Disposition par forces (Fruchterman-Reingold) vectorisée avec NumPy. Au-delà de
+# SEUIL_REPULSION_EXACTE sommets, la répulsion exercée par les cellules éloignées
+# d'une grille est approchée par leur barycentre ; seule la cellule du sommet est
+# calculée exactement.
+SEUIL_REPULSION_EXACTE = 1500
+DISTANCE_IDEALE = 0.3
+# Rappel vers le barycentre, pour que les composantes isolées ne s'éloignent pas.
+GRAVITE = 0.05
+
+
+def forces_repulsion(P, k):
+    n = len(P)
+    if n <= SEUIL_REPULSION_EXACTE:
+        return _repulsion_exacte(P, P, k)
+    # Cellules d'environ trois distances idéales, réduites tant que le graphe est
+    # encore ramassé pour garder une dizaine de sommets par cellule.
+    mini = P.min(axis=0)
+    taille = min(3 * k, max(np.max(P.max(axis=0) - mini), 1e-9) / math.sqrt(n / 10))
+    case = np.floor((P - mini) / taille).astype(np.int64)
+    occupees, cellule = np.unique(case[:, 0] * (case[:, 1].max() + 1) + case[:, 1], return_inverse=True)
+    nombre = np.bincount(cellule)
+    centres = np.stack([np.bincount(cellule, P[:, 0]), np.bincount(cellule, P[:, 1])], axis=1) / nombre[:, None]
+    F = np.empty_like(P)
+    for debut in range(0, n, 1024):
+        bloc = slice(debut, debut + 1024)
+        delta = P[bloc, None, :] - centres[None, :, :]
+        d2 = np.maximum(np.einsum('ijk,ijk->ij', delta, delta), 1e-9)
+        poids = nombre[None, :] * (k * k) / d2
+        poids[np.arange(d2.shape[0]), cellule[bloc]] = 0
+        F[bloc] = np.einsum('ijk,ij->ik', delta, poids)
+    ordre = np.argsort(cellule, kind='stable')
+    fins = np.cumsum(nombre)
+    for c in np.nonzero(nombre > 1)[0]:
+        membres = ordre[fins[c] - nombre[c]:fins[c]]
+        F[membres] += _repulsion_exacte(P[membres], P[membres], k)
+    return F
+
+
+def _repulsion_exacte(P, Q, k):
+    delta = P[:, None, :] - Q[None, :, :]
+    d2 = np.einsum('ijk,ijk->ij', delta, delta)
+    d2[d2 == 0] = np.inf
+    return np.einsum('ijk,ij->ik', delta, (k * k) / d2)
+
+
+def forces_attraction(P, src, dst, k):
+    n = len(P)
+    delta = P[src] - P[dst]
+    f = delta * (np.hypot(delta[:, 0], delta[:, 1]) / k)[:, None]
+    F = np.empty_like(P)
+    for axe in (0, 1):
+        F[:, axe] = np.bincount(dst, f[:, axe], n) - np.bincount(src, f[:, axe], n)
+    return F
+
+
+def iterer_disposition(P, src, dst, mobiles=None, iterations=300, k=DISTANCE_IDEALE):
+    P = np.array(P, dtype=float)
+    if len(P) == 0:
+        return
+    temperature = k * max(1.0, math.sqrt(len(P))) / 2
+    refroidissement = temperature / (iterations + 1)
+    for _ in range(iterations):
+        F = forces_repulsion(P, k)
+        if len(src):
+            F += forces_attraction(P, src, dst, k)
+        F -= GRAVITE * math.sqrt(len(P)) * (P - P.mean(axis=0))
+        norme = np.hypot(F[:, 0], F[:, 1])
+        deplacement = F * (np.minimum(norme, temperature) / np.maximum(norme, 1e-12))[:, None]
+        if mobiles is not None:
+            deplacement[~mobiles] = 0
+        P += deplacement
+        temperature -= refroidissement
+        yield P
+
+
+# Exécute la disposition dans un fil de travail et publie des positions
+# intermédiaires, au plus une fois par INTERVALLE_PUBLICATION secondes.
+class DispositionEnArrierePlan:
+    INTERVALLE_PUBLICATION = 0.05
+
+    def __init__(self):
+        self.resultats = queue.Queue()
+        self._arret = threading.Event()
+        self._fil = None
+
+    def demarrer(self, noeuds, P, src, dst, mobiles=None, iterations=300):
+        self.arreter()
+        self.resultats = queue.Queue()
+        self._arret = threading.Event()
+        self._fil = threading.Thread(target=self._executer, daemon=True,
+                                     args=(noeuds, P, src, dst, mobiles, iterations))
+        self._fil.start()
+
+    def _executer(self, noeuds, P, src, dst, mobiles, iterations):
+        derniere = time.monotonic()
+        for P in iterer_disposition(P, src, dst, mobiles, iterations):
+            if self._arret.is_set():
+                break
+            if time.monotonic() - derniere >= self.INTERVALLE_PUBLICATION:
+                self.resultats.put((noeuds, P.copy(), False))
+                derniere = time.monotonic()
+        self.resultats.put((noeuds, np.array(P), True))
+
+    def arreter(self):
+        if self._fil is not None:
+            self._arret.set()
+            self._fil.join()
+            self._fil = None
+
+    def dernier_resultat(self):
+        resultat = None
+        while True:
+            try:
+                resultat = self.resultats.get_nowait()
+            except queue.Empty:
+                return resultat
+
+
+# Instantané compact et immuable du graphe au format CSR : sommets numérotés,
+# tableaux de décalages et de successeurs, poids minimal par couple (u, v) comme le
+# fait networkx pour Dijkstra sur un multigraphe. Les parcours rendent exactement
+# les mêmes arêtes et chemins que nx.bfs_edges, nx.dfs_edges et nx.dijkstra_path.
+class GrapheCSR:
+    # En dessous de cette taille de frontière, le BFS avance en Python pur.
+    FRONTIERE_VECTORISEE = 64
+    TAILLE_CACHE_ARBRES = 32
+
+    def __init__(self, G):
+        self.noeuds = list(G.nodes)
+        self.indices = {n: i for i, n in enumerate(self.noeuds)}
+        debuts = [0]
+        voisins = []
+        poids = []
+        self.pondere = G.number_of_edges() > 0
+        indices = self.indices
+        sans_poids = 0
+        # Parcours du dictionnaire interne plutôt que des vues networkx, nettement plus lentes.
+        for u, successeurs in G._adj.items():
+            for v, cles in successeurs.items():
+                voisins.append(indices[v])
+                if len(cles) == 1:
+                    for d in cles.values():
+                        poids.append(d.get('weight', 1))
+                        sans_poids += 'weight' not in d
+                else:
+                    poids.append(min(d.get('weight', 1) for d in cles.values()))
+                    sans_poids += sum('weight' not in d for d in cles.values())
+            debuts.append(len(voisins))
+        self.pondere = self.pondere and sans_poids == 0
+        self.debuts = np.array(debuts, dtype=np.int64)
+        self.voisins = np.array(voisins, dtype=np.int64)
+        self.poids = np.array(poids, dtype=float)
+        self._listes = None
+        self._arbres = OrderedDict()
+
+    def __len__(self):
+        return len(self.noeuds)
+
+    def _en_listes(self):
+        if self._listes is None:
+            self._listes = (self.debuts.tolist(), self.voisins.tolist(), self.poids.tolist())
+        return self._listes
+
+    def _aretes(self, paires):
+        noeuds = self.noeuds
+        return [(noeuds[u], noeuds[v]) for u, v in paires]
+
+    def bfs_aretes(self, source):
+        debuts_l, voisins_l, _ = self._en_listes()
+        s = self.indices[source]
+        vus = np.zeros(len(self.noeuds), dtype=bool)
+        vus[s] = True
+        frontiere = [s]
+        paires = []
+        while frontiere:
+            if len(frontiere) < self.FRONTIERE_VECTORISEE:
+                suivante = []
+                for u in frontiere:
+                    for c in range(debuts_l[u], debuts_l[u + 1]):
+                        v = voisins_l[c]
+                        if not vus[v]:
+                            vus[v] = True
+                            suivante.append(v)
+                            paires.append((u, v))
+            else:
+                f = np.array(frontiere, dtype=np.int64)
+                debuts, longueurs = self.debuts[f], self.debuts[f + 1] - self.debuts[f]
+                total = int(longueurs.sum())
+                if total == 0:
+                    break
+                decalages = np.repeat(debuts - (np.cumsum(longueurs) - longueurs), longueurs)
+                candidats = self.voisins[decalages + np.arange(total)]
+                parents = np.repeat(f, longueurs)
+                nouveaux = ~vus[candidats]
+                candidats, parents = candidats[nouveaux], parents[nouveaux]
+                # Un sommet est découvert par la première occurrence dans l'ordre de la file.
+                _, premiers = np.unique(candidats, return_index=True)
+                premiers.sort()
+                suivante = candidats[premiers].tolist()
+                vus[candidats[premiers]] = True
+                paires.extend(zip(parents[premiers].tolist(), suivante))
+            frontiere = suivante
+        return self._aretes(paires)
+
+    def dfs_aretes(self, source):
+        debuts, voisins, _ = self._en_listes()
+        s = self.indices[source]
+        vus = bytearray(len(self.noeuds))
+        vus[s] = 1
+        pile = [s]
+        curseurs = [debuts[s]]
+        paires = []
+        while pile:
+            u = pile[-1]
+            c, fin = curseurs[-1], debuts[u + 1]
+            while c < fin and vus[voisins[c]]:
+                c += 1
+            if c < fin:
+                v = voisins[c]
+                curseurs[-1] = c + 1
+                vus[v] = 1
+                paires.append((u, v))
+                pile.append(v)
+                curseurs.append(debuts[v])
+            else:
+                pile.pop()
+                curseurs.pop()
+        return self._aretes(paires)
+
+    def arbre_dijkstra(self, source):
+        # Arbre des plus courts chemins depuis source, gardé en cache LRU : l'instantané
+        # étant immuable et remplacé à chaque modification, le cache est invalidé avec lui.
+        s = self.indices[source]
+        arbre = self._arbres.get(s)
+        if arbre is None:
+            arbre = _arbre_dijkstra(*self._en_listes(), s)
+            self._memoriser(s, arbre)
+        else:
+            self._arbres.move_to_end(s)
+        return arbre
+
+    def _memoriser(self, s, arbre):
+        self._arbres[s] = arbre
+        while len(self._arbres) > self.TAILLE_CACHE_ARBRES:
+            self._arbres.popitem(last=False)
+
+    def _remonter(self, arbre, s, t):
+        if t != s and arbre[t] < 0:
+            return None
+        chemin = [t]
+        while chemin[-1] != s:
+            chemin.append(arbre[chemin[-1]])
+        return [self.noeuds[i] for i in reversed(chemin)]
+
+    def dijkstra_chemin(self, source, cible):
+        chemin = self._remonter(self.arbre_dijkstra(source), self.indices[source], self.indices[cible])
+        if chemin is None:
+            raise nx.NetworkXNoPath(f"No path to {cible}.")
+        return chemin
+
+    def dijkstra_chemins(self, paires, processus=None):
+        # Calcule les chemins d'une liste de couples (source, cible) en un appel ;
+        # les sources absentes du cache sont réparties sur un pool de processus.
+        # Un couple sans chemin donne None.
+        par_source = {}
+        for rang, (source, cible) in enumerate(paires):
+            par_source.setdefault(self.indices[source], []).append((rang, self.indices[cible]))
+        resultats = [None] * len(paires)
+
+        def repondre(s, arbre):
+            for rang, t in par_source[s]:
+                resultats[rang] = self._remonter(arbre, s, t)
+
+        manquantes = []
+        for s in par_source:
+            if s in self._arbres:
+                self._arbres.move_to_end(s)
+                repondre(s, self._arbres[s])
+            else:
+                manquantes.append(s)
+        if len(manquantes) > 1 and processus != 1:
+            with ProcessPoolExecutor(max_workers=processus, initializer=_initialiser_travail,
+                                     initargs=(self.debuts, self.voisins, self.poids)) as pool:
+                taille_lot = max(1, len(manquantes) // (4 * (processus or os.cpu_count() or 1)))
+                for s, arbre in zip(manquantes, pool.map(_arbre_travail, manquantes, chunksize=taille_lot)):
+                    repondre(s, arbre)
+                    self._memoriser(s, arbre)
+        else:
+            for s in manquantes:
+                arbre = _arbre_dijkstra(*self._en_listes(), s)
+                repondre(s, arbre)
+                self._memoriser(s, arbre)
+        return resultats
+
+
+# Dijkstra complet depuis s, dans le même ordre de visite que networkx : le parent
+# retenu pour chaque sommet est donc celui du chemin que rendrait nx.dijkstra_path.
+def _arbre_dijkstra(debuts, voisins, poids, s):
+    n = len(debuts) - 1
+    parents = array('q', [-1]) * n
+    meilleures = [math.inf] * n
+    meilleures[s] = 0
+    fini = bytearray(n)
+    compteur = itertools.count()
+    file = [(0, next(compteur), s)]
+    while file:
+        d, _, u = heapq.heappop(file)
+        if fini[u]:
+            continue
+        fini[u] = 1
+        for c in range(debuts[u], debuts[u + 1]):
+            v = voisins[c]
+            if fini[v]:
+                continue
+            dv = d + poids[c]
+            if dv < meilleures[v]:
+                meilleures[v] = dv
+                parents[v] = u
+                heapq.heappush(file, (dv, next(compteur), v))
+    return parents
+
+
+_CSR_TRAVAIL = None
+
+
+def _initialiser_travail(debuts, voisins, poids):
+    global _CSR_TRAVAIL
+    _CSR_TRAVAIL = (debuts.tolist(), voisins.tolist(), poids.tolist())
+
+
+def _arbre_travail(s):
+    return _arbre_dijkstra(*_CSR_TRAVAIL, s)
+
+
+# Propriétés du graphe tenues à jour à chaque ajout ou retrait : degrés entrants et
+# sortants, nombre de sommets déséquilibrés, arêtes du graphe non orienté associé
+# et composantes faiblement connexes (union-find, recalculé après un retrait).
+class ProprietesGraphe:
+    SEUIL_HAMILTON_EXACT = 16
+    BUDGET_HAMILTON = 1.0
+
+    def __init__(self):
+        self.entrants = {}
+        self.sortants = {}
+        self.degres = Counter()
+        self.desequilibres = 0
+        self.nb_aretes = 0
+        self.nb_aretes_non_orientees = 0
+        self._cles_paires = {}
+        self._parents = {}
+        self.composantes = 0
+        self._connexite_perimee = False
+
+    @classmethod
+    def depuis(cls, G):
+        proprietes = cls()
+        for n in G.nodes:
+            proprietes.ajout_noeud(n)
+        for u, v, k in G.edges(keys=True):
+            proprietes.ajout_arete(u, v, k)
+        return proprietes
+
+    @property
+    def nb_noeuds(self):
+        return len(self.entrants)
+
+    def _changer_degre(self, n, entrant, sortant):
+        avant_equilibre = self.entrants[n] == self.sortants[n]
+        ancien = self.entrants[n] + self.sortants[n]
+        self.entrants[n] += entrant
+        self.sortants[n] += sortant
+        self.desequilibres += avant_equilibre - (self.entrants[n] == self.sortants[n])
+        self._compter_degre(ancien, -1)
+        self._compter_degre(ancien + entrant + sortant, 1)
+
+    def _compter_degre(self, degre, delta):
+        self.degres[degre] += delta
+        if not self.degres[degre]:
+            del self.degres[degre]
+
+    def ajout_noeud(self, n):
+        self.entrants[n] = 0
+        self.sortants[n] = 0
+        self._compter_degre(0, 1)
+        self._parents[n] = n
+        self.composantes += 1
+
+    def retrait_noeud(self, n):
+        # Les arêtes incidentes ont déjà été retirées une à une (ce qui périme la
+        # connexité) : si elle est encore à jour, le sommet était isolé.
+        self._compter_degre(self.entrants.pop(n) + self.sortants.pop(n), -1)
+        if not self._connexite_perimee:
+            del self._parents[n]
+            self.composantes -= 1
+
+    def ajout_arete(self, u, v, k):
+        self.nb_aretes += 1
+        self._changer_degre(u, 0, 1)
+        self._changer_degre(v, 1, 0)
+        cles = self._cles_paires.setdefault(frozenset((u, v)), Counter())
+        cles[k] += 1
+        if cles[k] == 1:
+            self.nb_aretes_non_orientees += 1
+        if not self._connexite_perimee:
+            a, b = self._trouver(u), self._trouver(v)
+            if a != b:
+                self._parents[a] = b
+                self.composantes -= 1
+
+    def retrait_arete(self, u, v, k):
+        self.nb_aretes -= 1
+        self._changer_degre(u, 0, -1)
+        self._changer_degre(v, -1, 0)
+        paire = frozenset((u, v))
+        cles = self._cles_paires[paire]
+        cles[k] -= 1
+        if not cles[k]:
+            del cles[k]
+            self.nb_aretes_non_orientees -= 1
+            if not cles:
+                del self._cles_paires[paire]
+        # Un union-find ne sait pas séparer des composantes : on recalculera.
+        self._connexite_perimee = True
+
+    def _trouver(self, n):
+        parents = self._parents
+        racine = n
+        while parents[racine] != racine:
+            racine = parents[racine]
+        while parents[n] != racine:
+            parents[n], n = racine, parents[n]
+        return racine
+
+    def _recalculer_connexite(self, G):
+        self._parents = {n: n for n in G.nodes}
+        self.composantes = len(self._parents)
+        for u, v in G.edges():
+            a, b = self._trouver(u), self._trouver(v)
+            if a != b:
+                self._parents[a] = b
+                self.composantes -= 1
+        self._connexite_perimee = False
+
+    def connexe(self, G):
+        if self._connexite_perimee:
+            self._recalculer_connexite(G)
+        return self.composantes == 1
+
+    def eulerien(self, G):
+        # Équilibré et faiblement connexe implique fortement connexe.
+        return self.nb_noeuds > 0 and self.desequilibres == 0 and self.connexe(G)
+
+    def arbre(self, G):
+        return self.nb_noeuds > 0 and self.nb_aretes_non_orientees == self.nb_noeuds - 1 and self.connexe(G)
+
+    def condition_degres(self):
+        return self.nb_noeuds > 0 and min(self.degres) >= self.nb_noeuds / 2
+
+    def hamiltonien(self, G):
+        if self.nb_noeuds <= self.SEUIL_HAMILTON_EXACT:
+            exact = hamiltonien_exact(G, self.BUDGET_HAMILTON)
+            if exact is not None:
+                return exact
+        return self.condition_degres()
+
+
+# Recherche exacte d'un circuit hamiltonien par programmation dynamique sur les
+# sous-ensembles : atteignables[masque] est l'ensemble (en bits) des sommets où peut
+# finir un chemin partant du sommet 0 et visitant exactement masque. Rend None si
+# le budget de temps est dépassé.
+def hamiltonien_exact(G, budget=1.0):
+    noeuds = list(G.nodes)
+    n = len(noeuds)
+    if n == 0:
+        return False
+    indices = {m: i for i, m in enumerate(noeuds)}
+    successeurs = [0] * n
+    for u, v in G.edges():
+        successeurs[indices[u]] |= 1 << indices[v]
+    if n == 1:
+        return bool(successeurs[0] & 1)
+    limite = time.monotonic() + budget
+    complet = (1 << n) - 1
+    atteignables = [0] * (1 << n)
+    atteignables[1] = 1
+    for masque in range(1, 1 << n, 2):
+        fins = atteignables[masque]
+        if not fins:
+            continue
+        if (masque & 1023) == 1 and time.monotonic() > limite:
+            return None
+        while fins:
+            bas = fins & -fins
+            v = bas.bit_length() - 1
+            fins ^= bas
+            suivants = successeurs[v] & ~masque
+            while suivants:
+                bit = suivants & -suivants
+                suivants ^= bit
+                atteignables[masque | bit] |= bit
+    fins = atteignables[complet]
+    while fins:
+        bas = fins & -fins
+        if successeurs[bas.bit_length() - 1] & 1:
+            return True
+        fins ^= bas
+    return False
+
+
+# Modèle du graphe, sans aucune dépendance à Tkinter ni à matplotlib : toutes les
+# modifications passent par ses primitives, qui tiennent à jour l'historique, l'index
+# spatial, les propriétés et la version qui sert à reconstruire l'instantané CSR.
+class ModeleGraphe:
+    PROFONDEUR_HISTORIQUE = 200
+    OPERATIONS_HISTORIQUE_MAX = 500000
+
+    def __init__(self, G=None, pos=None):
+        self.historique = HistoriqueDeltas(self.PROFONDEUR_HISTORIQUE, self.OPERATIONS_HISTORIQUE_MAX)
+        self.version = 0
+        self._csr = None
+        self.remplacer(nx.MultiDiGraph() if G is None else G, pos or {})
+
+    @classmethod
+    def depuis_fichier(cls, chemin):
+        return cls(*yggraph_fichiers.charger(chemin))
+
+    def charger(self, chemin):
+        self.remplacer(*yggraph_fichiers.charger(chemin))
+
+    def enregistrer(self, chemin):
+        yggraph_fichiers.enregistrer(self.G, self.pos, chemin)
+
+    def remplacer(self, G, pos):
+        # Un graphe chargé repart avec un historique vide ; les sommets sans
+        # position reçoivent un emplacement libre.
+        self.G = G
+        self.pos = {}
+        self.index = GrilleSpatiale()
+        for n in G.nodes:
+            p = pos.get(n) or self.index.position_libre()
+            self.pos[n] = [p[0], p[1]]
+            self.index.inserer(n, p)
+        self.proprietes = ProprietesGraphe.depuis(G)
+        self.version += 1
+        self.historique.vider()
+        self.disposes = set()
+
+    def commencer(self):
+        self.historique.commencer()
+
+    def ajouter_noeud(self, n, p):
+        self.G.add_node(n)
+        self.proprietes.ajout_noeud(n)
+        self.version += 1
+        self.pos[n] = [p[0], p[1]]
+        self.index.inserer(n, p)
+        self.historique.noter(("ajout_sommet", n, (p[0], p[1])))
+
+    def retirer_noeud(self, n):
+        incidentes = list(self.G.out_edges(n, keys=True, data=True))
+        incidentes += [e for e in self.G.in_edges(n, keys=True, data=True) if e[0] != n]
+        for u, v, k, d in incidentes:
+            self.retirer_lien(u, v, k)
+        p = self.pos.pop(n)
+        self.index.retirer(n)
+        self.G.remove_node(n)
+        self.proprietes.retrait_noeud(n)
+        self.version += 1
+        self.historique.noter(("retrait_sommet", n, (p[0], p[1])))
+
+    def ajouter_lien(self, u, v, k=None, **data):
+        k = self.G.add_edge(u, v, key=k, **data)
+        self.proprietes.ajout_arete(u, v, k)
+        self.version += 1
+        self.historique.noter(("ajout_arete", u, v, k, dict(data)))
+        return k
+
+    def retirer_lien(self, u, v, k):
+        data = dict(self.G[u][v][k])
+        self.G.remove_edge(u, v, key=k)
+        self.proprietes.retrait_arete(u, v, k)
+        self.version += 1
+        self.historique.noter(("retrait_arete", u, v, k, data))
+
+    def deplacer_noeud(self, n, p):
+        ancienne = tuple(self.pos[n])
+        self.placer(n, p)
+        self.historique.noter(("deplacement", n, ancienne, (p[0], p[1])))
+
+    def placer(self, n, p):
+        # Déplacement non noté (images d'un glisser, étapes d'une disposition).
+        self.pos[n] = [p[0], p[1]]
+        self.index.deplacer(n, p)
+
+    def noter_deplacements(self, avant):
+        for n, ancienne in avant.items():
+            if n in self.pos:
+                nouvelle = tuple(self.pos[n])
+                if nouvelle != tuple(ancienne):
+                    self.historique.noter(("deplacement", n, tuple(ancienne), nouvelle))
+
+    def vider(self):
+        for n in list(self.G.nodes):
+            self.retirer_noeud(n)
+
+    def position_libre(self):
+        return self.index.position_libre()
+
+    def rejouer(self, operations):
+        self.historique.en_rejeu = True
+        try:
+            for op in operations:
+                nature = op[0]
+                if nature == "ajout_sommet":
+                    self.ajouter_noeud(op[1], op[2])
+                elif nature == "retrait_sommet":
+                    self.retirer_noeud(op[1])
+                elif nature == "ajout_arete":
+                    self.ajouter_lien(op[1], op[2], op[3], **op[4])
+                elif nature == "retrait_arete":
+                    self.retirer_lien(op[1], op[2], op[3])
+                elif nature == "deplacement":
+                    self.placer(op[1], op[3])
+        finally:
+            self.historique.en_rejeu = False
+
+    def annuler(self):
+        operations = self.historique.annuler()
+        if operations is None:
+            return False
+        self.rejouer(operations)
+        return True
+
+    def retablir(self):
+        operations = self.historique.retablir()
+        if operations is None:
+            return False
+        self.rejouer(operations)
+        return True
+
+    def preparer_disposition(self, incrementale=False):
+        noeuds = list(self.G.nodes)
+        if not noeuds:
+            return None
+        indices = {n: i for i, n in enumerate(noeuds)}
+        P = np.array([self.pos[n] for n in noeuds], dtype=float)
+        paires = {(indices[u], indices[v]) for u, v in self.G.edges() if u != v}
+        src = np.array([p[0] for p in paires], dtype=np.intp)
+        dst = np.array([p[1] for p in paires], dtype=np.intp)
+        mobiles = None
+        if incrementale:
+            # Disposition incrémentale : les sommets déjà disposés restent en place
+            # et les nouveaux partent du barycentre de leurs voisins déjà placés.
+            mobiles = np.array([n not in self.disposes for n in noeuds])
+            if not mobiles.any():
+                return None
+            if mobiles.all():
+                mobiles = None
+            else:
+                for i in np.nonzero(mobiles)[0]:
+                    voisins = [indices[m] for m in nx.all_neighbors(self.G, noeuds[i]) if m in self.disposes]
+                    if voisins:
+                        P[i] = P[voisins].mean(axis=0) + np.random.uniform(-0.05, 0.05, 2)
+        return noeuds, P, src, dst, mobiles
+
+    def instantane_csr(self):
+        # Reconstruit paresseusement, seulement si le graphe a changé depuis.
+        if self._csr is None or self._csr[0] != self.version:
+            self._csr = (self.version, GrapheCSR(self.G))
+        return self._csr[1]
+
+    def est_pondere(self):
+        return self.instantane_csr().pondere
+
+    def parcours_dfs(self, source):
+        return self.instantane_csr().dfs_aretes(source)
+
+    def parcours_bfs(self, source):
+        return self.instantane_csr().bfs_aretes(source)
+
+    def plus_court_chemin(self, source, cible):
+        return self.instantane_csr().dijkstra_chemin(source, cible)
+
+    def plus_courts_chemins(self, paires, processus=None):
+        return self.instantane_csr().dijkstra_chemins(paires, processus)
+
+    def classer(self):
+        proprietes = self.proprietes
+        if proprietes.nb_noeuds == 0:
+            return "Graphe Nul"
+        if proprietes.eulerien(self.G):
+            return "Eulérien"
+        if proprietes.hamiltonien(self.G):
+            return "Hamiltonien"
+        if proprietes.arbre(self.G):
+            return "Arbre"
+        if self.G.is_multigraph():
+            return "Multigraphe"
+        return "Aucun"
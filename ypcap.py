@@ -1,17 +1,45 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
+import numpy as np
 import scapy.all as scapy
 
 import threading
+import time
+from collections import OrderedDict
+
+from ypcap_analyse import analyser
+from ypcap_ecrivain import EcrivainRotatif
+from ypcap_filtre import ErreurFiltre, Filtre
+from ypcap_flux import TableFlux, noms_drapeaux
+from ypcap_lecteur import FichierCapture, IndexationAnnulee
+from ypcap_mesures import ETAGES, ExportMesures, MesuresCapture, format_duree, traiter_lot
+from ypcap_session import SessionCapture
+from ypcap_stockage import StockageCapture, resumer_lignes
 
 class SnifferApp:
+    # Les threads de capture (un par interface) ne touchent jamais à Tk : ils
+    # déposent les trames brutes dans des files, que l'interface fusionne et vide
+    # par lots à intervalle fixe.
+    INTERVALLE_AFFICHAGE = 100
+    LOT_MAX = 20000
+
     def __init__(self, root):
         self.root = root
         self.root.title("YPCAP Sniffer")
         self.root.geometry("800x600")
         self.root.resizable(True, True)
 
-        self.captured_packets = []
+        self.stockage = StockageCapture()
+        # Paquets affichés et enregistrés : la capture en cours ou un fichier ouvert.
+        self.paquets = self.stockage
+        self.session = None
+        self.ecrivain = None
+        self.count = 0
+        # Flux et statistiques de la source affichée, mis à jour au fil de l'eau.
+        self.flux = TableFlux()
+        # Débits, pertes, files et latences de la dernière capture.
+        self.mesures = MesuresCapture()
+        self.export_mesures = None
 
         created_label = ttk.Label(self.root, text="Created by Yan Goethals", font=("Arial", 10, "italic"))
         created_label.pack(anchor="nw", padx=10, pady=5)
@@ -23,13 +51,21 @@ class SnifferApp:
         analyze_button = ttk.Button(top_right_frame, text="Analyser", command=self.load_capture)
         analyze_button.pack(side="left", padx=5)
 
+        # Bouton Statistiques
+        stats_button = ttk.Button(top_right_frame, text="Statistiques", command=self.show_statistics)
+        stats_button.pack(side="left", padx=5)
+
+        # Bouton Mesures
+        metrics_button = ttk.Button(top_right_frame, text="Mesures", command=self.show_metrics)
+        metrics_button.pack(side="left", padx=5)
+
         # Bouton Documentation
         doc_button = ttk.Button(top_right_frame, text="Documentation", command=self.show_documentation)
         doc_button.pack(side="left", padx=5)
 
         # Interfaces Listbox
         ttk.Label(self.root, text="Interfaces:").pack(pady=5)
-        self.interface_listbox = tk.Listbox(self.root)
+        self.interface_listbox = tk.Listbox(self.root, selectmode=tk.EXTENDED, exportselection=False)
         self.interface_listbox.pack(fill="both", expand=True, padx=20, pady=5)
 
         # Afficher interfaces lisibles
@@ -52,18 +88,26 @@ class SnifferApp:
         self.execute_button = None
         self.progress = None
         self.show_button = None
+        self.table_paquets = None
+        self.continuous_var = None
+        self.disk_var = None
+        self.rotation_entries = None
+        self.memory_entries = None
+        self.metrics_var = None
+        self.metrics_entry = None
+        self.stop_button = None
+        self.status_label = None
 
     def show_protocols(self):
         selected = self.interface_listbox.curselection()
         if not selected:
-            messagebox.showwarning("Attention", "Veuillez sélectionner une interface.")
+            messagebox.showwarning("Attention", "Veuillez sélectionner au moins une interface.")
             return
-        index = selected[0]
-        self.interface = self.iface_mapping[index]
+        self.interfaces = [self.iface_mapping[index] for index in selected]
 
         if not self.protocol_listbox:
             ttk.Label(self.root, text="Protocoles:").pack(pady=5)
-            self.protocol_listbox = tk.Listbox(self.root)
+            self.protocol_listbox = tk.Listbox(self.root, exportselection=False)
             self.protocol_listbox.pack(fill="both", expand=True, padx=20, pady=5)
             for proto in ["ip", "tcp", "udp", "icmp", "arp"]:
                 self.protocol_listbox.insert(tk.END, proto)
@@ -72,12 +116,63 @@ class SnifferApp:
             self.count_entry = ttk.Entry(self.root)
             self.count_entry.pack(pady=5)
 
+            # Capture continue : pas de nombre de paquets, jusqu'au bouton Arrêter.
+            self.continuous_var = tk.BooleanVar(value=False)
+            ttk.Checkbutton(self.root, text="Capture continue", variable=self.continuous_var).pack(pady=5)
+
+            # Bornes du stockage en mémoire : au-delà, les paquets les plus
+            # anciens sont évincés.
+            memory_frame = ttk.LabelFrame(self.root, text="Mémoire")
+            memory_frame.pack(fill="x", padx=20, pady=5)
+            self.memory_entries = {}
+            for cle, texte, defaut in (("paquets", "Paquets max", str(StockageCapture.MAX_PAQUETS)),
+                                       ("octets", "Taille max (Mo)", str(StockageCapture.MAX_OCTETS // (1024 * 1024)))):
+                ttk.Label(memory_frame, text=texte).pack(side="left", padx=2)
+                entry = ttk.Entry(memory_frame, width=8)
+                entry.insert(0, defaut)
+                entry.pack(side="left", padx=2)
+                self.memory_entries[cle] = entry
+
+            # Enregistrement au fil de la capture, en anneau de fichiers ; la
+            # mémoire ne garde alors que les paquets récents.
+            disk_frame = ttk.LabelFrame(self.root, text="Enregistrement continu")
+            disk_frame.pack(fill="x", padx=20, pady=5)
+            self.disk_var = tk.BooleanVar(value=False)
+            ttk.Checkbutton(disk_frame, text="Écrire sur disque", variable=self.disk_var).pack(side="left", padx=5)
+            self.rotation_entries = {}
+            for cle, texte, defaut in (("taille", "Taille max (Mo)", "100"), ("duree", "Durée max (s)", ""),
+                                       ("fichiers", "Fichiers gardés", "10")):
+                ttk.Label(disk_frame, text=texte).pack(side="left", padx=2)
+                entry = ttk.Entry(disk_frame, width=6)
+                entry.insert(0, defaut)
+                entry.pack(side="left", padx=2)
+                self.rotation_entries[cle] = entry
+
+            # Instantanés périodiques des mesures, en JSON ou en CSV.
+            metrics_frame = ttk.LabelFrame(self.root, text="Mesures")
+            metrics_frame.pack(fill="x", padx=20, pady=5)
+            self.metrics_var = tk.BooleanVar(value=False)
+            ttk.Checkbutton(metrics_frame, text="Exporter", variable=self.metrics_var).pack(side="left", padx=5)
+            ttk.Label(metrics_frame, text="Intervalle (s)").pack(side="left", padx=2)
+            self.metrics_entry = ttk.Entry(metrics_frame, width=6)
+            self.metrics_entry.insert(0, "10")
+            self.metrics_entry.pack(side="left", padx=2)
+
             self.progress = ttk.Progressbar(self.root, orient="horizontal", mode="determinate", maximum=100)
             self.progress.pack(fill="x", padx=20, pady=10)
 
+            self.status_label = ttk.Label(self.root, text="")
+            self.status_label.pack(pady=5)
+
             self.execute_button = ttk.Button(self.root, text="Exécuter", command=self.start_sniffing)
             self.execute_button.pack(pady=5)
 
+            self.stop_button = ttk.Button(self.root, text="Arrêter", command=self.stop_sniffing)
+            self.stop_button.pack(pady=5)
+
+            # Rejeu de captures à la place des interfaces, pour essayer hors ligne.
+            ttk.Button(self.root, text="Rejouer des fichiers", command=self.replay_files).pack(pady=5)
+
             self.show_button = ttk.Button(self.root, text="Afficher", command=self.show_packets)
             self.show_button.pack(pady=5)
 
@@ -87,58 +182,188 @@ class SnifferApp:
             messagebox.showwarning("Attention", "Veuillez sélectionner un protocole.")
             return
         self.protocol = self.protocol_listbox.get(selected)
+        self.prepare_capture(lambda: SessionCapture.interfaces(self.interfaces, self.protocol, self.count))
+
+    def replay_files(self):
+        file_paths = filedialog.askopenfilenames(filetypes=[("Captures", "*.pcap *.pcapng *.cap")])
+        if file_paths:
+            self.prepare_capture(lambda: SessionCapture.fichiers(file_paths, self.count))
+
+    def prepare_capture(self, creer_session):
+        if self.session is not None and self.session.actif:
+            messagebox.showwarning("Attention", "Une capture est déjà en cours.")
+            return
+        if self.continuous_var.get():
+            self.count = 0
+        else:
+            try:
+                self.count = int(self.count_entry.get())
+            except ValueError:
+                messagebox.showwarning("Attention", "Veuillez entrer un nombre valide.")
+                return
+
         try:
-            self.count = int(self.count_entry.get())
+            max_paquets = int(self.memory_entries["paquets"].get())
+            max_octets = int(float(self.memory_entries["octets"].get()) * 1024 * 1024)
         except ValueError:
-            messagebox.showwarning("Attention", "Veuillez entrer un nombre valide.")
+            max_paquets = max_octets = 0
+        if max_paquets <= 0 or max_octets <= 0:
+            messagebox.showwarning("Attention", "Bornes de mémoire invalides.")
             return
+        if (max_paquets, max_octets) != (self.stockage.max_paquets, self.stockage.max_octets):
+            self.stockage = StockageCapture(max_paquets, max_octets)
+
+        self.ecrivain = None
+        if self.disk_var.get():
+            try:
+                taille, duree, fichiers = (float(self.rotation_entries[cle].get() or 0)
+                                           for cle in ("taille", "duree", "fichiers"))
+            except ValueError:
+                messagebox.showwarning("Attention", "Paramètres d'enregistrement invalides.")
+                return
+            file_path = filedialog.asksaveasfilename(defaultextension=".pcap", initialfile="capture.pcap",
+                                                     filetypes=[("PCAP Files", "*.pcap")])
+            if not file_path:
+                return
+            self.ecrivain = EcrivainRotatif(file_path, taille_max=int(taille * 1024 * 1024) or None,
+                                            duree_max=duree or None, nb_fichiers=int(fichiers) or None)
+
+        self.export_mesures = None
+        if self.metrics_var.get():
+            try:
+                intervalle = float(self.metrics_entry.get())
+            except ValueError:
+                messagebox.showwarning("Attention", "Intervalle d'export invalide.")
+                return
+            file_path = filedialog.asksaveasfilename(defaultextension=".json", initialfile="mesures.json",
+                                                     filetypes=[("JSON", "*.json"), ("CSV", "*.csv")])
+            if not file_path:
+                return
+            try:
+                self.export_mesures = ExportMesures(file_path, intervalle)
+            except OSError as e:
+                messagebox.showerror("Erreur", f"Export des mesures impossible : {e}")
+                return
 
+        self.progress.config(mode="determinate" if self.count else "indeterminate")
         self.progress["value"] = 0
-        threading.Thread(target=self.sniff_packets).start()
+        self.sniff_packets(creer_session())
+
+    def sniff_packets(self, session):
+        self.release_packets()
+        self.stockage.vider()
+        self.stockage.noms_interfaces = session.noms
+        self.paquets = self.stockage
+        self.reset_flows()
+        # count=0 : capture sans fin, arrêtée par stop_sniffing.
+        self.session = session
+        self.mesures = self.session.mesures = MesuresCapture(session.noms)
+        self.session.start()
+        self.root.after(self.INTERVALLE_AFFICHAGE, self.drain_queue)
+
+    def stop_sniffing(self):
+        if self.session is not None:
+            self.session.stop()
+
+    def drain_queue(self):
+        # Thread de l'interface : transfère dans le stockage un lot de trames
+        # fusionnées par horodatage, puis met à jour la progression et la liste
+        # ouverte.
+        lot = self.session.extraire(self.LOT_MAX)
+        if self.count:
+            # Chaque interface s'arrête seule après count paquets ; la session
+            # entière s'arrête au total.
+            lot = lot[:max(0, self.count - self.stockage.total)]
+            if self.stockage.total + len(lot) >= self.count:
+                self.session.stop()
+        fin = traiter_lot(lot, self.stockage, self.flux, self.mesures, self.ecrivain, self.stop_writing)
+
+        total = self.stockage.total
+        if self.count:
+            self.progress["value"] = min(100, int(total / self.count * 100))
+        elif self.session.actif:
+            self.progress.step(5)
+        status = f"Paquets : {total}   conservés : {len(self.stockage)}   évincés : {self.stockage.evinces}"
+        if len(self.session.noms) > 1:
+            status += "\n" + "   ".join(f"{nom} : {recus}" for nom, recus in zip(self.session.noms, self.session.recus))
+        instantane = self.mesures.instantane(fin)
+        status += (f"\n{instantane['paquets_s']:.0f} paquets/s   {instantane['octets_s'] * 8 / 1e6:.1f} Mbit/s"
+                   f"   file : {instantane['profondeur']}"
+                   f"   pertes : {'-' if instantane['pertes'] is None else instantane['pertes']}")
+        if self.ecrivain is not None:
+            status += f"\nFichier : {self.ecrivain.fichier_courant or ''}"
+        self.status_label.config(text=status)
+        if self.table_paquets is not None and self.table_paquets.stockage is self.stockage \
+                and self.table_paquets.window.winfo_exists():
+            self.table_paquets.rafraichir()
+        self.mesures.histogrammes["affichage"].ajouter(time.time() - fin)
+        if self.export_mesures is not None:
+            try:
+                self.export_mesures.ecrire(self.mesures)
+            except OSError as e:
+                self.stop_exporting(e)
+        # Une fois le compte atteint, on suit la session jusqu'à la fin de ses
+        # threads : extraire() relève encore les pertes et ferme les sockets.
+        if self.session.actif or (not self.session.vide and not (self.count and total >= self.count)):
+            self.root.after(self.INTERVALLE_AFFICHAGE, self.drain_queue)
+            return
+        if self.ecrivain is not None:
+            self.ecrivain.fermer()
+        if self.export_mesures is not None:
+            try:
+                self.export_mesures.fermer(self.mesures)
+            except OSError as e:
+                self.stop_exporting(e)
+        for nom, exception in self.session.exceptions:
+            messagebox.showerror("Erreur", f"Capture interrompue sur {nom} : {exception}")
+
+    def stop_writing(self, erreur):
+        # Une erreur disque arrête l'enregistrement mais pas la capture en mémoire.
+        ecrivain, self.ecrivain = self.ecrivain, None
+        try:
+            ecrivain.fermer()
+        except OSError:
+            pass
+        messagebox.showerror("Erreur", f"Enregistrement interrompu : {erreur}")
+
+    def stop_exporting(self, erreur):
+        export, self.export_mesures = self.export_mesures, None
+        try:
+            export.fermer()
+        except OSError:
+            pass
+        messagebox.showerror("Erreur", f"Export des mesures interrompu : {erreur}")
 
-    def sniff_packets(self):
-        self.captured_packets = []
+    def reset_flows(self, flux=None):
+        # Nouvelle source : la table des flux repart de zéro, ou reprend celle
+        # calculée avec l'analyse d'un fichier.
+        self.flux = TableFlux() if flux is None else flux
 
-        def update_progress(pkt):
-            self.captured_packets.append(pkt)
-            percent = int(len(self.captured_packets) / self.count * 100)
-            self.progress["value"] = percent
+    def show_statistics(self):
+        StatistiquesFlux(self.root, lambda: self.flux)
 
-        scapy.sniff(count=self.count, iface=self.interface, filter=self.protocol, prn=update_progress)
+    def show_metrics(self):
+        PanneauMesures(self.root, lambda: self.mesures)
 
     def show_packets(self):
-        if not self.captured_packets:
+        if not len(self.paquets):
             messagebox.showwarning("Attention", "Aucun paquet capturé ou chargé.")
             return
 
-        window = tk.Toplevel(self.root)
-        window.geometry("700x700")
-        window.title("Paquets capturés")
-        window.resizable(True, True)
-
-        text = tk.Text(window)
-        text.pack(fill="both", expand=True, padx=10, pady=10)
-
-        for pkt in self.captured_packets:
-            text.insert(tk.END, pkt.show(dump=True) + "\n\n")
-
-        frame = ttk.Frame(window)
-        frame.pack(pady=10)
-
-        save_button = ttk.Button(frame, text="Enregistrer", command=lambda: self.save_capture())
-        save_button.pack(side="left", padx=10)
-
-        quit_button = ttk.Button(frame, text="Quitter", command=lambda: self.confirm_quit(window))
-        quit_button.pack(side="left", padx=10)
+        self.table_paquets = TablePaquets(self.root, self.paquets, self.save_capture, self.confirm_quit)
 
     def save_capture(self):
-        if not self.captured_packets:
+        if not len(self.paquets):
             messagebox.showwarning("Attention", "Aucune capture à enregistrer.")
             return
-        file_path = filedialog.asksaveasfilename(defaultextension=".pcap",
-                                                 filetypes=[("PCAP Files", "*.pcap")])
+        # Le pcapng garde l'interface de chaque paquet : proposé d'abord dès
+        # que la capture en mélange plusieurs.
+        types = [("PCAP Files", "*.pcap"), ("PCAPNG Files", "*.pcapng")]
+        if len(self.paquets.noms_interfaces) > 1:
+            types.reverse()
+        file_path = filedialog.asksaveasfilename(defaultextension=types[0][1][1:], filetypes=types)
         if file_path:
-            scapy.wrpcap(file_path, self.captured_packets)
+            self.paquets.enregistrer_pcap(file_path)
             messagebox.showinfo("Succès", f"Capture enregistrée sous {file_path}")
 
     def confirm_quit(self, window):
@@ -146,10 +371,68 @@ class SnifferApp:
             window.destroy()
 
     def load_capture(self):
-        file_path = filedialog.askopenfilename(filetypes=[("PCAP Files", "*.pcap")])
-        if file_path:
-            self.captured_packets = scapy.rdpcap(file_path)
-            self.show_packets()
+        file_path = filedialog.askopenfilename(filetypes=[("Captures", "*.pcap *.pcapng *.cap"),
+                                                          ("PCAP Files", "*.pcap"), ("PCAPNG Files", "*.pcapng")])
+        if not file_path:
+            return
+        # L'analyse (index, en-têtes, flux) tourne dans un thread, répartie sur
+        # un pool de processus pour les gros fichiers ; la fenêtre suit son
+        # avancement et permet d'annuler.
+        fichier = FichierCapture(file_path)
+        window = tk.Toplevel(self.root)
+        window.title("Chargement")
+        ttk.Label(window, text=file_path).pack(padx=10, pady=5)
+        progress = ttk.Progressbar(window, orient="horizontal", mode="determinate", maximum=100, length=400)
+        progress.pack(fill="x", padx=10, pady=5)
+        ttk.Button(window, text="Annuler", command=fichier.arret.set).pack(pady=5)
+        erreurs = []
+        resultats = []
+
+        def indexer():
+            try:
+                resultats.append(analyser(fichier))
+            except IndexationAnnulee:
+                pass
+            except (OSError, ValueError) as e:
+                erreurs.append(e)
+
+        thread = threading.Thread(target=indexer, daemon=True)
+        thread.start()
+        self.root.after(self.INTERVALLE_AFFICHAGE, self.follow_loading, fichier, thread, window, progress, erreurs,
+                        resultats)
+
+    def follow_loading(self, fichier, thread, window, progress, erreurs, resultats):
+        progress["value"] = int(fichier.avancement * 100)
+        if thread.is_alive():
+            self.root.after(self.INTERVALLE_AFFICHAGE, self.follow_loading, fichier, thread, window, progress, erreurs,
+                            resultats)
+            return
+        window.destroy()
+        if erreurs or fichier.arret.is_set():
+            fichier.fermer()
+            if erreurs:
+                messagebox.showerror("Erreur", f"Lecture impossible : {erreurs[0]}")
+            return
+        if not resultats:
+            # Le thread s'est arrêté sans résultat ni erreur reconnue.
+            fichier.fermer()
+            messagebox.showerror("Erreur", f"Lecture impossible : {fichier.chemin}")
+            return
+        self.release_packets()
+        self.paquets = fichier
+        self.reset_flows(resultats[0])
+        self.show_packets()
+
+    def release_packets(self):
+        # Un fichier chargé que remplace une autre source est fermé (projection
+        # et descripteur), avec la liste qui l'affiche encore. Le stockage, lui,
+        # a pu déjà être remplacé par prepare_capture et n'a rien à fermer.
+        if not isinstance(self.paquets, FichierCapture):
+            return
+        if self.table_paquets is not None and self.table_paquets.stockage is self.paquets \
+                and self.table_paquets.window.winfo_exists():
+            self.table_paquets.window.destroy()
+        self.paquets.fermer()
 
     def show_documentation(self):
         doc_window = tk.Toplevel(self.root)
@@ -183,6 +466,347 @@ class SnifferApp:
         quit_doc_button = ttk.Button(doc_window, text="Quitter", command=doc_window.destroy)
         quit_doc_button.pack(pady=10)
 
+
+class TablePaquets:
+    # Liste virtualisée : le Treeview ne contient que les lignes visibles, remplies
+    # à la demande depuis le stockage ; la barre de défilement est pilotée à la main.
+    # Les résumés sont gardés dans un cache LRU indexé par numéro absolu de paquet,
+    # et seul le paquet sélectionné est disséqué en entier dans le panneau de détail.
+    # Avec un filtre d'affichage, les lignes sont les numéros retenus (numeros),
+    # évalués sur l'index des en-têtes et complétés au fil de la capture.
+    TAILLE_CACHE = 5000
+    HAUTEUR_LIGNE = 20
+    COLONNES = (("numero", "No.", 70), ("temps", "Temps", 120), ("source", "Source", 150),
+                ("destination", "Destination", 150), ("protocole", "Protocole", 90), ("longueur", "Longueur", 70),
+                ("interface", "Interface", 80))
+
+    def __init__(self, parent, stockage, enregistrer, quitter):
+        self.stockage = stockage
+        self.debut = 0
+        self.nb_lignes = 30
+        self.selection = None
+        self.resumes = OrderedDict()
+        self.filtre = None
+        self.numeros = None
+        self.filtre_jusqua = 0
+
+        self.window = tk.Toplevel(parent)
+        self.window.geometry("800x700")
+        self.window.title("Paquets capturés")
+        self.window.resizable(True, True)
+
+        barre = ttk.Frame(self.window)
+        barre.pack(fill="x", padx=10, pady=(10, 0))
+        ttk.Label(barre, text="Filtre :").pack(side="left")
+        self.filtre_var = tk.StringVar(value="")
+        filtre_entry = ttk.Entry(barre, textvariable=self.filtre_var)
+        filtre_entry.pack(side="left", fill="x", expand=True, padx=5)
+        filtre_entry.bind("<Return>", lambda e: self.appliquer_filtre())
+        ttk.Button(barre, text="Appliquer", command=self.appliquer_filtre).pack(side="left", padx=2)
+        ttk.Button(barre, text="Effacer", command=self.effacer_filtre).pack(side="left", padx=2)
+        self.filtre_label = ttk.Label(barre, text="")
+        self.filtre_label.pack(side="left", padx=5)
+
+        panneaux = ttk.Panedwindow(self.window, orient="vertical")
+        panneaux.pack(fill="both", expand=True, padx=10, pady=10)
+        haut = ttk.Frame(panneaux)
+        self.table = ttk.Treeview(haut, columns=[c[0] for c in self.COLONNES], show="headings",
+                                  selectmode="browse", height=self.nb_lignes)
+        for colonne, titre, largeur in self.COLONNES:
+            self.table.heading(colonne, text=titre)
+            self.table.column(colonne, width=largeur, anchor="w", stretch=colonne in ("source", "destination"))
+        self.defilement = ttk.Scrollbar(haut, orient="vertical", command=self.defiler)
+        self.defilement.pack(side="right", fill="y")
+        self.table.pack(side="left", fill="both", expand=True)
+        self.detail = tk.Text(panneaux, wrap="none", height=15)
+        panneaux.add(haut, weight=3)
+        panneaux.add(self.detail, weight=2)
+
+        self.table.bind("<<TreeviewSelect>>", self.selectionner)
+        self.table.bind("<Configure>", self.redimensionner)
+        self.table.bind("<MouseWheel>", lambda e: self.deplacer(-1 if e.delta > 0 else 1, 3))
+        self.table.bind("<Button-4>", lambda e: self.deplacer(-1, 3))
+        self.table.bind("<Button-5>", lambda e: self.deplacer(1, 3))
+        self.table.bind("<Up>", lambda e: self.avancer_selection(-1))
+        self.table.bind("<Down>", lambda e: self.avancer_selection(1))
+        self.table.bind("<Prior>", lambda e: self.avancer_selection(-self.nb_lignes))
+        self.table.bind("<Next>", lambda e: self.avancer_selection(self.nb_lignes))
+        self.table.bind("<Home>", lambda e: self.avancer_selection(-len(self.stockage)))
+        self.table.bind("<End>", lambda e: self.avancer_selection(len(self.stockage)))
+
+        frame = ttk.Frame(self.window)
+        frame.pack(pady=10)
+        ttk.Button(frame, text="Enregistrer", command=enregistrer).pack(side="left", padx=10)
+        ttk.Button(frame, text="Quitter", command=lambda: quitter(self.window)).pack(side="left", padx=10)
+
+        self.rafraichir()
+
+    def completer(self, numeros):
+        manquants = [n for n in numeros if n not in self.resumes]
+        if not manquants:
+            return
+        self.resumes.update(resumer_lignes(self.stockage, manquants))
+        while len(self.resumes) > self.TAILLE_CACHE:
+            self.resumes.popitem(last=False)
+
+    def resume(self, numero):
+        self.completer([numero])
+        if numero not in self.resumes:
+            return None
+        self.resumes.move_to_end(numero)
+        return self.resumes[numero]
+
+    def appliquer_filtre(self):
+        texte = self.filtre_var.get().strip()
+        if not texte:
+            self.effacer_filtre()
+            return
+        try:
+            filtre = Filtre(texte)
+        except ErreurFiltre as e:
+            messagebox.showwarning("Filtre", f"Filtre invalide : {e}")
+            return
+        self.filtre = filtre
+        self.numeros = np.zeros(0, dtype=np.int64)
+        self.filtre_jusqua = 0
+        self.debut = 0
+        self.rafraichir()
+
+    def effacer_filtre(self):
+        self.filtre_var.set("")
+        self.filtre = None
+        self.numeros = None
+        self.filtre_label.config(text="")
+        self.rafraichir()
+
+    def filtrer_nouveaux(self):
+        # N'évalue le filtre que sur les paquets arrivés depuis le dernier appel,
+        # et oublie les numéros des paquets évincés.
+        premier = self.stockage.premier
+        fin = premier + len(self.stockage)
+        depuis = max(self.filtre_jusqua, premier)
+        if depuis < fin:
+            enregistrements = self.stockage.enregistrements(depuis - premier, fin - premier)
+            self.numeros = np.concatenate((self.numeros, self.filtre.indices(enregistrements, depuis + 1) + depuis))
+            self.filtre_jusqua = fin
+        self.numeros = self.numeros[np.searchsorted(self.numeros, premier):]
+        self.filtre_label.config(text=f"{len(self.numeros)} / {len(self.stockage)} paquets")
+
+    def nombre_lignes(self):
+        return len(self.stockage) if self.numeros is None else len(self.numeros)
+
+    def numero_ligne(self, ligne):
+        return self.stockage.premier + ligne if self.numeros is None else int(self.numeros[ligne])
+
+    def ligne_numero(self, numero):
+        if self.numeros is None:
+            return numero - self.stockage.premier
+        return int(np.searchsorted(self.numeros, numero))
+
+    def rafraichir(self):
+        # Remplit uniquement les lignes visibles ; à rappeler quand le stockage change.
+        if self.filtre is not None:
+            self.filtrer_nouveaux()
+        total = self.nombre_lignes()
+        self.debut = max(0, min(self.debut, total - self.nb_lignes))
+        self.table.delete(*self.table.get_children())
+        visibles = [self.numero_ligne(ligne) for ligne in range(self.debut, min(total, self.debut + self.nb_lignes))]
+        self.completer(visibles)
+        for numero in visibles:
+            ligne = self.resume(numero)
+            if ligne is not None:
+                self.table.insert("", "end", iid=str(numero), values=ligne)
+        if self.selection is not None and self.table.exists(str(self.selection)):
+            self.table.selection_set(str(self.selection))
+        if total:
+            self.defilement.set(self.debut / total, min(1.0, (self.debut + self.nb_lignes) / total))
+        else:
+            self.defilement.set(0.0, 1.0)
+
+    def defiler(self, action, quantite, unite=None):
+        if action == "moveto":
+            self.debut = int(float(quantite) * self.nombre_lignes())
+            self.rafraichir()
+        elif action == "scroll":
+            self.deplacer(int(quantite), self.nb_lignes if unite == "pages" else 1)
+
+    def deplacer(self, sens, pas):
+        self.debut += sens * pas
+        self.rafraichir()
+        return "break"
+
+    def avancer_selection(self, delta):
+        total = self.nombre_lignes()
+        if not total:
+            return "break"
+        courant = self.ligne_numero(self.selection) if self.selection is not None else self.debut - 1
+        i = max(0, min(total - 1, courant + delta))
+        if i < self.debut:
+            self.debut = i
+        elif i >= self.debut + self.nb_lignes:
+            self.debut = i - self.nb_lignes + 1
+        self.selection = self.numero_ligne(i)
+        self.rafraichir()
+        self.afficher_detail()
+        return "break"
+
+    def redimensionner(self, event):
+        nb_lignes = max(1, (event.height - self.HAUTEUR_LIGNE) // self.HAUTEUR_LIGNE)
+        if nb_lignes != self.nb_lignes:
+            self.nb_lignes = nb_lignes
+            self.rafraichir()
+
+    def selectionner(self, event=None):
+        choix = self.table.selection()
+        if not choix or int(choix[0]) == self.selection:
+            return
+        self.selection = int(choix[0])
+        self.afficher_detail()
+
+    def afficher_detail(self):
+        self.detail.delete("1.0", tk.END)
+        i = self.selection - self.stockage.premier
+        if not 0 <= i < len(self.stockage):
+            return
+        pkt = self.stockage.paquet(i)
+        self.detail.insert(tk.END, pkt.show(dump=True) + "\n" + scapy.hexdump(pkt, dump=True))
+
+
+class StatistiquesFlux:
+    # Flux, hôtes et protocoles les plus actifs, relus périodiquement dans la
+    # table des flux sans reparcourir la capture.
+    INTERVALLE = 1000
+    ONGLETS = (
+        ("Flux", (("protocole", "Protocole", 70), ("a", "Adresse A", 180), ("b", "Adresse B", 180),
+                  ("paquets", "Paquets", 70), ("octets", "Octets", 90), ("ab", "A → B", 90), ("ba", "B → A", 90),
+                  ("duree", "Durée (s)", 80), ("drapeaux", "Drapeaux", 130), ("etat", "État", 90))),
+        ("Hôtes", (("adresse", "Adresse", 220), ("paquets", "Paquets", 80), ("octets", "Octets", 100),
+                   ("envoyes", "Octets envoyés", 110), ("recus", "Octets reçus", 110))),
+        ("Protocoles", (("protocole", "Protocole", 150), ("paquets", "Paquets", 100), ("octets", "Octets", 120),
+                        ("part", "Part des octets", 110))),
+    )
+
+    def __init__(self, parent, table_flux):
+        self.table_flux = table_flux
+        self.window = tk.Toplevel(parent)
+        self.window.title("Statistiques")
+        self.window.geometry("1000x500")
+
+        options = ttk.Frame(self.window)
+        options.pack(fill="x", padx=10, pady=5)
+        ttk.Label(options, text="Nombre :").pack(side="left")
+        self.nombre_var = tk.StringVar(value="20")
+        ttk.Entry(options, textvariable=self.nombre_var, width=6).pack(side="left", padx=5)
+        ttk.Label(options, text="Classer par :").pack(side="left")
+        self.critere_var = tk.StringVar(value="octets")
+        ttk.Combobox(options, textvariable=self.critere_var, values=("octets", "paquets"), state="readonly",
+                     width=10).pack(side="left", padx=5)
+        self.resume_label = ttk.Label(options, text="")
+        self.resume_label.pack(side="left", padx=10)
+
+        onglets = ttk.Notebook(self.window)
+        onglets.pack(fill="both", expand=True, padx=10, pady=5)
+        self.tables = []
+        for titre, colonnes in self.ONGLETS:
+            table = ttk.Treeview(onglets, columns=[c[0] for c in colonnes], show="headings")
+            for cle, texte, largeur in colonnes:
+                table.heading(cle, text=texte)
+                table.column(cle, width=largeur, anchor="w")
+            onglets.add(table, text=titre)
+            self.tables.append(table)
+
+        ttk.Button(self.window, text="Fermer", command=self.window.destroy).pack(pady=5)
+        self.rafraichir()
+
+    def rafraichir(self):
+        if not self.window.winfo_exists():
+            return
+        flux = self.table_flux()
+        try:
+            n = max(1, int(self.nombre_var.get()))
+        except ValueError:
+            n = 20
+        critere = self.critere_var.get()
+        lignes = (
+            [(f.protocole, self.extremite(f.adresse_a, f.port_a), self.extremite(f.adresse_b, f.port_b),
+              f.total_paquets, f.total_octets, f.octets[0], f.octets[1], f"{f.duree:.3f}",
+              " / ".join(noms_drapeaux(d) for d in f.drapeaux) if f.proto == 6 else "", f.etat)
+             for f in flux.top_flux(n, critere)],
+            [(adresse, pe + pr, oe + orc, oe, orc) for adresse, pe, oe, pr, orc in flux.top_hotes(n, critere)],
+            [(nom, p, o, f"{100 * o / flux.octets:.1f} %" if flux.octets else "")
+             for nom, p, o in flux.top_protocoles(n, critere)],
+        )
+        for table, valeurs in zip(self.tables, lignes):
+            table.delete(*table.get_children())
+            for ligne in valeurs:
+                table.insert("", "end", values=ligne)
+        self.resume_label.config(text=f"Paquets : {flux.paquets}   octets : {flux.octets}   flux actifs : {len(flux)}"
+                                      f"   flux expirés : {flux.expires}")
+        self.window.after(self.INTERVALLE, self.rafraichir)
+
+    def extremite(self, adresse, port):
+        if not port:
+            return adresse
+        return f"[{adresse}]:{port}" if ":" in adresse else f"{adresse}:{port}"
+
+
+class PanneauMesures:
+    # État de la chaîne de capture : débits, pertes du noyau et files par
+    # source, latences par étage.
+    INTERVALLE = 1000
+    COLONNES_SOURCES = (("source", "Source", 200), ("recus", "Reçus (noyau)", 110), ("pertes", "Pertes (noyau)", 110),
+                        ("file", "File", 80))
+    COLONNES_ETAGES = (("etage", "Étage", 110), ("nombre", "Mesures", 90), ("moyenne", "Moyenne", 90),
+                       ("p50", "p50", 90), ("p90", "p90", 90), ("p99", "p99", 90), ("max", "Max", 90))
+
+    def __init__(self, parent, mesures):
+        self.mesures = mesures
+        self.window = tk.Toplevel(parent)
+        self.window.title("Mesures")
+        self.window.geometry("700x450")
+
+        self.resume_label = ttk.Label(self.window, text="", justify="left")
+        self.resume_label.pack(anchor="w", padx=10, pady=5)
+        self.tables = []
+        for colonnes, hauteur in ((self.COLONNES_SOURCES, 4), (self.COLONNES_ETAGES, len(ETAGES))):
+            table = ttk.Treeview(self.window, columns=[c[0] for c in colonnes], show="headings", height=hauteur)
+            for cle, texte, largeur in colonnes:
+                table.heading(cle, text=texte)
+                table.column(cle, width=largeur, anchor="w")
+            table.pack(fill="both", expand=True, padx=10, pady=5)
+            self.tables.append(table)
+
+        ttk.Button(self.window, text="Fermer", command=self.window.destroy).pack(pady=5)
+        self.rafraichir()
+
+    def rafraichir(self):
+        if not self.window.winfo_exists():
+            return
+        instantane = self.mesures().instantane()
+
+        def valeur(v):
+            return "-" if v is None else v
+
+        lignes = (
+            [(source["nom"], valeur(source["recus_noyau"]), valeur(source["pertes"]), source["profondeur"])
+             for source in instantane["sources"]],
+            [(etage, resume["nombre"], format_duree(resume["moyenne"]), format_duree(resume["p50"]),
+              format_duree(resume["p90"]), format_duree(resume["p99"]), format_duree(resume["max"]))
+             for etage, resume in instantane["latences"].items()],
+        )
+        for table, valeurs in zip(self.tables, lignes):
+            table.delete(*table.get_children())
+            for ligne in valeurs:
+                table.insert("", "end", values=ligne)
+        self.resume_label.config(
+            text=f"Paquets : {instantane['paquets']}   octets : {instantane['octets']}"
+                 f"   durée : {instantane['duree']:.1f} s\n"
+                 f"Débit : {instantane['paquets_s']:.0f} paquets/s   {instantane['octets_s'] * 8 / 1e6:.2f} Mbit/s\n"
+                 f"File : {instantane['profondeur']} trames (au plus {instantane['profondeur_max']})"
+                 f"   pertes du noyau : {valeur(instantane['pertes'])}")
+        self.window.after(self.INTERVALLE, self.rafraichir)
+
+
 if __name__ == "__main__":
     root = tk.Tk()
     app = SnifferApp(root)
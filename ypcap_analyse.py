@@ -0,0 +1,283 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from ypcap_decodeur import ENREGISTREMENT, decoder_entetes, entetes_tampon
+from ypcap_flux import TableFlux
+from ypcap_lecteur import (EXTENSION_INDEX, PCAP_MAGIQUES, FichierCapture, IndexationAnnulee, colonnes_vides,
+                           parcourir_pcap)
+
+# Analyse complète d'une capture (index des trames, en-têtes décodés, flux,
+# hôtes et protocoles) répartie sur un pool de processus. Un pcap est découpé en
+# plages d'octets : chaque processus se recale sur le premier enregistrement de
+# sa plage, l'indexe, le décode et agrège ses flux. Les résultats sont ensuite
+# mis bout à bout dans l'ordre du fichier ; si une plage ne commence pas là où
+# la précédente s'arrête (recalage trompé), elle est refaite depuis la bonne
+# position, si bien que le résultat est toujours celui d'un seul processus.
+# Un pcapng est indexé en une passe, puis décodé et agrégé par tranches de
+# trames en parallèle.
+TAILLE_MORCEAU = 32 * 1024 * 1024
+TAILLE_LOT = 65536
+SNAPLEN_MAX = 262144
+# Enregistrements enchaînés à vérifier pour accepter une position de recalage.
+CONFIRMATIONS = 8
+# Flux, hôtes et protocoles agrégés, en cache à côté de l'index (.ypx) et
+# valables aux mêmes conditions, pour les mêmes bornes de table.
+EXTENSION_FLUX = ".ypf"
+
+
+def nouvelle_table(complete=False):
+    # Bornée comme pendant une capture, sauf pour comparer deux analyses : seule
+    # une table complète se fusionne exactement.
+    if complete:
+        return TableFlux(expiration=None, max_flux=None, max_hotes=None)
+    return TableFlux()
+
+
+def analyser(fichier, processus=None, taille_morceau=TAILLE_MORCEAU, complete=False):
+    # Indexe fichier (un FichierCapture non ouvert) et renvoie sa table des flux,
+    # complète si demandé ; suit fichier.arret et fichier.avancement comme indexer().
+    flux = _charger_flux(fichier, complete)
+    if flux is not None:
+        fichier.indexer()
+        return flux
+    if processus == 1 or os.path.getsize(fichier.chemin) < 2 * taille_morceau:
+        fichier.indexer()
+        flux = nouvelle_table(complete)
+        if not flux.ajouter_source(fichier, arret=fichier.arret):
+            raise IndexationAnnulee()
+    elif fichier.ouvrir():
+        flux = _agreger_trames(fichier, processus, False, complete)
+    else:
+        if fichier.format == "pcapng":
+            fichier.definir_index(fichier._indexer_pcapng())
+            flux = _agreger_trames(fichier, processus, True, complete)
+        else:
+            flux = _analyser_pcap(fichier, processus, taille_morceau, complete)
+        fichier._enregistrer_index()
+    _enregistrer_flux(fichier, flux)
+    fichier.avancement = 1.0
+    return flux
+
+
+def _charger_flux(fichier, complete):
+    try:
+        with np.load(fichier.chemin + EXTENSION_FLUX) as cache:
+            if not (np.array_equal(cache["signature"], fichier._signature())
+                    and np.array_equal(cache["bornes"], nouvelle_table(complete).colonnes()["bornes"])):
+                return None
+            return TableFlux.depuis_colonnes(cache)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _enregistrer_flux(fichier, flux):
+    temporaire = fichier.chemin + EXTENSION_FLUX + ".tmp"
+    try:
+        with open(temporaire, "wb") as f:
+            np.savez(f, signature=fichier._signature(), **flux.colonnes())
+        os.replace(temporaire, fichier.chemin + EXTENSION_FLUX)
+    except OSError:
+        pass
+
+
+def _executer(fichier, processus, fonction, taches):
+    # Soumet les tâches et renvoie leurs résultats dans l'ordre, en suivant
+    # l'annulation et l'avancement.
+    resultats = [None] * len(taches)
+    with ProcessPoolExecutor(max_workers=processus) as pool:
+        en_cours = {pool.submit(fonction, *tache): i for i, tache in enumerate(taches)}
+        restantes = set(en_cours)
+        while restantes:
+            finies, restantes = wait(restantes, timeout=0.2, return_when=FIRST_COMPLETED)
+            for future in finies:
+                resultats[en_cours[future]] = future.result()
+            fichier.avancement = sum(r is not None for r in resultats) / len(taches)
+            if fichier.arret.is_set():
+                pool.shutdown(cancel_futures=True)
+                raise IndexationAnnulee()
+    return resultats
+
+
+def _analyser_pcap(fichier, processus, taille_morceau, complete):
+    taille = len(fichier._mmap)
+    bornes = list(range(24, taille, taille_morceau)) + [taille]
+    plages = list(zip(bornes[:-1], bornes[1:]))
+    resultats = _executer(fichier, processus, _analyser_plage,
+                          [(fichier.chemin, debut, fin, debut > 24, complete) for debut, fin in plages])
+    colonnes = [[] for _ in range(6)]
+    entetes = []
+    flux = nouvelle_table(complete)
+    attendu = 24
+    for (debut, fin), resultat in zip(plages, resultats):
+        if attendu >= fin:
+            continue
+        if resultat[0] != attendu:
+            resultat = _analyser_plage(fichier.chemin, attendu, fin, False, complete)
+        _, attendu, morceau, entetes_morceau, flux_morceau = resultat
+        for colonne, valeurs in zip(colonnes, morceau):
+            colonne.append(valeurs)
+        entetes.append(entetes_morceau)
+        flux.fusionner(flux_morceau)
+    fichier.definir_index([np.concatenate(c) for c in colonnes], np.concatenate(entetes))
+    return flux
+
+
+def _agreger_trames(fichier, processus, renvoyer_entetes, complete):
+    n = len(fichier)
+    pas = max(TAILLE_LOT, -(-n // (4 * (processus or os.cpu_count() or 1))))
+    tranches = [slice(debut, debut + pas) for debut in range(0, n, pas)]
+    resultats = _executer(fichier, processus, _agreger_tranche,
+                          [(fichier.chemin, fichier.decalages[t], fichier.longueurs[t], fichier.horodatages[t],
+                            fichier.longueurs_originales[t], fichier.linktypes[t], renvoyer_entetes, complete)
+                           for t in tranches])
+    flux = nouvelle_table(complete)
+    for _, flux_tranche in resultats:
+        flux.fusionner(flux_tranche)
+    if renvoyer_entetes:
+        fichier.entetes = np.concatenate([r[0] for r in resultats]) if resultats \
+            else np.zeros(0, dtype=ENREGISTREMENT)
+    return flux
+
+
+def _projeter(chemin):
+    with open(chemin, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _plausible(donnees, position, entete, fraction, snaplen):
+    secondes, fractions, longueur, originale = entete.unpack_from(donnees, position)
+    return fractions < fraction and longueur <= snaplen and longueur <= originale <= 0x7FFFFFFF
+
+
+def _recaler(donnees, debut, fin):
+    # Premier décalage de [debut, fin) où commencent CONFIRMATIONS enregistrements
+    # plausibles enchaînés (ou qui s'enchaînent jusqu'à la fin du fichier).
+    boutisme, fraction = PCAP_MAGIQUES[donnees[:4]]
+    snaplen = struct.unpack_from(boutisme + "I", donnees, 16)[0] or SNAPLEN_MAX
+    snaplen = min(snaplen, SNAPLEN_MAX)
+    entete = struct.Struct(boutisme + "IIII")
+    taille = len(donnees)
+    for candidat in range(debut, min(fin, taille - 15)):
+        position = candidat
+        for _ in range(CONFIRMATIONS):
+            if position == taille:
+                break
+            if position + 16 > taille or not _plausible(donnees, position, entete, fraction, snaplen):
+                position = None
+                break
+            position += 16 + entete.unpack_from(donnees, position)[2]
+            if position > taille:
+                position = None
+                break
+        if position is not None:
+            return candidat
+    return fin
+
+
+def _decoder(donnees, decalages, longueurs, horodatages, originales, linktypes, complete):
+    entetes = np.zeros(len(decalages), dtype=ENREGISTREMENT)
+    flux = nouvelle_table(complete)
+    for debut in range(0, len(decalages), TAILLE_LOT):
+        t = slice(debut, debut + TAILLE_LOT)
+        entetes[t] = decoder_entetes(entetes_tampon(donnees, decalages[t], longueurs[t]), longueurs[t],
+                                     horodatages[t], originales[t], linktypes[t])
+        flux.ajouter_enregistrements(entetes[t])
+    return entetes, flux
+
+
+def _analyser_plage(chemin, debut, fin, recaler, complete):
+    # Processus de travail : (début effectif, position suivante, colonnes,
+    # en-têtes, flux) des enregistrements qui commencent dans [debut, fin).
+    donnees = _projeter(chemin)
+    try:
+        if recaler:
+            debut = _recaler(donnees, debut, fin)
+        colonnes = colonnes_vides()
+        suivant = parcourir_pcap(donnees, debut, fin, colonnes)
+        tableaux = [np.frombuffer(c, dtype=t) if len(c) else np.zeros(0, dtype=t)
+                    for c, t in zip(colonnes, (np.float64, np.int64, np.uint32, np.uint32, np.uint16, np.uint16))]
+        entetes, flux = _decoder(donnees, tableaux[1], tableaux[2], tableaux[0], tableaux[3], tableaux[4],
+                                 complete)
+        return debut, suivant, tableaux, entetes, flux
+    finally:
+        donnees.close()
+
+
+def _agreger_tranche(chemin, decalages, longueurs, horodatages, originales, linktypes, renvoyer_entetes, complete):
+    donnees = _projeter(chemin)
+    try:
+        entetes, flux = _decoder(donnees, decalages, longueurs, horodatages, originales, linktypes, complete)
+        return (entetes if renvoyer_entetes else None), flux
+    finally:
+        donnees.close()
+
+
+def comparer(a, b):
+    # Différences entre deux analyses (fichier indexé, table des flux).
+    (fichier_a, flux_a), (fichier_b, flux_b) = a, b
+    differences = []
+    for nom in ("horodatages", "decalages", "longueurs", "longueurs_originales", "linktypes", "interfaces", "entetes"):
+        if not np.array_equal(getattr(fichier_a, nom), getattr(fichier_b, nom)):
+            differences.append(nom)
+    for nom in ("paquets", "octets", "hotes", "protocoles"):
+        if getattr(flux_a, nom) != getattr(flux_b, nom):
+            differences.append(nom)
+
+    def etats(flux):
+        return {cle: (f.paquets, f.octets, f.drapeaux, f.premier, f.dernier, f.initiateur)
+                for cle, f in flux.flux.items()}
+
+    if etats(flux_a) != etats(flux_b):
+        differences.append("flux")
+    return differences
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse parallèle d'une capture pcap ou pcapng.")
+    parser.add_argument("fichier")
+    parser.add_argument("--processus", type=int, default=None, help="processus de travail (défaut : tous les cœurs)")
+    parser.add_argument("--morceau", type=int, default=TAILLE_MORCEAU // (1024 * 1024),
+                        help="taille des plages d'octets, en Mo")
+    parser.add_argument("--verifier", action="store_true",
+                        help="compare au résultat d'un seul processus (index, en-têtes, flux)")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    def executer(processus):
+        # L'index et les flux en cache fausseraient la mesure et la comparaison.
+        for extension in (EXTENSION_INDEX, EXTENSION_FLUX):
+            if os.path.exists(args.fichier + extension):
+                os.remove(args.fichier + extension)
+        fichier = FichierCapture(args.fichier)
+        debut = time.perf_counter()
+        flux = analyser(fichier, processus, args.morceau * 1024 * 1024, complete=args.verifier)
+        return fichier, flux, time.perf_counter() - debut
+
+    try:
+        fichier, flux, duree = executer(args.processus)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    taille = os.path.getsize(args.fichier)
+    print(f"{len(fichier)} paquets, {len(flux)} flux, {len(flux.hotes)} hôtes en {duree:.2f} s "
+          f"({taille / duree / 1e6:.1f} Mo/s)")
+    for nom, paquets, octets in flux.top_protocoles(args.top):
+        print(f"  {nom:10s} {paquets:>12d} paquets {octets:>15d} octets")
+    if args.verifier:
+        seul, flux_seul, duree_seul = executer(1)
+        differences = comparer((fichier, flux), (seul, flux_seul))
+        print(f"un processus : {duree_seul:.2f} s, accélération x{duree_seul / duree:.2f}, "
+              f"{'identique' if not differences else 'différences : ' + ', '.join(differences)}")
+        return 1 if differences else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
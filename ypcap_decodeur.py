@@ -0,0 +1,335 @@
+import argparse
+import socket
+import sys
+
+import numpy as np
+
+# Décodage rapide des en-têtes courants (Ethernet, VLAN, ARP, IPv4/IPv6, TCP, UDP,
+# ICMP) sur un lot de trames à la fois : les LONGUEUR_ENTETES premiers octets de
+# chaque trame forment une matrice NumPy, et chaque champ est lu pour tout le lot
+# d'un coup, à des décalages qui peuvent varier d'une ligne à l'autre. Les trames
+# non reconnues ont decode = False et passent par scapy.
+LONGUEUR_ENTETES = 128
+LINKTYPE_ETHERNET = 1
+ETHERTYPES_VLAN = (0x8100, 0x88A8, 0x9100)
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_IPV6 = 0x86DD
+ETHERTYPE_ARP = 0x0806
+EXTENSIONS_IPV6 = (0, 43, 60)
+IPV6_FRAGMENT = 44
+TCP, UDP, ICMP, ICMPV6 = 6, 17, 1, 58
+
+# Couche la plus haute décodée.
+COUCHE_INCONNUE, COUCHE_ARP, COUCHE_IP, COUCHE_TCP, COUCHE_UDP, COUCHE_ICMP = range(6)
+NOMS_COUCHES = {COUCHE_ARP: "ARP", COUCHE_TCP: "TCP", COUCHE_UDP: "UDP"}
+
+ENREGISTREMENT = np.dtype([
+    ("horodatage", "f8"),
+    ("longueur", "u4"),
+    ("decode", "?"),
+    ("couche", "u1"),
+    ("mac_src", "u1", (6,)),
+    ("mac_dst", "u1", (6,)),
+    ("ethertype", "u2"),
+    ("vlan", "u2"),
+    ("version", "u1"),
+    ("proto", "u1"),
+    ("ip_src", "u1", (16,)),
+    ("ip_dst", "u1", (16,)),
+    ("ttl", "u1"),
+    ("ip_longueur", "u2"),
+    ("fragment", "u2"),
+    ("sport", "u2"),
+    ("dport", "u2"),
+    ("tcp_flags", "u2"),
+    ("icmp_type", "u1"),
+    ("icmp_code", "u1"),
+    ("arp_op", "u2"),
+    # Octets après le dernier en-tête décodé (TCP/UDP), sinon après l'en-tête IP.
+    ("charge", "u4"),
+])
+
+
+def entetes(trames):
+    # Matrice (n, LONGUEUR_ENTETES) des débuts de trames, complétés par des zéros.
+    L = LONGUEUR_ENTETES
+    bloc = b"".join(bytes(t[:L]).ljust(L, b"\0") for t in trames)
+    return np.frombuffer(bloc, dtype=np.uint8).reshape(-1, L)
+
+
+def entetes_tampon(tampon, decalages, longueurs):
+    # Même matrice, lue directement dans un tampon contigu (stockage, fichier projeté).
+    L = LONGUEUR_ENTETES
+    donnees = np.frombuffer(tampon, dtype=np.uint8)
+    colonnes = np.arange(L)
+    indices = np.asarray(decalages, dtype=np.int64)[:, None] + colonnes
+    presents = colonnes < np.asarray(longueurs, dtype=np.int64)[:, None]
+    M = donnees[np.minimum(indices, len(donnees) - 1)]
+    M[~presents] = 0
+    return M
+
+
+def decoder_entetes(M, longueurs, horodatages=None, longueurs_originales=None, linktypes=None):
+    n = len(M)
+    r = np.arange(n)
+    L = M.shape[1] if n else LONGUEUR_ENTETES
+    c = np.asarray(longueurs, dtype=np.int64)
+    e = np.zeros(n, dtype=ENREGISTREMENT)
+    e["horodatage"] = 0.0 if horodatages is None else horodatages
+    e["longueur"] = c if longueurs_originales is None else longueurs_originales
+    if n == 0:
+        return e
+
+    def octet(off):
+        return M[r, np.minimum(off, L - 1)].astype(np.int64)
+
+    def mot(off):
+        return (octet(off) << 8) | octet(off + 1)
+
+    def octets(off, nombre):
+        return M[r[:, None], np.minimum(off[:, None] + np.arange(nombre), L - 1)]
+
+    eth = c >= 14
+    if linktypes is not None:
+        eth &= np.asarray(linktypes) == LINKTYPE_ETHERNET
+    e["mac_dst"] = M[:, 0:6]
+    e["mac_src"] = M[:, 6:12]
+    off = np.full(n, 14, dtype=np.int64)
+    ethertype = mot(12)
+    vlan = np.zeros(n, dtype=np.int64)
+    for _ in range(2):
+        etiquete = eth & np.isin(ethertype, ETHERTYPES_VLAN) & (c >= off + 4)
+        premiere = etiquete & (vlan == 0)
+        vlan[premiere] = mot(off)[premiere] & 0x0FFF
+        ethertype = np.where(etiquete, mot(off + 2), ethertype)
+        off = np.where(etiquete, off + 4, off)
+    e["ethertype"] = np.where(eth, ethertype, 0)
+    e["vlan"] = vlan
+
+    couche = np.full(n, COUCHE_INCONNUE, dtype=np.int64)
+    charge = np.zeros(n, dtype=np.int64)
+
+    # ARP (Ethernet / IPv4 uniquement)
+    arp = eth & (ethertype == ETHERTYPE_ARP) & (c >= off + 28) & (mot(off) == 1) & (mot(off + 2) == 0x0800) \
+        & (octet(off + 4) == 6) & (octet(off + 5) == 4)
+    e["arp_op"] = np.where(arp, mot(off + 6), 0)
+    couche[arp] = COUCHE_ARP
+
+    # IPv4
+    v4 = eth & (ethertype == ETHERTYPE_IPV4) & (c >= off + 20) & ((octet(off) >> 4) == 4)
+    ihl = (octet(off) & 0x0F) * 4
+    v4 &= ihl >= 20
+    total4 = mot(off + 2)
+    fragment4 = mot(off + 6)
+
+    # IPv6, avec les en-têtes d'extension courants
+    v6 = eth & (ethertype == ETHERTYPE_IPV6) & (c >= off + 40) & ((octet(off) >> 4) == 6)
+    suivant = octet(off + 6)
+    l4_6 = off + 40
+    for _ in range(3):
+        # Un en-tête au-delà des LONGUEUR_ENTETES octets lus laisse la trame à scapy.
+        extension = v6 & np.isin(suivant, EXTENSIONS_IPV6) & (c >= l4_6 + 8) & (l4_6 + 8 <= L)
+        longueur_ext = (octet(l4_6 + 1) + 1) * 8
+        suivant = np.where(extension, octet(l4_6), suivant)
+        l4_6 = np.where(extension, l4_6 + longueur_ext, l4_6)
+    fragment6 = v6 & (suivant == IPV6_FRAGMENT)
+    v6 &= ~np.isin(suivant, EXTENSIONS_IPV6)
+
+    ip = v4 | v6
+    couche[ip] = COUCHE_IP
+    e["version"] = np.where(v4, 4, np.where(v6, 6, 0))
+    proto = np.where(v4, octet(off + 9), np.where(v6, suivant, 0))
+    e["proto"] = proto
+    e["ttl"] = np.where(v4, octet(off + 8), np.where(v6, octet(off + 7), 0))
+    ip_longueur = np.where(v4, total4, np.where(v6, mot(off + 4) + 40, 0))
+    e["ip_longueur"] = ip_longueur
+    e["fragment"] = np.where(v4, fragment4, 0)
+    l4 = np.where(v4, off + ihl, l4_6)
+    charge_ip = np.where(v4, total4 - ihl, np.where(v6, mot(off + 4) - (l4_6 - off - 40), 0))
+    charge[ip] = charge_ip[ip]
+
+    sources = np.zeros((n, 16), dtype=np.uint8)
+    destinations = np.zeros((n, 16), dtype=np.uint8)
+    sources[v4, :4] = octets(off + 12, 4)[v4]
+    destinations[v4, :4] = octets(off + 16, 4)[v4]
+    sources[v6] = octets(off + 8, 16)[v6]
+    destinations[v6] = octets(off + 24, 16)[v6]
+    sources[arp, :4] = octets(off + 14, 4)[arp]
+    destinations[arp, :4] = octets(off + 24, 4)[arp]
+    e["ip_src"] = sources
+    e["ip_dst"] = destinations
+
+    # Couche 4, seulement sur le premier fragment, et entière dans les octets lus
+    premier_fragment = (v4 & ((fragment4 & 0x1FFF) == 0)) | (v6 & ~fragment6)
+    tcp = premier_fragment & (proto == TCP) & (c >= l4 + 20) & (l4 + 20 <= L)
+    udp = premier_fragment & (proto == UDP) & (c >= l4 + 8) & (l4 + 8 <= L)
+    icmp = premier_fragment & (((v4 & (proto == ICMP)) | (v6 & (proto == ICMPV6)))) & (c >= l4 + 4) \
+        & (l4 + 4 <= L)
+    ports = tcp | udp
+    e["sport"] = np.where(ports, mot(l4), 0)
+    e["dport"] = np.where(ports, mot(l4 + 2), 0)
+    e["tcp_flags"] = np.where(tcp, ((octet(l4 + 12) & 1) << 8) | octet(l4 + 13), 0)
+    e["icmp_type"] = np.where(icmp, octet(l4), 0)
+    e["icmp_code"] = np.where(icmp, octet(l4 + 1), 0)
+    charge = np.where(tcp, charge_ip - (octet(l4 + 12) >> 4) * 4, charge)
+    charge = np.where(udp, mot(l4 + 4) - 8, charge)
+    couche[tcp] = COUCHE_TCP
+    couche[udp] = COUCHE_UDP
+    couche[icmp] = COUCHE_ICMP
+    e["couche"] = couche
+    e["charge"] = np.maximum(charge, 0)
+
+    # Décodé : ARP, TCP, UDP, ICMP, ou fragment IP non initial ; le reste passe
+    # par scapy.
+    fragment_suivant = (v4 & ((fragment4 & 0x1FFF) != 0)) | fragment6
+    e["decode"] = arp | tcp | udp | icmp | fragment_suivant
+    return e
+
+
+def decoder_lot(trames, horodatages=None, longueurs_originales=None, linktypes=None):
+    return decoder_entetes(entetes(trames), [len(t) for t in trames], horodatages, longueurs_originales, linktypes)
+
+
+def decoder(donnees, horodatage=0.0, longueur_originale=None, linktype=LINKTYPE_ETHERNET):
+    return decoder_lot([donnees], [horodatage], None if longueur_originale is None else [longueur_originale],
+                       [linktype])[0]
+
+
+def format_mac(octets):
+    return ":".join(f"{o:02x}" for o in octets)
+
+
+def format_ip(octets, version):
+    if version == 6:
+        return socket.inet_ntop(socket.AF_INET6, bytes(octets))
+    return ".".join(str(o) for o in octets[:4])
+
+
+def resumer_enregistrement(e):
+    # (source, destination, protocole) d'un enregistrement décodé, comme resumer().
+    if e["couche"] == COUCHE_ARP:
+        return format_ip(e["ip_src"], 4), format_ip(e["ip_dst"], 4), "ARP"
+    version = int(e["version"])
+    source, destination = format_ip(e["ip_src"], version), format_ip(e["ip_dst"], version)
+    if e["couche"] == COUCHE_ICMP:
+        return source, destination, "ICMPv6" if version == 6 else "ICMP"
+    if e["couche"] in NOMS_COUCHES:
+        return source, destination, NOMS_COUCHES[int(e["couche"])]
+    return source, destination, "IPv6" if version == 6 else "IP"
+
+
+def comparer_scapy(trames, linktypes=None):
+    # Compare, trame par trame, les champs du décodage rapide à ceux de scapy.
+    # Renvoie (nombre de trames décodées, liste des écarts).
+    import scapy.all as scapy
+
+    enregistrements = decoder_lot(trames, linktypes=linktypes)
+    ecarts = []
+    for i, (donnees, e) in enumerate(zip(trames, enregistrements)):
+        if not e["decode"]:
+            continue
+        pkt = scapy.Ether(donnees)
+        attendus = {"mac_src": pkt.src, "mac_dst": pkt.dst}
+        obtenus = {"mac_src": format_mac(e["mac_src"]), "mac_dst": format_mac(e["mac_dst"])}
+        if isinstance(pkt.payload, scapy.Dot1Q):
+            # Étiquette extérieure, Dot1AD compris.
+            attendus["vlan"] = pkt.payload.vlan
+            obtenus["vlan"] = int(e["vlan"])
+        if pkt.haslayer(scapy.ARP):
+            a = pkt[scapy.ARP]
+            attendus.update(arp_op=a.op, ip_src=a.psrc, ip_dst=a.pdst)
+            obtenus.update(arp_op=int(e["arp_op"]), ip_src=format_ip(e["ip_src"], 4),
+                           ip_dst=format_ip(e["ip_dst"], 4))
+        elif pkt.haslayer(scapy.IP):
+            couche = pkt[scapy.IP]
+            attendus.update(ip_src=couche.src, ip_dst=couche.dst, ttl=couche.ttl, proto=couche.proto,
+                            ip_longueur=couche.len, fragment=(int(couche.flags) << 13) | couche.frag)
+            obtenus.update(ip_src=format_ip(e["ip_src"], 4), ip_dst=format_ip(e["ip_dst"], 4), ttl=int(e["ttl"]),
+                           proto=int(e["proto"]), ip_longueur=int(e["ip_longueur"]), fragment=int(e["fragment"]))
+        elif pkt.haslayer(scapy.IPv6):
+            couche = pkt[scapy.IPv6]
+            attendus.update(ip_src=couche.src, ip_dst=couche.dst, ttl=couche.hlim, ip_longueur=couche.plen + 40)
+            obtenus.update(ip_src=format_ip(e["ip_src"], 6), ip_dst=format_ip(e["ip_dst"], 6), ttl=int(e["ttl"]),
+                           ip_longueur=int(e["ip_longueur"]))
+        if e["couche"] == COUCHE_TCP:
+            couche = pkt[scapy.TCP]
+            charge = len(couche.payload)
+            if pkt.haslayer(scapy.Padding):
+                charge -= len(pkt[scapy.Padding])
+            attendus.update(sport=couche.sport, dport=couche.dport, tcp_flags=int(couche.flags), charge=charge)
+            obtenus.update(sport=int(e["sport"]), dport=int(e["dport"]), tcp_flags=int(e["tcp_flags"]),
+                           charge=int(e["charge"]))
+        elif e["couche"] == COUCHE_UDP:
+            couche = pkt[scapy.UDP]
+            attendus.update(sport=couche.sport, dport=couche.dport, charge=couche.len - 8)
+            obtenus.update(sport=int(e["sport"]), dport=int(e["dport"]), charge=int(e["charge"]))
+        elif e["couche"] == COUCHE_ICMP:
+            if e["version"] == 4:
+                couche = pkt[scapy.ICMP]
+            else:
+                couche = next(c for c in pkt.iterpayloads() if c.name.startswith("ICMPv6"))
+            attendus.update(icmp_type=couche.type, icmp_code=couche.code)
+            obtenus.update(icmp_type=int(e["icmp_type"]), icmp_code=int(e["icmp_code"]))
+        for cle, valeur in attendus.items():
+            if obtenus[cle] != valeur:
+                ecarts.append((i, cle, valeur, obtenus[cle]))
+    return int(enregistrements["decode"].sum()), ecarts
+
+
+def trames_exemple():
+    # Trames couvrant chaque cas du décodeur, pour la vérification sans fichier.
+    import scapy.all as scapy
+
+    Ether = scapy.Ether
+    modeles = [
+        Ether() / scapy.IP(src="10.0.0.1", dst="10.0.0.2", ttl=17) / scapy.TCP(sport=1234, dport=80, flags="SA") / b"abc",
+        Ether() / scapy.IP(options=[scapy.IPOption_RR()]) / scapy.TCP(options=[("MSS", 1460)], flags="PAUEC"),
+        Ether() / scapy.IP() / scapy.UDP(sport=53, dport=5353) / scapy.DNS(),
+        Ether() / scapy.IP() / scapy.ICMP(type=8) / b"ping",
+        Ether() / scapy.Dot1Q(vlan=42) / scapy.IP() / scapy.UDP() / (b"x" * 30),
+        Ether() / scapy.Dot1AD(vlan=7) / scapy.Dot1Q(vlan=300) / scapy.IP() / scapy.TCP(),
+        Ether() / scapy.ARP(op=2, psrc="192.168.1.1", pdst="192.168.1.20"),
+        Ether() / scapy.IPv6(src="2001:db8::1", dst="fe80::2", hlim=3) / scapy.TCP(sport=443, dport=50000) / (b"z" * 9),
+        Ether() / scapy.IPv6() / scapy.IPv6ExtHdrHopByHop() / scapy.IPv6ExtHdrDestOpt() / scapy.UDP() / b"q",
+        Ether() / scapy.IPv6() / scapy.ICMPv6EchoRequest(),
+        Ether() / scapy.IP(flags="MF", frag=0) / scapy.UDP() / (b"f" * 40),
+        Ether() / scapy.IP(frag=100, proto=17) / (b"g" * 40),
+        Ether() / scapy.IP() / scapy.GRE() / scapy.IP() / scapy.UDP(),
+        Ether(type=0x88CC) / (b"\x02\x07\x04" + b"\0" * 40),
+    ]
+    trames = [bytes(m) for m in modeles]
+    trames.append(trames[0][:30])
+    trames.append(bytes(Ether() / scapy.IP() / scapy.TCP(dport=22)) + b"\0" * 6)
+    # En-tête TCP au-delà des LONGUEUR_ENTETES premiers octets.
+    trames.append(bytes(Ether() / scapy.IPv6() / scapy.IPv6ExtHdrHopByHop(options=[scapy.PadN(optdata=b"\0" * 100)])
+                        / scapy.TCP(sport=1111, dport=2222)))
+    return trames
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vérifie le décodage rapide des en-têtes contre scapy.")
+    parser.add_argument("fichiers", nargs="*", help="captures pcap ou pcapng (par défaut : trames d'exemple)")
+    args = parser.parse_args(argv)
+
+    from ypcap_lecteur import FichierCapture
+
+    lots = []
+    if not args.fichiers:
+        trames = trames_exemple()
+        lots.append(("trames d'exemple", trames, [LINKTYPE_ETHERNET] * len(trames)))
+    for chemin in args.fichiers:
+        fichier = FichierCapture(chemin)
+        fichier.indexer()
+        lots.append((chemin, [fichier.brut(i) for i in range(len(fichier))], fichier.linktypes))
+    erreurs = 0
+    for nom, trames, linktypes in lots:
+        decodes, ecarts = comparer_scapy(trames, linktypes)
+        print(f"{nom} : {len(trames)} trames, {decodes} décodées sans scapy, {len(ecarts)} écarts")
+        for i, cle, attendu, obtenu in ecarts[:20]:
+            print(f"  trame {i} {cle} : scapy {attendu!r}, rapide {obtenu!r}")
+        erreurs += len(ecarts)
+    return 1 if erreurs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
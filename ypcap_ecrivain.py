@@ -0,0 +1,108 @@
+import os
+import struct
+import time
+
+PCAP_MAGIQUE = 0xA1B2C3D4
+SNAPLEN = 262144
+ENTETE_PAQUET = struct.Struct("<IIII")
+
+
+class EcrivainRotatif:
+    # Écriture de la capture au fil de l'eau : chaque trame est ajoutée à un tampon
+    # écrit d'un bloc sur disque dès qu'il est plein ou trop ancien. Les fichiers
+    # tournent par taille et/ou par durée, et seuls les nb_fichiers derniers sont
+    # gardés (anneau de fichiers, comme dumpcap -b).
+    TAILLE_TAMPON = 1024 * 1024
+    INTERVALLE_VIDAGE = 1.0
+
+    def __init__(self, chemin, taille_max=None, duree_max=None, nb_fichiers=None, taille_tampon=TAILLE_TAMPON):
+        racine, extension = os.path.splitext(chemin)
+        self.racine = racine
+        self.extension = extension or ".pcap"
+        self.taille_max = taille_max
+        self.duree_max = duree_max
+        self.nb_fichiers = nb_fichiers
+        self.taille_tampon = taille_tampon
+        self.fichiers = []
+        self.numero = 0
+        self.paquets_ecrits = 0
+        self.octets_ecrits = 0
+        self._fichier = None
+        self._linktype = None
+        self._tampon = bytearray()
+        self._taille_fichier = 0
+        self._debut_fichier = None
+        self._dernier_vidage = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+    @property
+    def fichier_courant(self):
+        return self.fichiers[-1] if self.fichiers else None
+
+    def _ouvrir(self, horodatage, linktype):
+        self.numero += 1
+        chemin = f"{self.racine}_{self.numero:05d}_{time.strftime('%Y%m%d%H%M%S', time.localtime(horodatage))}" \
+                 f"{self.extension}"
+        self._fichier = open(chemin, "wb")
+        self._linktype = linktype
+        self._tampon += struct.pack("<IHHiIII", PCAP_MAGIQUE, 2, 4, 0, 0, SNAPLEN, linktype)
+        self._taille_fichier = 24
+        self._debut_fichier = horodatage
+        self.fichiers.append(chemin)
+        while self.nb_fichiers and len(self.fichiers) > self.nb_fichiers:
+            ancien = self.fichiers.pop(0)
+            try:
+                os.remove(ancien)
+            except OSError:
+                pass
+
+    def _tourner(self, taille, horodatage, linktype):
+        if self._fichier is None:
+            return True
+        if linktype != self._linktype:
+            return True
+        if self._taille_fichier <= 24:
+            return False
+        if self.taille_max and self._taille_fichier + taille > self.taille_max:
+            return True
+        return bool(self.duree_max) and horodatage - self._debut_fichier >= self.duree_max
+
+    def ecrire(self, donnees, horodatage, longueur_originale=None, linktype=1):
+        taille = ENTETE_PAQUET.size + len(donnees)
+        if self._tourner(taille, horodatage, linktype):
+            self._fermer_fichier()
+            self._ouvrir(horodatage, linktype)
+        secondes, microsecondes = divmod(int(round(horodatage * 1e6)), 1000000)
+        self._tampon += ENTETE_PAQUET.pack(secondes, microsecondes, len(donnees),
+                                           len(donnees) if longueur_originale is None else longueur_originale)
+        self._tampon += donnees
+        self._taille_fichier += taille
+        self.paquets_ecrits += 1
+        self.octets_ecrits += taille
+        self.vider()
+
+    def vider(self, force=False):
+        # Écrit le tampon s'il est plein, s'il attend depuis plus de
+        # INTERVALLE_VIDAGE, ou sur demande.
+        if self._fichier is None or not self._tampon:
+            return
+        if force or len(self._tampon) >= self.taille_tampon \
+                or time.monotonic() - self._dernier_vidage >= self.INTERVALLE_VIDAGE:
+            self._fichier.write(self._tampon)
+            self._fichier.flush()
+            self._tampon.clear()
+            self._dernier_vidage = time.monotonic()
+
+    def _fermer_fichier(self):
+        if self._fichier is not None:
+            self.vider(force=True)
+            self._fichier.close()
+            self._fichier = None
+
+    def fermer(self):
+        self._fermer_fichier()
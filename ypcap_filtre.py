@@ -0,0 +1,294 @@
+import operator
+import re
+import socket
+
+import numpy as np
+
+from ypcap_decodeur import COUCHE_ARP, COUCHE_ICMP, COUCHE_TCP, COUCHE_UDP
+
+# Filtres d'affichage à la Wireshark, évalués sur l'index en colonnes des
+# en-têtes décodés (un tableau ENREGISTREMENT par source) :
+#
+#   ip.src == 10.0.0.1 and tcp.port == 443
+#   len > 1000 or not (arp or icmp)
+#   ip.addr == 192.168.0.0/16 && tcp.flags.syn
+#
+# Le texte est compilé une fois en une fonction qui calcule un masque booléen
+# pour tout le lot avec des opérations NumPy : aucun paquet n'est redisséqué.
+# Un champ composé (ip.addr, tcp.port, eth.addr...) est égal à une valeur si
+# l'une de ses composantes l'est, et différent si aucune ne l'est. Comme toute
+# comparaison, « a != b » demande que le champ soit présent : une trame ARP ne
+# vérifie pas « ip.src != 10.0.0.1 », alors qu'elle vérifie
+# « not ip.src == 10.0.0.1 ».
+
+PROTOCOLES = {
+    "eth": lambda e: e["ethertype"] != 0,
+    "vlan": lambda e: e["vlan"] != 0,
+    "arp": lambda e: e["couche"] == COUCHE_ARP,
+    "ip": lambda e: e["version"] == 4,
+    "ipv6": lambda e: e["version"] == 6,
+    "tcp": lambda e: e["couche"] == COUCHE_TCP,
+    "udp": lambda e: e["couche"] == COUCHE_UDP,
+    "icmp": lambda e: (e["couche"] == COUCHE_ICMP) & (e["version"] == 4),
+    "icmpv6": lambda e: (e["couche"] == COUCHE_ICMP) & (e["version"] == 6),
+}
+
+# nom -> (type, colonnes, protocole requis)
+CHAMPS = {
+    "frame.len": ("nombre", ("longueur",), None),
+    "frame.time": ("nombre", ("horodatage",), None),
+    "frame.number": ("nombre", ("numero",), None),
+    "eth.src": ("mac", ("mac_src",), "eth"),
+    "eth.dst": ("mac", ("mac_dst",), "eth"),
+    "eth.addr": ("mac", ("mac_src", "mac_dst"), "eth"),
+    "eth.type": ("nombre", ("ethertype",), "eth"),
+    "vlan.id": ("nombre", ("vlan",), "vlan"),
+    "ip.src": ("ipv4", ("ip_src",), "ip"),
+    "ip.dst": ("ipv4", ("ip_dst",), "ip"),
+    "ip.addr": ("ipv4", ("ip_src", "ip_dst"), "ip"),
+    "ip.ttl": ("nombre", ("ttl",), "ip"),
+    "ip.proto": ("nombre", ("proto",), "ip"),
+    "ip.len": ("nombre", ("ip_longueur",), "ip"),
+    "ipv6.src": ("ipv6", ("ip_src",), "ipv6"),
+    "ipv6.dst": ("ipv6", ("ip_dst",), "ipv6"),
+    "ipv6.addr": ("ipv6", ("ip_src", "ip_dst"), "ipv6"),
+    "ipv6.hlim": ("nombre", ("ttl",), "ipv6"),
+    "ipv6.nxt": ("nombre", ("proto",), "ipv6"),
+    "tcp.srcport": ("nombre", ("sport",), "tcp"),
+    "tcp.dstport": ("nombre", ("dport",), "tcp"),
+    "tcp.port": ("nombre", ("sport", "dport"), "tcp"),
+    "tcp.flags": ("nombre", ("tcp_flags",), "tcp"),
+    "tcp.len": ("nombre", ("charge",), "tcp"),
+    "udp.srcport": ("nombre", ("sport",), "udp"),
+    "udp.dstport": ("nombre", ("dport",), "udp"),
+    "udp.port": ("nombre", ("sport", "dport"), "udp"),
+    "udp.len": ("nombre", ("charge",), "udp"),
+    "icmp.type": ("nombre", ("icmp_type",), "icmp"),
+    "icmp.code": ("nombre", ("icmp_code",), "icmp"),
+    "icmpv6.type": ("nombre", ("icmp_type",), "icmpv6"),
+    "icmpv6.code": ("nombre", ("icmp_code",), "icmpv6"),
+    "arp.opcode": ("nombre", ("arp_op",), "arp"),
+    "arp.src.proto_ipv4": ("ipv4", ("ip_src",), "arp"),
+    "arp.dst.proto_ipv4": ("ipv4", ("ip_dst",), "arp"),
+}
+ALIAS = {"len": "frame.len", "time": "frame.time"}
+# Drapeaux TCP : tcp.flags.syn vaut 1 si le bit est mis.
+DRAPEAUX = {"fin": 0x01, "syn": 0x02, "reset": 0x04, "rst": 0x04, "push": 0x08, "psh": 0x08, "ack": 0x10,
+            "urg": 0x20, "ece": 0x40, "cwr": 0x80, "ns": 0x100}
+for _nom, _bit in DRAPEAUX.items():
+    CHAMPS[f"tcp.flags.{_nom}"] = ("drapeau", (_bit,), "tcp")
+
+COMPARAISONS = {"==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le, ">": operator.gt,
+                ">=": operator.ge}
+MOTS_COMPARAISONS = {"eq": "==", "ne": "!=", "lt": "<", "le": "<=", "gt": ">", "ge": ">="}
+MOTS_LOGIQUES = {"and": "and", "&&": "and", "or": "or", "||": "or", "not": "not", "!": "not"}
+
+LEXEMES = re.compile(r"\s*(?:(==|!=|<=|>=|<|>|&&|\|\||!|\(|\))|([\w.:/\-]+))")
+
+
+class ErreurFiltre(ValueError):
+    def __init__(self, message, position=None):
+        super().__init__(message if position is None else f"{message} (position {position + 1})")
+        self.position = position
+
+
+class Colonnes:
+    # Colonnes calculées à la demande sur un lot d'enregistrements (adresses en
+    # entiers, numéros de paquets) et gardées pour les filtres suivants.
+    def __init__(self, enregistrements, premier_numero=1):
+        self.enregistrements = enregistrements
+        self.premier_numero = premier_numero
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.enregistrements)
+
+    def __getitem__(self, nom):
+        return self.enregistrements[nom]
+
+    def colonne(self, type_champ, nom):
+        cle = (type_champ, nom)
+        if cle not in self._cache:
+            self._cache[cle] = self._calculer(type_champ, nom)
+        return self._cache[cle]
+
+    def _calculer(self, type_champ, nom):
+        e = self.enregistrements
+        if type_champ == "drapeau":
+            return ((e["tcp_flags"] & nom) != 0).astype(np.int64)
+        if nom == "numero":
+            return np.arange(self.premier_numero, self.premier_numero + len(e), dtype=np.int64)
+        if type_champ == "ipv4":
+            return np.ascontiguousarray(e[nom][:, :4]).view(">u4").ravel().astype(np.int64)
+        if type_champ == "ipv6":
+            moities = np.ascontiguousarray(e[nom]).view(">u8")
+            return moities[:, 0], moities[:, 1]
+        if type_champ == "mac":
+            octets = np.zeros((len(e), 8), dtype=np.uint8)
+            octets[:, 2:] = e[nom]
+            return octets.view(">u8").ravel().astype(np.int64)
+        return e[nom]
+
+
+def lire_valeur(type_champ, texte, position):
+    # Renvoie (valeur, masque) ; le masque ne sert qu'aux préfixes d'adresses.
+    try:
+        if type_champ in ("nombre", "drapeau"):
+            if texte in ("true", "false"):
+                return int(texte == "true"), None
+            try:
+                return int(texte, 0), None
+            except ValueError:
+                return float(texte), None
+        if type_champ == "mac":
+            octets = bytes(int(o, 16) for o in re.split("[:-]", texte))
+            if len(octets) != 6:
+                raise ValueError(texte)
+            return int.from_bytes(octets, "big"), None
+        adresse, _, prefixe = texte.partition("/")
+        if type_champ == "ipv4":
+            valeur = int.from_bytes(socket.inet_pton(socket.AF_INET, adresse), "big")
+            bits = 32 if not prefixe else int(prefixe)
+            if not 0 <= bits <= 32:
+                raise ValueError(texte)
+            masque = (0xFFFFFFFF << (32 - bits)) & 0xFFFFFFFF
+            return valeur & masque, (masque if prefixe else None)
+        valeur = int.from_bytes(socket.inet_pton(socket.AF_INET6, adresse), "big")
+        bits = 128 if not prefixe else int(prefixe)
+        if not 0 <= bits <= 128:
+            raise ValueError(texte)
+        masque = ((1 << 128) - 1) ^ ((1 << (128 - bits)) - 1)
+        return valeur & masque, masque
+    except (ValueError, OSError):
+        raise ErreurFiltre(f"valeur invalide pour un champ {type_champ} : {texte}", position) from None
+
+
+class Filtre:
+    # Filtre d'affichage compilé ; appliquer() renvoie le masque des paquets
+    # retenus dans un lot d'enregistrements.
+    def __init__(self, texte):
+        self.texte = texte
+        self._lexemes = self._decouper(texte)
+        self._i = 0
+        if not self._lexemes:
+            raise ErreurFiltre("filtre vide")
+        self._predicat = self._ou()
+        if self._i < len(self._lexemes):
+            valeur, position = self._lexemes[self._i]
+            raise ErreurFiltre(f"« {valeur} » inattendu", position)
+
+    def appliquer(self, enregistrements, premier_numero=1):
+        colonnes = enregistrements if isinstance(enregistrements, Colonnes) \
+            else Colonnes(enregistrements, premier_numero)
+        masque = self._predicat(colonnes)
+        return np.broadcast_to(masque, (len(colonnes),)).copy()
+
+    def indices(self, enregistrements, premier_numero=1):
+        return np.flatnonzero(self.appliquer(enregistrements, premier_numero))
+
+    def _decouper(self, texte):
+        lexemes = []
+        position = 0
+        while position < len(texte):
+            m = LEXEMES.match(texte, position)
+            if m is None:
+                reste = texte[position:]
+                if not reste.strip():
+                    break
+                position += len(reste) - len(reste.lstrip())
+                raise ErreurFiltre(f"caractère inattendu « {texte[position]} »", position)
+            lexemes.append((m.group(1) or m.group(2), m.start(m.lastindex)))
+            position = m.end()
+        return lexemes
+
+    def _suivant(self):
+        return self._lexemes[self._i][0] if self._i < len(self._lexemes) else None
+
+    def _consommer(self):
+        valeur, position = self._lexemes[self._i] if self._i < len(self._lexemes) else (None, len(self.texte))
+        if valeur is None:
+            raise ErreurFiltre("fin du filtre inattendue", position)
+        self._i += 1
+        return valeur, position
+
+    def _ou(self):
+        gauche = self._et()
+        while MOTS_LOGIQUES.get(self._suivant()) == "or":
+            self._consommer()
+            gauche = (lambda a, b: lambda c: a(c) | b(c))(gauche, self._et())
+        return gauche
+
+    def _et(self):
+        gauche = self._non()
+        while MOTS_LOGIQUES.get(self._suivant()) == "and":
+            self._consommer()
+            gauche = (lambda a, b: lambda c: a(c) & b(c))(gauche, self._non())
+        return gauche
+
+    def _non(self):
+        if MOTS_LOGIQUES.get(self._suivant()) == "not":
+            self._consommer()
+            operande = self._non()
+            return lambda c: ~operande(c)
+        return self._terme()
+
+    def _terme(self):
+        valeur, position = self._consommer()
+        if valeur == "(":
+            expression = self._ou()
+            if self._suivant() != ")":
+                raise ErreurFiltre("« ) » attendu", self._lexemes[self._i][1] if self._i < len(self._lexemes)
+                                   else len(self.texte))
+            self._consommer()
+            return expression
+        nom = ALIAS.get(valeur, valeur)
+        operateur = MOTS_COMPARAISONS.get(self._suivant(), self._suivant())
+        if operateur in COMPARAISONS:
+            if nom not in CHAMPS:
+                raise ErreurFiltre(f"champ inconnu « {valeur} »", position)
+            self._consommer()
+            texte, position_valeur = self._consommer()
+            return self._comparaison(nom, operateur, texte, position_valeur)
+        if nom in PROTOCOLES:
+            return PROTOCOLES[nom]
+        if nom in CHAMPS:
+            type_champ, colonnes, protocole = CHAMPS[nom]
+            if type_champ == "drapeau":
+                return self._comparaison(nom, "==", "1", position)
+            return PROTOCOLES[protocole] if protocole else (lambda c: np.True_)
+        raise ErreurFiltre(f"champ ou protocole inconnu « {valeur} »", position)
+
+    def _comparaison(self, nom, operateur, texte, position):
+        type_champ, colonnes, protocole = CHAMPS[nom]
+        valeur, masque = lire_valeur(type_champ, texte, position)
+        if type_champ == "ipv6" and operateur not in ("==", "!="):
+            raise ErreurFiltre(f"« {operateur} » impossible sur une adresse IPv6", position)
+        if masque is not None and operateur not in ("==", "!="):
+            raise ErreurFiltre(f"« {operateur} » impossible avec un préfixe d'adresse", position)
+        present = PROTOCOLES[protocole] if protocole else (lambda c: np.True_)
+
+        if type_champ == "ipv6":
+            haut, bas = valeur >> 64, valeur & 0xFFFFFFFFFFFFFFFF
+            masque_haut, masque_bas = np.uint64(masque >> 64), np.uint64(masque & 0xFFFFFFFFFFFFFFFF)
+
+            def composante(c, nom_colonne):
+                h, b = c.colonne(type_champ, nom_colonne)
+                return ((h & masque_haut) == np.uint64(haut)) & ((b & masque_bas) == np.uint64(bas))
+        elif masque is not None:
+            def composante(c, nom_colonne):
+                return (c.colonne(type_champ, nom_colonne) & masque) == valeur
+        else:
+            comparer = COMPARAISONS["==" if operateur == "!=" else operateur]
+
+            def composante(c, nom_colonne):
+                return comparer(c.colonne(type_champ, nom_colonne), valeur)
+
+        def une_composante(c):
+            resultat = composante(c, colonnes[0])
+            for nom_colonne in colonnes[1:]:
+                resultat = resultat | composante(c, nom_colonne)
+            return resultat
+
+        if operateur == "!=":
+            return lambda c: present(c) & ~une_composante(c)
+        return lambda c: present(c) & une_composante(c)
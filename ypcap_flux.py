@@ -0,0 +1,364 @@
+import heapq
+import threading
+
+import numpy as np
+
+from ypcap_decodeur import COUCHE_TCP, decoder_lot, format_ip
+
+PROTOCOLES_IP = {1: "ICMP", 2: "IGMP", 6: "TCP", 17: "UDP", 47: "GRE", 50: "ESP", 51: "AH", 58: "ICMPv6",
+                 89: "OSPF", 132: "SCTP"}
+ETHERTYPES = {0x0800: "IPv4", 0x0806: "ARP", 0x86DD: "IPv6", 0x88CC: "LLDP", 0x8863: "PPPoE", 0x8864: "PPPoE",
+              0x888E: "EAPOL", 0x8847: "MPLS", 0x88F7: "PTP"}
+DRAPEAUX_TCP = ((0x02, "SYN"), (0x10, "ACK"), (0x08, "PSH"), (0x01, "FIN"), (0x04, "RST"), (0x20, "URG"))
+
+# Clé d'un flux, normalisée pour que les deux sens d'une conversation tombent
+# sur le même flux : (adresse, port) A est la plus petite des deux extrémités.
+CLE = np.dtype([
+    ("version", "u1"),
+    ("proto", "u1"),
+    ("ip_a", "u1", (16,)),
+    ("ip_b", "u1", (16,)),
+    ("port_a", "u2"),
+    ("port_b", "u2"),
+])
+
+
+def nom_protocole(version, proto, ethertype=0):
+    # Trames non IP (ou IP tronquées) : nommées d'après l'ethertype.
+    if version:
+        return PROTOCOLES_IP.get(proto, f"IP {proto}")
+    if ethertype in ETHERTYPES:
+        return ETHERTYPES[ethertype]
+    return f"0x{ethertype:04x}" if ethertype else "Autre"
+
+
+def noms_drapeaux(drapeaux):
+    return ",".join(nom for bit, nom in DRAPEAUX_TCP if drapeaux & bit)
+
+
+def _grouper(cles):
+    # Regroupe les lignes de même clé : renvoie les clés distinctes, l'indice de
+    # groupe de chaque ligne, et l'ordre / les débuts de groupes pour reduceat.
+    vue = np.ascontiguousarray(cles).view(f"V{cles.dtype.itemsize}").ravel()
+    distinctes, groupes = np.unique(vue, return_inverse=True)
+    ordre = np.argsort(groupes, kind="stable")
+    debuts = np.flatnonzero(np.r_[True, np.diff(groupes[ordre]) != 0])
+    return distinctes, groupes.ravel(), ordre, debuts
+
+
+class Flux:
+    # Compteurs d'une conversation ; les indices 0 et 1 des listes sont les sens
+    # A -> B et B -> A.
+    def __init__(self, version, proto, adresse_a, adresse_b, port_a, port_b, premier, initiateur):
+        self.version = version
+        self.proto = proto
+        self.adresse_a = adresse_a
+        self.adresse_b = adresse_b
+        self.port_a = port_a
+        self.port_b = port_b
+        self.premier = premier
+        self.dernier = premier
+        # Sens du premier paquet vu (0 : A a parlé le premier).
+        self.initiateur = initiateur
+        self.paquets = [0, 0]
+        self.octets = [0, 0]
+        self.drapeaux = [0, 0]
+
+    @property
+    def protocole(self):
+        return nom_protocole(self.version, self.proto)
+
+    @property
+    def total_paquets(self):
+        return self.paquets[0] + self.paquets[1]
+
+    @property
+    def total_octets(self):
+        return self.octets[0] + self.octets[1]
+
+    @property
+    def duree(self):
+        return self.dernier - self.premier
+
+    @property
+    def etat(self):
+        # Résumé TCP à partir des drapeaux vus dans chaque sens.
+        if self.proto != 6:
+            return ""
+        tous = self.drapeaux[0] | self.drapeaux[1]
+        if tous & 0x04:
+            return "réinitialisé"
+        if self.drapeaux[0] & 0x01 and self.drapeaux[1] & 0x01:
+            return "fermé"
+        if tous & 0x01:
+            return "fermeture"
+        if tous & 0x02 and not tous & 0x10:
+            return "ouverture"
+        return "établi"
+
+
+class TableFlux:
+    # Table des flux mise à jour par lots, au fil de la capture ou de la lecture
+    # d'un fichier. Les flux inactifs depuis plus de `expiration` secondes (temps
+    # des paquets) sont retirés, et au-delà de max_flux les moins récents sont
+    # évincés : la mémoire reste bornée quelle que soit la durée de la capture.
+    # Les totaux par hôte et par protocole sont cumulés à part et ne dépendent pas
+    # des flux encore présents. Avec expiration, max_flux et max_hotes à None, la
+    # table est complète et deux tables peuvent être fusionnées exactement.
+    EXPIRATION = 300.0
+    MAX_FLUX = 200000
+    MAX_HOTES = 100000
+    TAILLE_LOT = 65536
+
+    def __init__(self, expiration=EXPIRATION, max_flux=MAX_FLUX, max_hotes=MAX_HOTES):
+        self.expiration = expiration
+        self.max_flux = max_flux
+        self.max_hotes = max_hotes
+        self.verrou = threading.Lock()
+        self.flux = {}
+        # adresse -> [paquets envoyés, octets envoyés, paquets reçus, octets reçus]
+        self.hotes = {}
+        # nom -> [paquets, octets]
+        self.protocoles = {}
+        self.paquets = 0
+        self.octets = 0
+        self.expires = 0
+        self.hotes_oublies = 0
+        self.horloge = 0.0
+        self._dernier_balayage = None
+
+    def __len__(self):
+        return len(self.flux)
+
+    def __getstate__(self):
+        etat = self.__dict__.copy()
+        del etat["verrou"]
+        return etat
+
+    def __setstate__(self, etat):
+        self.__dict__.update(etat)
+        self.verrou = threading.Lock()
+
+    def colonnes(self):
+        # La table en tableaux pour np.savez (bornes à 0 pour « sans limite »),
+        # sans objet Python à dépickler au rechargement.
+        with self.verrou:
+            flux = list(self.flux.items())
+            hotes = list(self.hotes.items())
+            protocoles = list(self.protocoles.items())
+            return {
+                "bornes": np.array([self.expiration or 0, self.max_flux or 0, self.max_hotes or 0], dtype=np.float64),
+                "compteurs": np.array([self.paquets, self.octets, self.expires, self.hotes_oublies], dtype=np.int64),
+                "horloges": np.array([self.horloge, np.nan if self._dernier_balayage is None
+                                      else self._dernier_balayage], dtype=np.float64),
+                "cles": np.frombuffer(b"".join(cle for cle, _ in flux), dtype=CLE),
+                "extremites": np.array([(f.adresse_a, f.adresse_b) for _, f in flux], dtype=str).reshape(-1, 2),
+                "instants": np.array([(f.premier, f.dernier) for _, f in flux], dtype=np.float64).reshape(-1, 2),
+                "initiateurs": np.array([f.initiateur for _, f in flux], dtype=np.uint8),
+                "paquets": np.array([f.paquets for _, f in flux], dtype=np.int64).reshape(-1, 2),
+                "octets": np.array([f.octets for _, f in flux], dtype=np.int64).reshape(-1, 2),
+                "drapeaux": np.array([f.drapeaux for _, f in flux], dtype=np.int64).reshape(-1, 2),
+                "adresses": np.array([adresse for adresse, _ in hotes], dtype=str),
+                "hotes": np.array([c for _, c in hotes], dtype=np.int64).reshape(-1, 4),
+                "noms_protocoles": np.array([nom for nom, _ in protocoles], dtype=str),
+                "protocoles": np.array([c for _, c in protocoles], dtype=np.int64).reshape(-1, 2),
+            }
+
+    @classmethod
+    def depuis_colonnes(cls, colonnes):
+        expiration, max_flux, max_hotes = colonnes["bornes"].tolist()
+        table = cls(expiration or None, int(max_flux) or None, int(max_hotes) or None)
+        table.paquets, table.octets, table.expires, table.hotes_oublies = colonnes["compteurs"].tolist()
+        table.horloge, dernier_balayage = colonnes["horloges"].tolist()
+        table._dernier_balayage = None if np.isnan(dernier_balayage) else dernier_balayage
+        cles = colonnes["cles"]
+        lignes = zip(cles.view(f"V{CLE.itemsize}").tolist(), cles["version"].tolist(), cles["proto"].tolist(),
+                     colonnes["extremites"].tolist(), cles["port_a"].tolist(), cles["port_b"].tolist(),
+                     colonnes["instants"].tolist(), colonnes["initiateurs"].tolist(), colonnes["paquets"].tolist(),
+                     colonnes["octets"].tolist(), colonnes["drapeaux"].tolist())
+        for cle, version, proto, extremites, port_a, port_b, instants, initiateur, paquets, octets, drapeaux in lignes:
+            flux = table.flux[cle] = Flux(version, proto, *extremites, port_a, port_b, instants[0], initiateur)
+            flux.dernier = instants[1]
+            flux.paquets, flux.octets, flux.drapeaux = paquets, octets, drapeaux
+        table.hotes = dict(zip(colonnes["adresses"].tolist(), colonnes["hotes"].tolist()))
+        table.protocoles = dict(zip(colonnes["noms_protocoles"].tolist(), colonnes["protocoles"].tolist()))
+        return table
+
+    def fusionner(self, autre):
+        # Ajoute une table calculée sur les paquets qui suivent ceux de self.
+        with self.verrou:
+            for cle, flux in autre.flux.items():
+                present = self.flux.get(cle)
+                if present is None:
+                    self.flux[cle] = flux
+                    continue
+                for s in range(2):
+                    present.paquets[s] += flux.paquets[s]
+                    present.octets[s] += flux.octets[s]
+                    present.drapeaux[s] |= flux.drapeaux[s]
+                present.premier = min(present.premier, flux.premier)
+                present.dernier = max(present.dernier, flux.dernier)
+            for adresse, compteurs in autre.hotes.items():
+                present = self.hotes.setdefault(adresse, [0, 0, 0, 0])
+                for c in range(4):
+                    present[c] += compteurs[c]
+            for nom, compteurs in autre.protocoles.items():
+                present = self.protocoles.setdefault(nom, [0, 0])
+                present[0] += compteurs[0]
+                present[1] += compteurs[1]
+            self.paquets += autre.paquets
+            self.octets += autre.octets
+            self.expires += autre.expires
+            self.hotes_oublies += autre.hotes_oublies
+            self.horloge = max(self.horloge, autre.horloge)
+            self._limiter_hotes()
+            self._expirer()
+
+    def ajouter_lot(self, trames, horodatages, longueurs_originales=None, linktypes=None):
+        self.ajouter_enregistrements(decoder_lot(trames, horodatages, longueurs_originales, linktypes))
+
+    def ajouter_source(self, source, debut=0, arret=None):
+        # Parcourt un stockage ou un fichier indexé par lots, sans dissection.
+        for i in range(debut, len(source), self.TAILLE_LOT):
+            if arret is not None and arret.is_set():
+                return False
+            self.ajouter_enregistrements(source.enregistrements(i, min(len(source), i + self.TAILLE_LOT)))
+        return True
+
+    def ajouter_enregistrements(self, e):
+        if not len(e):
+            return
+        longueurs = e["longueur"].astype(np.int64)
+        horodatages = e["horodatage"]
+        with self.verrou:
+            self.paquets += len(e)
+            self.octets += int(longueurs.sum())
+            self._compter_protocoles(e, longueurs)
+            ip = e["version"] != 0
+            if ip.any():
+                self._compter_hotes(e[ip], longueurs[ip])
+                self._ajouter_flux(e[ip], longueurs[ip], horodatages[ip])
+            self.horloge = max(self.horloge, float(horodatages.max()))
+            self._expirer()
+
+    def _compter_protocoles(self, e, longueurs):
+        codes = np.where(e["version"] != 0, 0x10000 | (e["version"].astype(np.int64) << 8) | e["proto"],
+                         e["ethertype"])
+        distincts, groupes = np.unique(codes, return_inverse=True)
+        paquets = np.bincount(groupes.ravel(), minlength=len(distincts))
+        octets = np.bincount(groupes.ravel(), weights=longueurs, minlength=len(distincts))
+        for code, p, o in zip(distincts.tolist(), paquets.tolist(), octets.tolist()):
+            nom = nom_protocole((code >> 8) & 0xFF, code & 0xFF) if code & 0x10000 else nom_protocole(0, 0, code)
+            compteurs = self.protocoles.setdefault(nom, [0, 0])
+            compteurs[0] += p
+            compteurs[1] += int(o)
+
+    def _compter_hotes(self, e, longueurs):
+        n = len(e)
+        adresses = np.zeros(2 * n, dtype=[("version", "u1"), ("ip", "u1", (16,))])
+        adresses["version"][:n] = adresses["version"][n:] = e["version"]
+        adresses["ip"][:n] = e["ip_src"]
+        adresses["ip"][n:] = e["ip_dst"]
+        distinctes, groupes, _, _ = _grouper(adresses)
+        envoi = groupes[:n]
+        reception = groupes[n:]
+        k = len(distinctes)
+        colonnes = (np.bincount(envoi, minlength=k), np.bincount(envoi, weights=longueurs, minlength=k),
+                    np.bincount(reception, minlength=k), np.bincount(reception, weights=longueurs, minlength=k))
+        for j, cle in enumerate(distinctes.tolist()):
+            adresse = format_ip(cle[1:], cle[0])
+            compteurs = self.hotes.get(adresse)
+            if compteurs is None:
+                compteurs = self.hotes[adresse] = [0, 0, 0, 0]
+            for c in range(4):
+                compteurs[c] += int(colonnes[c][j])
+        self._limiter_hotes()
+
+    def _limiter_hotes(self):
+        if self.max_hotes and len(self.hotes) > self.max_hotes:
+            # On garde la moitié la plus active ; les autres restent comptés dans
+            # les totaux et les protocoles.
+            gardes = heapq.nlargest(self.max_hotes // 2, self.hotes.items(), key=lambda h: h[1][1] + h[1][3])
+            self.hotes_oublies += len(self.hotes) - len(gardes)
+            self.hotes = dict(gardes)
+
+    def _ajouter_flux(self, e, longueurs, horodatages):
+        n = len(e)
+        ip_src = np.ascontiguousarray(e["ip_src"]).view(">u8")
+        ip_dst = np.ascontiguousarray(e["ip_dst"]).view(">u8")
+        sport = e["sport"]
+        dport = e["dport"]
+        # Sens B -> A : la source est la plus grande extrémité (adresse puis port).
+        retour = (ip_src[:, 0] > ip_dst[:, 0]) | ((ip_src[:, 0] == ip_dst[:, 0]) & (
+            (ip_src[:, 1] > ip_dst[:, 1]) | ((ip_src[:, 1] == ip_dst[:, 1]) & (sport > dport))))
+        cles = np.zeros(n, dtype=CLE)
+        cles["version"] = e["version"]
+        cles["proto"] = e["proto"]
+        cles["ip_a"] = np.where(retour[:, None], e["ip_dst"], e["ip_src"])
+        cles["ip_b"] = np.where(retour[:, None], e["ip_src"], e["ip_dst"])
+        cles["port_a"] = np.where(retour, dport, sport)
+        cles["port_b"] = np.where(retour, sport, dport)
+        distinctes, groupes, ordre, debuts = _grouper(cles)
+        k = len(distinctes)
+        sens = retour.astype(np.int64)
+        indices = groupes * 2 + sens
+        paquets = np.bincount(indices, minlength=2 * k).reshape(k, 2)
+        octets = np.bincount(indices, weights=longueurs, minlength=2 * k).reshape(k, 2)
+        premiers = np.minimum.reduceat(horodatages[ordre], debuts)
+        derniers = np.maximum.reduceat(horodatages[ordre], debuts)
+        initiateurs = sens[ordre][debuts]
+        drapeaux = np.zeros((k, 2), dtype=np.int64)
+        tcp = e["couche"] == COUCHE_TCP
+        if tcp.any():
+            np.bitwise_or.at(drapeaux, (groupes[tcp], sens[tcp]), e["tcp_flags"][tcp].astype(np.int64))
+        representants = cles[ordre[debuts]]
+        for j, cle in enumerate(distinctes.tolist()):
+            flux = self.flux.get(cle)
+            if flux is None:
+                r = representants[j]
+                version = int(r["version"])
+                flux = self.flux[cle] = Flux(version, int(r["proto"]), format_ip(r["ip_a"], version),
+                                             format_ip(r["ip_b"], version), int(r["port_a"]), int(r["port_b"]),
+                                             float(premiers[j]), int(initiateurs[j]))
+            for s in range(2):
+                flux.paquets[s] += int(paquets[j, s])
+                flux.octets[s] += int(octets[j, s])
+                flux.drapeaux[s] |= int(drapeaux[j, s])
+            flux.premier = min(flux.premier, float(premiers[j]))
+            flux.dernier = max(flux.dernier, float(derniers[j]))
+
+    def _expirer(self):
+        # Balayage complet au plus une fois par dixième de la durée d'expiration.
+        if self.expiration and (self._dernier_balayage is None
+                                or self.horloge - self._dernier_balayage >= self.expiration / 10):
+            self._dernier_balayage = self.horloge
+            limite = self.horloge - self.expiration
+            expires = [cle for cle, flux in self.flux.items() if flux.dernier < limite]
+            for cle in expires:
+                del self.flux[cle]
+            self.expires += len(expires)
+        if self.max_flux and len(self.flux) > self.max_flux:
+            anciens = heapq.nsmallest(len(self.flux) - self.max_flux * 9 // 10, self.flux.items(),
+                                      key=lambda f: f[1].dernier)
+            for cle, _ in anciens:
+                del self.flux[cle]
+            self.expires += len(anciens)
+
+    def top_flux(self, n=20, critere="octets"):
+        cle = (lambda f: f.total_octets) if critere == "octets" else (lambda f: f.total_paquets)
+        with self.verrou:
+            return heapq.nlargest(n, self.flux.values(), key=cle)
+
+    def top_hotes(self, n=20, critere="octets"):
+        # [(adresse, paquets envoyés, octets envoyés, paquets reçus, octets reçus)]
+        colonne = 1 if critere == "octets" else 0
+        with self.verrou:
+            meilleurs = heapq.nlargest(n, self.hotes.items(), key=lambda h: h[1][colonne] + h[1][colonne + 2])
+        return [(adresse, *compteurs) for adresse, compteurs in meilleurs]
+
+    def top_protocoles(self, n=20, critere="octets"):
+        # [(nom, paquets, octets)]
+        colonne = 1 if critere == "octets" else 0
+        with self.verrou:
+            meilleurs = heapq.nlargest(n, self.protocoles.items(), key=lambda p: p[1][colonne])
+        return [(nom, *compteurs) for nom, compteurs in meilleurs]
@@ -0,0 +1,322 @@
+import mmap
+import os
+import struct
+import threading
+from array import array
+
+import numpy as np
+
+from ypcap_decodeur import ENREGISTREMENT, decoder_entetes, entetes_tampon
+from ypcap_stockage import dissequer, enregistrer_pcap
+
+EXTENSION_INDEX = ".ypx"
+VERSION_INDEX = 3
+PCAPNG_SECTION = 0x0A0D0D0A
+PCAPNG_INTERFACE = 1
+PCAPNG_PAQUET_OBSOLETE = 2
+PCAPNG_PAQUET_SIMPLE = 3
+PCAPNG_PAQUET_AMELIORE = 6
+PCAP_MAGIQUES = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1e6),
+    b"\xa1\xb2\xc3\xd4": (">", 1e6),
+    b"\x4d\x3c\xb2\xa1": ("<", 1e9),
+    b"\xa1\xb2\x3c\x4d": (">", 1e9),
+}
+# Longueurs minimales : en-tête global pcap, bloc de section pcapng, et bloc
+# pcapng selon son type (en-tête, champs fixes et longueur finale).
+TAILLE_ENTETE_PCAP = 24
+TAILLE_SECTION_PCAPNG = 28
+TAILLES_BLOCS_PCAPNG = {PCAPNG_SECTION: 28, PCAPNG_INTERFACE: 20, PCAPNG_PAQUET_OBSOLETE: 32,
+                        PCAPNG_PAQUET_SIMPLE: 16, PCAPNG_PAQUET_AMELIORE: 32}
+
+
+class IndexationAnnulee(Exception):
+    pass
+
+
+def colonnes_vides():
+    # horodatages, décalages, longueurs, longueurs originales, linktypes, interfaces
+    return array("d"), array("q"), array("I"), array("I"), array("H"), array("H")
+
+
+def parcourir_pcap(donnees, position, fin, colonnes, avancer=None):
+    # Ajoute aux colonnes les enregistrements pcap qui commencent avant fin, à
+    # partir de position (début d'un enregistrement) ; renvoie la position qui
+    # suit le dernier.
+    boutisme, fraction = PCAP_MAGIQUES[donnees[:4]]
+    linktype = struct.unpack_from(boutisme + "I", donnees, 20)[0] & 0xFFFF
+    entete = struct.Struct(boutisme + "IIII")
+    horodatages, decalages, longueurs, originales, linktypes, interfaces = colonnes
+    taille = len(donnees)
+    while position < fin and position + 16 <= taille:
+        secondes, fractions, longueur, originale = entete.unpack_from(donnees, position)
+        if position + 16 + longueur > taille:
+            break
+        position += 16
+        horodatages.append(secondes + fractions / fraction)
+        decalages.append(position)
+        longueurs.append(longueur)
+        originales.append(originale)
+        linktypes.append(linktype)
+        interfaces.append(0)
+        position += longueur
+        if avancer is not None:
+            avancer(position, len(decalages))
+    return position
+
+
+class FichierCapture:
+    # Capture pcap ou pcapng projetée en mémoire. Une seule passe construit un index
+    # compact (horodatage, décalage, longueurs, linktype), puis les en-têtes de
+    # toutes les trames sont décodés par lots en un index en colonnes, qui sert
+    # aux filtres et aux statistiques ; les paquets ne sont disséqués par scapy
+    # qu'un par un, à la demande. Les index sont mis en cache à côté du fichier
+    # (même nom + .ypx) et réutilisés tant que le fichier n'a pas changé.
+    # Même interface de lecture que StockageCapture, pour la liste des paquets.
+    PAS_AVANCEMENT = 10000
+    TAILLE_LOT = 65536
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self.avancement = 0.0
+        self.arret = threading.Event()
+        self.premier = 0
+        self.evinces = 0
+        self.format = None
+        self._fichier = None
+        self._mmap = None
+        self.horodatages = np.zeros(0, dtype=np.float64)
+        self.decalages = np.zeros(0, dtype=np.int64)
+        self.longueurs = np.zeros(0, dtype=np.uint32)
+        self.longueurs_originales = np.zeros(0, dtype=np.uint32)
+        self.linktypes = np.zeros(0, dtype=np.uint16)
+        self.interfaces = np.zeros(0, dtype=np.uint16)
+        self.noms_interfaces = []
+        self.entetes = np.zeros(0, dtype=ENREGISTREMENT)
+
+    def __len__(self):
+        return len(self.decalages)
+
+    @property
+    def total(self):
+        return len(self)
+
+    @property
+    def chemin_index(self):
+        return self.chemin + EXTENSION_INDEX
+
+    def _reconnaitre(self):
+        if self._mmap[:4] == struct.pack("<I", PCAPNG_SECTION):
+            nom_format, taille_minimale = "pcapng", TAILLE_SECTION_PCAPNG
+        elif self._mmap[:4] in PCAP_MAGIQUES:
+            nom_format, taille_minimale = "pcap", TAILLE_ENTETE_PCAP
+        else:
+            raise ValueError(f"{self.chemin} n'est pas un fichier pcap ou pcapng")
+        if len(self._mmap) < taille_minimale:
+            raise ValueError(f"{self.chemin} est tronqué dans son en-tête {nom_format}")
+        return nom_format
+
+    def ouvrir(self):
+        # Projette le fichier et reprend l'index en cache s'il est à jour ;
+        # renvoie False s'il reste à indexer.
+        self._fichier = open(self.chemin, "rb")
+        taille = os.fstat(self._fichier.fileno()).st_size
+        if taille == 0:
+            raise ValueError(f"{self.chemin} est vide")
+        self._mmap = mmap.mmap(self._fichier.fileno(), 0, access=mmap.ACCESS_READ)
+        self.format = self._reconnaitre()
+        return self._charger_index()
+
+    def indexer(self):
+        # À appeler hors du thread de l'interface ; lève IndexationAnnulee si
+        # arret est positionné pendant la passe.
+        if not self.ouvrir():
+            colonnes = self._indexer_pcapng() if self.format == "pcapng" else self._indexer_pcap()
+            self.definir_index(colonnes)
+            self._decoder_entetes()
+            self._enregistrer_index()
+        self.avancement = 1.0
+
+    def definir_index(self, colonnes, entetes=None):
+        # colonnes : celles de colonnes_vides().
+        self.horodatages = np.frombuffer(colonnes[0], dtype=np.float64)
+        self.decalages = np.frombuffer(colonnes[1], dtype=np.int64)
+        self.longueurs = np.frombuffer(colonnes[2], dtype=np.uint32)
+        self.longueurs_originales = np.frombuffer(colonnes[3], dtype=np.uint32)
+        self.linktypes = np.frombuffer(colonnes[4], dtype=np.uint16)
+        self.interfaces = np.frombuffer(colonnes[5], dtype=np.uint16)
+        if entetes is not None:
+            self.entetes = entetes
+
+    def _avancer(self, position, nombre):
+        # La première passe compte pour la moitié de l'avancement, le décodage
+        # des en-têtes pour l'autre.
+        if nombre % self.PAS_AVANCEMENT == 0:
+            self.avancement = position / len(self._mmap) / 2
+            if self.arret.is_set():
+                raise IndexationAnnulee()
+
+    def _decoder_entetes(self):
+        entetes = np.zeros(len(self), dtype=ENREGISTREMENT)
+        for debut in range(0, len(self), self.TAILLE_LOT):
+            if self.arret.is_set():
+                raise IndexationAnnulee()
+            tranche = slice(debut, debut + self.TAILLE_LOT)
+            entetes[tranche] = decoder_entetes(
+                entetes_tampon(self._mmap, self.decalages[tranche], self.longueurs[tranche]), self.longueurs[tranche],
+                self.horodatages[tranche], self.longueurs_originales[tranche], self.linktypes[tranche])
+            self.avancement = 0.5 + debut / len(self) / 2
+        self.entetes = entetes
+
+    def _indexer_pcap(self):
+        colonnes = colonnes_vides()
+        parcourir_pcap(self._mmap, 24, len(self._mmap), colonnes, self._avancer)
+        return colonnes
+
+    def _indexer_pcapng(self):
+        donnees = self._mmap
+        horodatages, decalages, longueurs, originales, linktypes, numeros = colonnes = colonnes_vides()
+        boutisme = "<"
+        interfaces = []
+        position = 0
+        blocs = 0
+        premiere_interface = 0
+        self.noms_interfaces = []
+        fin = len(donnees)
+        while position + 12 <= fin:
+            type_bloc = struct.unpack_from(boutisme + "I", donnees, position)[0]
+            if type_bloc == PCAPNG_SECTION:
+                # Chaque section fixe son boutisme et redéfinit ses interfaces ;
+                # leurs numéros suivent ceux des sections précédentes.
+                boutisme = "<" if donnees[position + 8:position + 12] == b"\x4d\x3c\x2b\x1a" else ">"
+                premiere_interface = len(self.noms_interfaces)
+                interfaces = []
+            longueur_bloc = struct.unpack_from(boutisme + "I", donnees, position + 4)[0]
+            if position + longueur_bloc > fin:
+                # Dernier bloc coupé : les paquets complets restent lisibles.
+                break
+            if longueur_bloc < TAILLES_BLOCS_PCAPNG.get(type_bloc, 12):
+                raise ValueError(f"{self.chemin} : bloc pcapng de type {type_bloc} trop court "
+                                 f"({longueur_bloc} octets) à la position {position}")
+            if type_bloc == PCAPNG_INTERFACE:
+                *description, nom = self._interface(donnees, position, longueur_bloc, boutisme)
+                interfaces.append(description)
+                self.noms_interfaces.append(nom or str(len(self.noms_interfaces)))
+            elif type_bloc in (PCAPNG_PAQUET_AMELIORE, PCAPNG_PAQUET_OBSOLETE):
+                if type_bloc == PCAPNG_PAQUET_AMELIORE:
+                    interface, haut, bas, longueur, originale = struct.unpack_from(
+                        boutisme + "IIIII", donnees, position + 8)
+                else:
+                    interface, _, haut, bas, longueur, originale = struct.unpack_from(
+                        boutisme + "HHIIII", donnees, position + 8)
+                linktype, resolution, decalage_temps = interfaces[interface] if interface < len(interfaces) \
+                    else (1, 1e6, 0)
+                horodatages.append(((haut << 32) | bas) / resolution + decalage_temps)
+                decalages.append(position + 28)
+                longueurs.append(min(longueur, longueur_bloc - 32))
+                originales.append(originale)
+                linktypes.append(linktype)
+                numeros.append(premiere_interface + interface)
+            elif type_bloc == PCAPNG_PAQUET_SIMPLE:
+                originale = struct.unpack_from(boutisme + "I", donnees, position + 8)[0]
+                horodatages.append(0.0)
+                decalages.append(position + 12)
+                longueurs.append(min(originale, longueur_bloc - 16))
+                originales.append(originale)
+                linktypes.append(interfaces[0][0] if interfaces else 1)
+                numeros.append(premiere_interface)
+            position += longueur_bloc
+            blocs += 1
+            self._avancer(position, blocs)
+        return colonnes
+
+    def _interface(self, donnees, position, longueur_bloc, boutisme):
+        linktype = struct.unpack_from(boutisme + "H", donnees, position + 8)[0]
+        resolution = 1e6
+        decalage_temps = 0
+        nom = ""
+        option = position + 16
+        fin = position + longueur_bloc - 4
+        while option + 4 <= fin:
+            code, longueur = struct.unpack_from(boutisme + "HH", donnees, option)
+            if code == 0:
+                break
+            valeur = donnees[option + 4:option + 4 + longueur]
+            if code == 2:
+                nom = bytes(valeur).rstrip(b"\0").decode("utf-8", "replace")
+            elif code == 9 and longueur >= 1:
+                # if_tsresol : puissance de 10, ou de 2 si le bit de poids fort est mis.
+                resolution = 2.0 ** (valeur[0] & 0x7F) if valeur[0] & 0x80 else 10.0 ** valeur[0]
+            elif code == 14 and longueur >= 8:
+                decalage_temps = struct.unpack(boutisme + "q", valeur[:8])[0]
+            option += 4 + (longueur + 3) // 4 * 4
+        return linktype, resolution, decalage_temps, nom
+
+    def _signature(self):
+        etat = os.stat(self.chemin)
+        return np.array([VERSION_INDEX, etat.st_size, etat.st_mtime_ns], dtype=np.int64)
+
+    def _charger_index(self):
+        try:
+            with np.load(self.chemin_index) as index:
+                if not np.array_equal(index["signature"], self._signature()):
+                    return False
+                self.horodatages = index["horodatages"]
+                self.decalages = index["decalages"]
+                self.longueurs = index["longueurs"]
+                self.longueurs_originales = index["longueurs_originales"]
+                self.linktypes = index["linktypes"]
+                self.interfaces = index["interfaces"]
+                self.noms_interfaces = index["noms_interfaces"].tolist()
+                self.entetes = index["entetes"]
+        except (OSError, ValueError, KeyError):
+            return False
+        return True
+
+    def _enregistrer_index(self):
+        # Un dossier en lecture seule n'empêche pas d'ouvrir la capture.
+        temporaire = self.chemin_index + ".tmp"
+        try:
+            with open(temporaire, "wb") as f:
+                np.savez(f, signature=self._signature(), horodatages=self.horodatages, decalages=self.decalages,
+                         longueurs=self.longueurs, longueurs_originales=self.longueurs_originales,
+                         linktypes=self.linktypes, interfaces=self.interfaces,
+                         noms_interfaces=np.array(self.noms_interfaces, dtype=str), entetes=self.entetes)
+            os.replace(temporaire, self.chemin_index)
+        except OSError:
+            pass
+
+    def lire(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        debut = int(self.decalages[i])
+        return (self._mmap[debut:debut + int(self.longueurs[i])], float(self.horodatages[i]),
+                int(self.longueurs_originales[i]), int(self.linktypes[i]))
+
+    def brut(self, i):
+        return self.lire(i)[0]
+
+    def interface(self, i):
+        return int(self.interfaces[i])
+
+    def enregistrements(self, debut, fin):
+        # En-têtes décodés des paquets debut..fin-1, lus dans l'index en colonnes.
+        return self.entetes[debut:fin]
+
+    def paquet(self, i):
+        return dissequer(*self.lire(i))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.paquet(i)
+
+    def enregistrer_pcap(self, chemin):
+        enregistrer_pcap(self, chemin)
+
+    def fermer(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._fichier is not None:
+            self._fichier.close()
+            self._fichier = None
@@ -0,0 +1,279 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+from ypcap_decodeur import decoder_lot
+from ypcap_flux import TableFlux
+from ypcap_session import SessionCapture
+from ypcap_stockage import StockageCapture
+
+# Mesures de la chaîne de capture : débits, pertes du noyau, profondeur des
+# files entre les threads de capture et l'interface, et histogrammes de latence
+# par étage :
+#   capture    horodatage noyau -> rappel du sniffer (capture en direct seulement)
+#   file       rappel du sniffer -> sortie de la fusion dans l'interface
+#   stockage   lot rangé dans le stockage et écrit sur disque (durée du lot,
+#              par paquet, comme les deux suivants)
+#   decodage   en-têtes du lot décodés en enregistrements
+#   flux       enregistrements ajoutés aux flux, hôtes et protocoles
+#   affichage  mise à jour de l'état et de la liste ouverte (par rafraîchissement)
+ETAGES = ("capture", "file", "stockage", "decodage", "flux", "affichage")
+# Cases logarithmiques de 1 µs à 100 s, quatre par décade ; une case de plus
+# pour les valeurs au-delà.
+BORNES = 10.0 ** (np.arange(-24, 9) / 4)
+QUANTILES = (0.5, 0.9, 0.99)
+# Fenêtre glissante des débits, en secondes.
+FENETRE = 5.0
+
+
+class Histogramme:
+    def __init__(self):
+        self.comptes = np.zeros(len(BORNES) + 1, dtype=np.int64)
+        self.nombre = 0
+        self.somme = 0.0
+        self.maximum = 0.0
+
+    def ajouter(self, valeurs, poids=1):
+        # valeurs en secondes, un scalaire ou un tableau ; poids compte chaque
+        # valeur plusieurs fois (durée d'un lot, pour chacun de ses paquets).
+        valeurs = np.maximum(np.atleast_1d(np.asarray(valeurs, dtype=np.float64)), 0.0)
+        if not len(valeurs) or not poids:
+            return
+        self.comptes += np.bincount(np.searchsorted(BORNES, valeurs), minlength=len(self.comptes)) * poids
+        self.nombre += len(valeurs) * poids
+        self.somme += float(valeurs.sum()) * poids
+        self.maximum = max(self.maximum, float(valeurs.max()))
+
+    def quantile(self, q):
+        # Borne haute de la case qui contient le quantile, sans dépasser le
+        # maximum observé.
+        if not self.nombre:
+            return None
+        case = int(np.searchsorted(np.cumsum(self.comptes), q * self.nombre))
+        return self.maximum if case >= len(BORNES) else min(float(BORNES[case]), self.maximum)
+
+    @property
+    def moyenne(self):
+        return self.somme / self.nombre if self.nombre else None
+
+    def resume(self):
+        resume = {"nombre": self.nombre, "moyenne": self.moyenne}
+        for q in QUANTILES:
+            resume[f"p{round(q * 100)}"] = self.quantile(q)
+        resume["max"] = self.maximum if self.nombre else None
+        return resume
+
+
+class MesuresCapture:
+    # Tenues par le thread de l'interface : la session y reporte les files et
+    # les pertes à chaque extraction, drain_queue les paquets et les durées.
+    def __init__(self, noms=()):
+        self.noms = list(noms)
+        self.debut = time.time()
+        self.paquets = 0
+        self.octets = 0
+        self.historique = deque([(self.debut, 0, 0)])
+        self.histogrammes = {etage: Histogramme() for etage in ETAGES}
+        # Par source ; None quand le noyau ne donne pas ses compteurs (rejeu,
+        # libpcap, autre système que Linux).
+        self.recus_noyau = [None] * len(self.noms)
+        self.pertes = [None] * len(self.noms)
+        self.profondeurs = [0] * len(self.noms)
+        self.profondeur_max = 0
+
+    def compter(self, paquets, octets, maintenant=None):
+        maintenant = time.time() if maintenant is None else maintenant
+        self.paquets += paquets
+        self.octets += octets
+        self.historique.append((maintenant, self.paquets, self.octets))
+        while len(self.historique) > 2 and self.historique[1][0] <= maintenant - FENETRE:
+            self.historique.popleft()
+
+    def debits(self, maintenant=None):
+        # Paquets/s et octets/s sur la fenêtre glissante qui finit maintenant :
+        # ils retombent à zéro quand plus rien n'arrive.
+        maintenant = time.time() if maintenant is None else maintenant
+        debut, paquets, octets = self.historique[0]
+        for instant, paquets_instant, octets_instant in self.historique:
+            if instant > maintenant - FENETRE:
+                break
+            debut, paquets, octets = instant, paquets_instant, octets_instant
+        if maintenant <= debut:
+            return 0.0, 0.0
+        return (self.paquets - paquets) / (maintenant - debut), (self.octets - octets) / (maintenant - debut)
+
+    def profondeur(self, profondeurs):
+        self.profondeurs = list(profondeurs)
+        self.profondeur_max = max(self.profondeur_max, sum(self.profondeurs))
+
+    def instantane(self, maintenant=None):
+        maintenant = time.time() if maintenant is None else maintenant
+        paquets_s, octets_s = self.debits(maintenant)
+        pertes = [p for p in self.pertes if p is not None]
+        return {
+            "instant": maintenant,
+            "duree": maintenant - self.debut,
+            "paquets": self.paquets,
+            "octets": self.octets,
+            "paquets_s": paquets_s,
+            "octets_s": octets_s,
+            "pertes": sum(pertes) if pertes else None,
+            "profondeur": sum(self.profondeurs),
+            "profondeur_max": self.profondeur_max,
+            "sources": [{"nom": nom, "recus_noyau": recus, "pertes": perdus, "profondeur": profondeur}
+                        for nom, recus, perdus, profondeur
+                        in zip(self.noms, self.recus_noyau, self.pertes, self.profondeurs)],
+            "latences": {etage: self.histogrammes[etage].resume() for etage in ETAGES},
+        }
+
+
+def aplatir(instantane):
+    # Une ligne de CSV : les sources et les latences deviennent des colonnes.
+    ligne = {cle: valeur for cle, valeur in instantane.items() if cle not in ("sources", "latences")}
+    for source in instantane["sources"]:
+        for cle in ("recus_noyau", "pertes", "profondeur"):
+            ligne[f"{source['nom']}_{cle}"] = source[cle]
+    for etage, resume in instantane["latences"].items():
+        for cle, valeur in resume.items():
+            ligne[f"{etage}_{cle}"] = valeur
+    return ligne
+
+
+class ExportMesures:
+    # Instantanés périodiques dans un fichier : une ligne CSV par instantané
+    # pour un nom en .csv, sinon un objet JSON par ligne.
+    def __init__(self, chemin, intervalle=10.0):
+        self.chemin = chemin
+        self.intervalle = intervalle
+        self.csv = chemin.lower().endswith(".csv")
+        self.fichier = open(chemin, "w", newline="" if self.csv else None, encoding="utf-8")
+        self.ecrivain_csv = None
+        self.dernier = None
+
+    def ecrire(self, mesures, maintenant=None, forcer=False):
+        maintenant = time.time() if maintenant is None else maintenant
+        if not forcer and self.dernier is not None and maintenant - self.dernier < self.intervalle:
+            return
+        self.dernier = maintenant
+        instantane = mesures.instantane(maintenant)
+        if self.csv:
+            ligne = aplatir(instantane)
+            if self.ecrivain_csv is None:
+                self.ecrivain_csv = csv.DictWriter(self.fichier, fieldnames=list(ligne))
+                self.ecrivain_csv.writeheader()
+            self.ecrivain_csv.writerow(ligne)
+        else:
+            self.fichier.write(json.dumps(instantane) + "\n")
+        self.fichier.flush()
+
+    def fermer(self, mesures=None):
+        # Un dernier instantané à la fin de la capture.
+        if self.fichier.closed:
+            return
+        if mesures is not None:
+            self.ecrire(mesures, forcer=True)
+        self.fichier.close()
+
+
+def traiter_lot(lot, stockage, flux, mesures, ecrivain=None, erreur_ecriture=None):
+    # Étape commune à l'interface et au rejeu de main() : le lot extrait de la
+    # session est rangé dans le stockage et écrit par ecrivain, ses en-têtes
+    # sont décodés puis ajoutés aux flux, chaque étage chronométré. Une erreur
+    # d'écriture va à erreur_ecriture et arrête l'écriture pour le reste du lot.
+    # Renvoie l'instant de fin.
+    debut = time.time()
+    for frame in lot:
+        stockage.ajouter(*frame)
+        if ecrivain is not None:
+            try:
+                ecrivain.ecrire(*frame[:4])
+            except OSError as e:
+                ecrivain = None
+                erreur_ecriture(e)
+    if ecrivain is not None:
+        try:
+            ecrivain.vider()
+        except OSError as e:
+            erreur_ecriture(e)
+    stocke = time.time()
+    longueurs = [len(f[0]) if f[2] is None else f[2] for f in lot]
+    if lot:
+        enregistrements = decoder_lot([f[0] for f in lot], [f[1] for f in lot], longueurs, [f[3] for f in lot])
+        decode = time.time()
+        flux.ajouter_enregistrements(enregistrements)
+    fin = time.time()
+    if lot:
+        mesures.histogrammes["stockage"].ajouter(stocke - debut, len(lot))
+        mesures.histogrammes["decodage"].ajouter(decode - stocke, len(lot))
+        mesures.histogrammes["flux"].ajouter(fin - decode, len(lot))
+    mesures.compter(len(lot), sum(longueurs), fin)
+    return fin
+
+
+def format_duree(secondes):
+    if secondes is None:
+        return "-"
+    if secondes < 1e-3:
+        return f"{secondes * 1e6:.0f} µs"
+    if secondes < 1:
+        return f"{secondes * 1e3:.1f} ms"
+    return f"{secondes:.2f} s"
+
+
+def main(argv=None):
+    # Rejoue des captures dans la même chaîne que l'interface (session,
+    # fusion, stockage, flux) et affiche ou exporte les mesures.
+    parser = argparse.ArgumentParser(description="Mesures de la chaîne de capture sur des captures rejouées.")
+    parser.add_argument("fichiers", nargs="+")
+    parser.add_argument("--lot", type=int, default=20000, help="trames au plus par extraction")
+    parser.add_argument("--intervalle", type=float, default=1.0, help="secondes entre deux instantanés")
+    parser.add_argument("--export", help="fichier d'export (.csv, sinon lignes JSON)")
+    args = parser.parse_args(argv)
+
+    for chemin in args.fichiers:
+        if not os.path.isfile(chemin):
+            print(f"{chemin} : fichier introuvable", file=sys.stderr)
+            return 1
+    session = SessionCapture.fichiers(args.fichiers)
+    mesures = session.mesures = MesuresCapture(session.noms)
+    stockage = StockageCapture()
+    flux = TableFlux()
+    export = ExportMesures(args.export, args.intervalle) if args.export else None
+    session.start()
+    dernier = time.time()
+    while session.actif or not session.vide:
+        lot = session.extraire(args.lot)
+        if not lot:
+            time.sleep(0.01)
+            continue
+        fin = traiter_lot(lot, stockage, flux, mesures)
+        if export is not None:
+            export.ecrire(mesures, fin)
+        if fin - dernier >= args.intervalle:
+            dernier = fin
+            instantane = mesures.instantane(fin)
+            print(f"{instantane['paquets']:>10d} paquets  {instantane['paquets_s']:>10.0f} paquets/s  "
+                  f"{instantane['octets_s'] * 8 / 1e6:>8.1f} Mbit/s  file {instantane['profondeur']}")
+    if export is not None:
+        export.fermer(mesures)
+    for nom, exception in session.exceptions:
+        print(f"{nom} : {exception}", file=sys.stderr)
+    instantane = mesures.instantane()
+    print(f"{instantane['paquets']} paquets, {instantane['octets']} octets en {instantane['duree']:.2f} s, "
+          f"file au plus {instantane['profondeur_max']} trames")
+    for etage, resume in instantane["latences"].items():
+        if resume["nombre"]:
+            print(f"  {etage:10s} moyenne {format_duree(resume['moyenne']):>10s}  p50 {format_duree(resume['p50']):>10s}"
+                  f"  p90 {format_duree(resume['p90']):>10s}  p99 {format_duree(resume['p99']):>10s}"
+                  f"  max {format_duree(resume['max']):>10s}")
+    return 1 if session.exceptions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
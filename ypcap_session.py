@@ -0,0 +1,191 @@
+import heapq
+import math
+import os
+import queue
+import struct
+import time
+from collections import deque
+
+import numpy as np
+import scapy.all as scapy
+
+from ypcap_stockage import trame
+
+
+class SessionCapture:
+    # Capture simultanée sur plusieurs sources : un AsyncSniffer par interface
+    # (ou par fichier rejoué à la place d'une interface), chacun dans son thread,
+    # qui dépose ses trames dans sa propre file. extraire() fusionne les files en
+    # un seul flux trié par horodatage (fusion à k voies) et marque chaque trame
+    # du numéro de sa source.
+    #
+    # Une trame n'est rendue que lorsqu'aucune autre source ne peut encore en
+    # produire une plus ancienne : une source sans trame en attente bloque la
+    # fusion tant qu'elle tourne. En direct, elle ne peut plus livrer de trame
+    # antérieure à maintenant - RETARD_MAX ; en rejeu, rien ne borne ses
+    # horodatages et on attend sa trame suivante ou sa fin.
+    #
+    # Si mesures (un MesuresCapture) est renseigné, extraire() y reporte les
+    # latences de capture et de file, la profondeur des files et les pertes du
+    # noyau. Ces dernières viennent de PACKET_STATISTICS sur les sockets
+    # PF_PACKET, que la session ouvre elle-même pour pouvoir les interroger.
+    RETARD_MAX = 0.5
+    SOL_PACKET = 263
+    PACKET_STATISTICS = 6
+
+    def __init__(self, sources, hors_ligne=False):
+        # sources : [(nom, options de l'AsyncSniffer)]
+        self.noms = [nom for nom, _ in sources]
+        self.options = [options for _, options in sources]
+        self.hors_ligne = hors_ligne
+        self.sniffers = []
+        self.files = [queue.SimpleQueue() for _ in sources]
+        self.tampons = [deque() for _ in sources]
+        self.recus = [0] * len(sources)
+        self.sockets = [None] * len(sources)
+        self.mesures = None
+
+    @classmethod
+    def interfaces(cls, noms, filtre=None, count=0):
+        return cls([(nom, {"iface": nom, "filter": filtre, "count": count}) for nom in noms])
+
+    @classmethod
+    def fichiers(cls, chemins, count=0):
+        # Rejeu de captures à la place d'interfaces, pour essayer la chaîne
+        # complète hors ligne.
+        return cls([(os.path.basename(chemin), {"offline": chemin, "count": count}) for chemin in chemins],
+                    hors_ligne=True)
+
+    def start(self):
+        self.sniffers = []
+        for i, (file, options) in enumerate(zip(self.files, self.options)):
+            self.sockets[i] = self._ouvrir(options)
+            if self.sockets[i] is not None:
+                options = {"opened_socket": self.sockets[i], "count": options["count"]}
+            # Chaque trame garde l'instant de son passage dans le rappel.
+            sniffer = scapy.AsyncSniffer(prn=lambda pkt, file=file: file.put((*trame(pkt), time.time())),
+                                         store=False, **options)
+            sniffer.start()
+            self.sniffers.append(sniffer)
+
+    def _ouvrir(self, options):
+        # Socket d'écoute d'une interface, ou None si ses compteurs ne sont pas
+        # lisibles ; l'AsyncSniffer ouvre alors la sienne (et signale l'erreur
+        # d'ouverture s'il y en a une).
+        if "iface" not in options:
+            return None
+        try:
+            sock = scapy.conf.L2listen(type=scapy.ETH_P_ALL, iface=options["iface"], filter=options["filter"])
+        except Exception:
+            return None
+        if not self._statistiques(sock):
+            sock.close()
+            return None
+        return sock
+
+    def _statistiques(self, sock):
+        # (reçus, perdus) depuis la lecture précédente, ou None.
+        ins = getattr(sock, "ins", None)
+        if not hasattr(ins, "getsockopt"):
+            return None
+        try:
+            return struct.unpack("II", ins.getsockopt(self.SOL_PACKET, self.PACKET_STATISTICS, 8))
+        except OSError:
+            return None
+
+    def _relever(self, vivants):
+        # Cumule les compteurs du noyau et ferme les sockets des sources
+        # terminées, après leur dernier relevé.
+        for i, sock in enumerate(self.sockets):
+            if sock is None:
+                continue
+            statistiques = self._statistiques(sock)
+            if statistiques is not None and self.mesures is not None:
+                recus, perdus = statistiques
+                self.mesures.recus_noyau[i] = (self.mesures.recus_noyau[i] or 0) + recus
+                self.mesures.pertes[i] = (self.mesures.pertes[i] or 0) + perdus
+            if not vivants[i]:
+                sock.close()
+                self.sockets[i] = None
+
+    def stop(self):
+        # Sans attendre les threads, pour ne pas figer l'interface : actif et
+        # extraire() voient chaque source finir d'elle-même. Un sniffer mort sur
+        # une erreur reste « running » et la relancerait. Un sniffer qui finit
+        # entre le test et l'arrêt lève Scapy_Exception, ou OSError s'il a déjà
+        # fermé le tube qui le réveille.
+        for sniffer in self.sniffers:
+            if sniffer.running and sniffer.exception is None:
+                try:
+                    sniffer.stop(join=False)
+                except (scapy.Scapy_Exception, OSError):
+                    pass
+
+    @property
+    def actif(self):
+        return any(sniffer.thread.is_alive() for sniffer in self.sniffers)
+
+    @property
+    def vide(self):
+        return all(not tampon for tampon in self.tampons) and all(file.empty() for file in self.files)
+
+    @property
+    def exceptions(self):
+        return [(nom, sniffer.exception) for nom, sniffer in zip(self.noms, self.sniffers)
+                if sniffer.exception is not None]
+
+    def extraire(self, maximum=None, maintenant=None):
+        # Trames prêtes, dans l'ordre des horodatages :
+        # [(octets, horodatage, longueur_originale, linktype, source)].
+        # L'état des threads est relevé avant de vider les files : une source
+        # vue arrêtée n'a plus rien à y déposer.
+        vivants = [sniffer.thread.is_alive() for sniffer in self.sniffers]
+        self._relever(vivants)
+        for file, tampon in zip(self.files, self.tampons):
+            while True:
+                try:
+                    tampon.append(file.get_nowait())
+                except queue.Empty:
+                    break
+        if self.mesures is not None:
+            # Le maximum retient l'arriéré avant la fusion ; l'état courant est
+            # ce qu'il en reste après.
+            self.mesures.profondeur([len(tampon) for tampon in self.tampons])
+        if self.hors_ligne:
+            borne_attente = -math.inf
+        else:
+            borne_attente = (time.time() if maintenant is None else maintenant) - self.RETARD_MAX
+        limite = math.inf
+        tas = []
+        for i, tampon in enumerate(self.tampons):
+            if tampon:
+                tas.append((tampon[0][1], i))
+            elif vivants[i]:
+                limite = min(limite, borne_attente)
+        heapq.heapify(tas)
+        sortie = []
+        arrivees = []
+        while tas and (maximum is None or len(sortie) < maximum):
+            horodatage, i = tas[0]
+            if horodatage > limite:
+                break
+            tampon = self.tampons[i]
+            *frame, arrivee = tampon.popleft()
+            sortie.append((*frame, i))
+            arrivees.append(arrivee)
+            self.recus[i] += 1
+            if tampon:
+                heapq.heapreplace(tas, (tampon[0][1], i))
+            else:
+                heapq.heappop(tas)
+                if vivants[i]:
+                    limite = min(limite, borne_attente)
+        if self.mesures is not None:
+            self.mesures.profondeur([len(tampon) for tampon in self.tampons])
+        if self.mesures is not None and sortie:
+            arrivees = np.array(arrivees)
+            self.mesures.histogrammes["file"].ajouter(time.time() - arrivees)
+            if not self.hors_ligne:
+                # Un rejeu n'a pas d'horodatage du noyau à comparer.
+                self.mesures.histogrammes["capture"].ajouter(arrivees - np.array([f[1] for f in sortie]))
+        return sortie
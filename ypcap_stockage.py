@@ -0,0 +1,268 @@
+import mmap
+import struct
+import threading
+import time
+
+import numpy as np
+import scapy.all as scapy
+
+from ypcap_decodeur import ENREGISTREMENT, decoder_entetes, decoder_lot, entetes_tampon, resumer_enregistrement
+
+LINKTYPE_ETHERNET = 1
+SNAPLEN = 262144
+
+
+class StockageCapture:
+    # Stockage borné des trames capturées : seuls les octets bruts, l'horodatage et
+    # les longueurs sont conservés, dans des tampons alloués une fois pour toutes.
+    # Le tampon des octets est une projection anonyme : ses pages ne sont prises
+    # en mémoire qu'une fois écrites, un stockage vide ne coûte presque rien.
+    # Les octets sont écrits à la suite dans un tampon circulaire ; quand la place
+    # ou le nombre de paquets manque, les plus anciens sont évincés. Scapy ne
+    # dissèque un paquet que lorsqu'on le demande (affichage, export).
+    MAX_PAQUETS = 1000000
+    MAX_OCTETS = 256 * 1024 * 1024
+
+    def __init__(self, max_paquets=MAX_PAQUETS, max_octets=MAX_OCTETS):
+        self.max_paquets = max_paquets
+        self.max_octets = max_octets
+        self._octets = mmap.mmap(-1, max_octets)
+        self._vue = memoryview(self._octets)
+        self.horodatages = np.zeros(max_paquets, dtype=np.float64)
+        self.decalages = np.zeros(max_paquets, dtype=np.int64)
+        self.longueurs = np.zeros(max_paquets, dtype=np.uint32)
+        self.longueurs_originales = np.zeros(max_paquets, dtype=np.uint32)
+        self.linktypes = np.zeros(max_paquets, dtype=np.uint16)
+        # Numéro de l'interface de capture, nommée par noms_interfaces.
+        self.interfaces = np.zeros(max_paquets, dtype=np.uint16)
+        self.noms_interfaces = []
+        self.entetes = None
+        self.verrou = threading.Lock()
+        self.vider()
+
+    def vider(self):
+        with self.verrou:
+            self._tete = 0
+            self.nombre = 0
+            self.total = 0
+            self.evinces = 0
+            self.octets_utilises = 0
+            self._position = 0
+            self._decodes = 0
+
+    def __len__(self):
+        return self.nombre
+
+    @property
+    def premier(self):
+        # Numéro (depuis le début de la capture) du plus ancien paquet conservé.
+        return self.total - self.nombre
+
+    def _evincer(self):
+        self.octets_utilises -= int(self.longueurs[self._tete])
+        self._tete = (self._tete + 1) % self.max_paquets
+        self.nombre -= 1
+        self.evinces += 1
+
+    def ajouter(self, donnees, horodatage, longueur_originale=None, linktype=LINKTYPE_ETHERNET, interface=0):
+        n = min(len(donnees), self.max_octets)
+        with self.verrou:
+            if self.nombre == self.max_paquets:
+                self._evincer()
+            debut = self._position
+            if debut + n > self.max_octets:
+                # Retour au début du tampon : les paquets restés dans la fin du
+                # tampon sont les plus anciens et sont abandonnés.
+                while self.nombre and int(self.decalages[self._tete]) >= debut:
+                    self._evincer()
+                debut = 0
+            fin = debut + n
+            # Les paquets sont rangés dans l'ordre d'arrivée : seul le plus ancien
+            # peut chevaucher la zone à écrire, puis le suivant, etc.
+            while self.nombre:
+                ancien = int(self.decalages[self._tete])
+                if ancien >= fin or (ancien < debut and ancien + int(self.longueurs[self._tete]) <= debut):
+                    break
+                self._evincer()
+            self._vue[debut:fin] = donnees[:n]
+            case = (self._tete + self.nombre) % self.max_paquets
+            self.horodatages[case] = horodatage
+            self.decalages[case] = debut
+            self.longueurs[case] = n
+            self.longueurs_originales[case] = len(donnees) if longueur_originale is None else longueur_originale
+            self.linktypes[case] = linktype
+            self.interfaces[case] = interface
+            self._position = fin
+            self.nombre += 1
+            self.total += 1
+            self.octets_utilises += n
+
+    def ajouter_paquet(self, pkt):
+        self.ajouter(*trame(pkt))
+
+    def _case(self, i):
+        if not 0 <= i < self.nombre:
+            raise IndexError(i)
+        return (self._tete + i) % self.max_paquets
+
+    def lire(self, i):
+        # i est l'indice parmi les paquets conservés (0 = le plus ancien) ; renvoie
+        # (octets, horodatage, longueur_originale, linktype).
+        with self.verrou:
+            case = self._case(i)
+            debut = int(self.decalages[case])
+            return (bytes(self._vue[debut:debut + int(self.longueurs[case])]), float(self.horodatages[case]),
+                    int(self.longueurs_originales[case]), int(self.linktypes[case]))
+
+    def brut(self, i):
+        return self.lire(i)[0]
+
+    def interface(self, i):
+        with self.verrou:
+            return int(self.interfaces[self._case(i)])
+
+    def enregistrements(self, debut, fin):
+        # En-têtes décodés des paquets debut..fin-1. Ils forment un index en
+        # colonnes parallèle au tampon, complété seulement pour les paquets
+        # arrivés depuis l'appel précédent ; alloué au premier appel.
+        with self.verrou:
+            if self.entetes is None:
+                self.entetes = np.zeros(self.max_paquets, dtype=ENREGISTREMENT)
+            nouveaux = max(self._decodes, self.premier) - self.premier
+            if nouveaux < self.nombre:
+                cases = (self._tete + np.arange(nouveaux, self.nombre)) % self.max_paquets
+                entetes = entetes_tampon(self._octets, self.decalages[cases], self.longueurs[cases])
+                self.entetes[cases] = decoder_entetes(entetes, self.longueurs[cases], self.horodatages[cases],
+                                                      self.longueurs_originales[cases], self.linktypes[cases])
+                self._decodes = self.total
+            cases = (self._tete + np.arange(debut, min(fin, self.nombre))) % self.max_paquets
+            return self.entetes[cases]
+
+    def paquet(self, i):
+        return dissequer(*self.lire(i))
+
+    def __iter__(self):
+        for i in range(self.nombre):
+            yield self.paquet(i)
+
+    def enregistrer_pcap(self, chemin):
+        enregistrer_pcap(self, chemin)
+
+    def charger_pcap(self, chemin):
+        # Lecture brute (pcap ou pcapng) : les trames vont dans le tampon sans
+        # être disséquées.
+        self.vider()
+        with scapy.RawPcapReader(chemin) as lecteur:
+            for donnees, meta in lecteur:
+                if hasattr(meta, "tshigh"):
+                    horodatage = ((meta.tshigh << 32) + meta.tslow) / meta.tsresol if meta.tshigh is not None else 0.0
+                    self.ajouter(donnees, horodatage, meta.wirelen, meta.linktype)
+                else:
+                    fraction = 1e9 if getattr(lecteur, "nano", False) else 1e6
+                    self.ajouter(donnees, meta.sec + meta.usec / fraction, meta.wirelen, lecteur.linktype)
+
+
+def enregistrer_pcap(source, chemin):
+    # Export des octets bruts d'un stockage ou d'un fichier indexé, sans dissection.
+    # Un nom en .pcapng garde l'interface de chaque paquet.
+    if chemin.lower().endswith(".pcapng"):
+        enregistrer_pcapng(source, chemin)
+        return
+    linktype = source.lire(0)[3] if len(source) else LINKTYPE_ETHERNET
+    with scapy.RawPcapWriter(chemin, linktype=linktype, snaplen=SNAPLEN) as ecrivain:
+        ecrivain.write_header(None)
+        for i in range(len(source)):
+            donnees, horodatage, longueur_originale, _ = source.lire(i)
+            secondes, microsecondes = divmod(int(round(horodatage * 1e6)), 1000000)
+            ecrivain.write_packet(donnees, sec=secondes, usec=microsecondes,
+                                  caplen=len(donnees), wirelen=longueur_originale)
+
+
+def enregistrer_pcapng(source, chemin):
+    # Une description d'interface (IDB) est écrite avant le premier paquet de
+    # chaque interface, avec le linktype de ce paquet et son nom s'il est connu.
+    noms = getattr(source, "noms_interfaces", [])
+    numeros = {}
+    with open(chemin, "wb") as f:
+        f.write(struct.pack("<IIIHHqI", 0x0A0D0D0A, 28, 0x1A2B3C4D, 1, 0, -1, 28))
+        for i in range(len(source)):
+            donnees, horodatage, longueur_originale, linktype = source.lire(i)
+            interface = source.interface(i)
+            if interface not in numeros:
+                numeros[interface] = len(numeros)
+                options = b""
+                if interface < len(noms):
+                    nom = noms[interface].encode()
+                    options = struct.pack("<HH", 2, len(nom)) + nom + b"\0" * (-len(nom) % 4)
+                options += struct.pack("<HH", 0, 0)
+                longueur_bloc = 20 + len(options)
+                f.write(struct.pack("<IIHHI", 1, longueur_bloc, linktype, 0, SNAPLEN) + options
+                        + struct.pack("<I", longueur_bloc))
+            temps = int(round(horodatage * 1e6))
+            longueur_bloc = 32 + len(donnees) + (-len(donnees) % 4)
+            f.write(struct.pack("<IIIIIII", 6, longueur_bloc, numeros[interface], temps >> 32, temps & 0xFFFFFFFF,
+                                len(donnees), longueur_originale))
+            f.write(donnees)
+            f.write(b"\0" * (-len(donnees) % 4) + struct.pack("<I", longueur_bloc))
+
+
+def trame(pkt):
+    # Arguments de StockageCapture.ajouter pour un paquet scapy.
+    linktype = scapy.conf.l2types.layer2num.get(type(pkt), LINKTYPE_ETHERNET)
+    return bytes(pkt), float(pkt.time), getattr(pkt, "wirelen", None), linktype
+
+
+def dissequer(donnees, horodatage, longueur_originale=None, linktype=LINKTYPE_ETHERNET):
+    classe = scapy.conf.l2types.num2layer.get(linktype, scapy.conf.raw_layer)
+    try:
+        pkt = classe(donnees)
+    except Exception:
+        pkt = scapy.conf.raw_layer(donnees)
+    pkt.time = horodatage
+    if longueur_originale is not None:
+        pkt.wirelen = longueur_originale
+    return pkt
+
+
+def resumer(pkt):
+    # (source, destination, protocole) d'un paquet disséqué, pour une ligne de liste.
+    if pkt.haslayer(scapy.IP):
+        source, destination = pkt[scapy.IP].src, pkt[scapy.IP].dst
+    elif pkt.haslayer(scapy.IPv6):
+        source, destination = pkt[scapy.IPv6].src, pkt[scapy.IPv6].dst
+    elif pkt.haslayer(scapy.ARP):
+        source, destination = pkt[scapy.ARP].psrc, pkt[scapy.ARP].pdst
+    elif pkt.haslayer(scapy.Ether):
+        source, destination = pkt[scapy.Ether].src, pkt[scapy.Ether].dst
+    else:
+        source, destination = "", ""
+    protocole = pkt.name
+    couche = pkt
+    while couche and not isinstance(couche, (scapy.Raw, scapy.Padding, scapy.NoPayload)):
+        protocole = couche.name
+        couche = couche.payload
+    return source, destination, protocole
+
+
+def resumer_lignes(stockage, numeros):
+    # Lignes de la liste des paquets {numéro absolu: (No., temps, source, destination,
+    # protocole, longueur, interface)}, pour un stockage ou un fichier chargé. Les
+    # trames sont décodées en un seul lot par le décodeur rapide ; scapy ne reprend
+    # que celles qu'il ne reconnaît pas. Les numéros hors du stockage sont ignorés.
+    premier = stockage.premier
+    numeros = [n for n in numeros if 0 <= n - premier < len(stockage)]
+    lues = [stockage.lire(n - premier) for n in numeros]
+    enregistrements = decoder_lot([l[0] for l in lues], linktypes=[l[3] for l in lues])
+    noms = stockage.noms_interfaces
+    lignes = {}
+    for numero, (donnees, horodatage, longueur_originale, linktype), e in zip(numeros, lues, enregistrements):
+        if e["decode"]:
+            source, destination, protocole = resumer_enregistrement(e)
+        else:
+            source, destination, protocole = resumer(dissequer(donnees, horodatage, longueur_originale, linktype))
+        secondes, microsecondes = divmod(int(round(horodatage * 1e6)), 1000000)
+        temps = time.strftime("%H:%M:%S", time.localtime(secondes)) + f".{microsecondes:06d}"
+        interface = stockage.interface(numero - premier)
+        interface = noms[interface] if interface < len(noms) else str(interface)
+        lignes[numero] = (numero + 1, temps, source, destination, protocole, longueur_originale, interface)
+    return lignes